@@ -144,6 +144,14 @@ def replcheck_cmd_list(topo_tls_ldapi):
                          [ds_replcheck_path, 'offline', '-b', DEFAULT_SUFFIX, '--conflicts', '--rid', '1',
                           '-m', '/tmp/export_{}.ldif'.format(m1.serverid),
                           '-r', '/tmp/export_{}.ldif'.format(m2.serverid)]]
+        if ds_is_newer("2.0.0"):
+            # Compare in several processes
+            replcheck_cmd += [[ds_replcheck_path, 'online', '-b', DEFAULT_SUFFIX, '-D', DN_DM, '-w', PW_DM, '-l', '1',
+                               '-m', 'ldap://{}:{}'.format(m1.host, m1.port), '--conflicts', '--jobs', '2',
+                               '-r', 'ldap://{}:{}'.format(m2.host, m2.port)],
+                              [ds_replcheck_path, 'offline', '-b', DEFAULT_SUFFIX, '--conflicts', '--rid', '1',
+                               '--jobs', '2', '-m', '/tmp/export_{}.ldif'.format(m1.serverid),
+                               '-r', '/tmp/export_{}.ldif'.format(m2.serverid)]]
     else:
         replcheck_cmd = [[ds_replcheck_path, '-b', DEFAULT_SUFFIX, '-D', DN_DM, '-w', PW_DM, '-l', '1',
                           '-m', 'ldap://{}:{}'.format(m1.host, m1.port), '--conflicts',
@@ -538,6 +546,62 @@ def test_dsreplcheck_timeout_connection_mechanisms(topo_tls_ldapi):
         assert OUTPUT in ensure_str(result)
 
 
+@pytest.mark.skipif(ds_is_older('2.0.0'), reason='Not implemented')
+def test_dsreplcheck_digests(topo_tls_ldapi, tmpdir):
+    """Check ds-replcheck finds the missing entries from the digests of the replicas
+
+    :id: c1b005de-eda8-48e3-9c18-badda26420b4
+    :setup: Two master replication
+    :steps:
+        1. Pause replication between master and replica
+        2. Add an entry to master and an entry to replica
+        3. Save the digests of both replicas, from the servers and from LDIF exports
+        4. Compare the replicas with their digests
+    :expectedresults:
+        1. It should be successful
+        2. It should be successful
+        3. It should be successful
+        4. The added entries should be reported missing
+    """
+
+    m1 = topo_tls_ldapi.ms["master1"]
+    m2 = topo_tls_ldapi.ms["master2"]
+    ds_replcheck_path = os.path.join(m1.ds_paths.bin_dir, 'ds-replcheck')
+
+    try:
+        topo_tls_ldapi.pause_all_replicas()
+        user0 = UserAccounts(m1, DEFAULT_SUFFIX).create_test_user(2000)
+        user1 = UserAccounts(m2, DEFAULT_SUFFIX).create_test_user(2001)
+
+        for inst in topo_tls_ldapi:
+            inst.stop()
+            inst.db2ldif(bename=DEFAULT_BENAME, suffixes=[DEFAULT_SUFFIX], excludeSuffixes=[], encrypt=False,
+                         repl_data=True, outputfile='/tmp/export_{}.ldif'.format(inst.serverid))
+            inst.start()
+
+        for source in ('url', 'ldif'):
+            digests = []
+            for inst in (m1, m2):
+                digest = os.path.join(str(tmpdir), '{}_{}.digest.gz'.format(inst.serverid, source))
+                if source == 'url':
+                    args = ['-u', 'ldap://{}:{}'.format(inst.host, inst.port), '-D', DN_DM, '-w', PW_DM]
+                else:
+                    args = ['-l', '/tmp/export_{}.ldif'.format(inst.serverid)]
+                subprocess.check_call([ds_replcheck_path, 'digest', '-b', DEFAULT_SUFFIX, '-o', digest] + args)
+                digests.append(digest)
+
+            tool_cmd = [ds_replcheck_path, 'online', '-b', DEFAULT_SUFFIX, '-D', DN_DM, '-w', PW_DM, '-l', '1',
+                        '-m', 'ldap://{}:{}'.format(m1.host, m1.port), '-r', 'ldap://{}:{}'.format(m2.host, m2.port),
+                        '--master-digest', digests[0], '--replica-digest', digests[1]]
+            result = subprocess.check_output(tool_cmd, encoding='utf-8').lower()
+            assert user0.dn.lower() in result.split('entries missing on replica:')[1]
+            assert user1.dn.lower() in result.split('entries missing on master:')[1]
+    finally:
+        user0.delete()
+        user1.delete()
+        topo_tls_ldapi.resume_all_replicas()
+
+
 if __name__ == '__main__':
     # Run isolated
     # -s for DEBUG mode
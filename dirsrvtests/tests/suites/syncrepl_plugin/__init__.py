@@ -52,10 +52,10 @@ class ISyncRepl(DirSrv, SyncreplConsumer):
         super().__init__()
 
     def result4(self, *args, **kwargs):
-        return self.inst.result4(*args, **kwargs, escapehatch='i am sure')
+        return self.inst.result4(*args, **kwargs)
 
     def search_ext(self, *args, **kwargs):
-        return self.inst.search_ext(*args, **kwargs, escapehatch='i am sure')
+        return self.inst.search_ext(*args, **kwargs)
 
     def syncrepl_search(self, base=DEFAULT_SUFFIX, scope=ldap.SCOPE_SUBTREE, mode='refreshOnly', cookie=None, **search_args):
         # Wipe the last result set.
@@ -11,35 +11,61 @@ import types
 import time
 import fcntl
 import pwd
+from collections import deque
 
 maxlines = 1000 # set on command line
 S_IFIFO = 0o010000
 
-buffer = [] # default circular buffer used by default plugin
+# the pipe is read in blocks of up to this many bytes
+BLOCKSIZE = 256 * 1024
+
+buffer = deque(maxlen=maxlines) # default circular buffer used by default plugin
 totallines = 0
 logfname = "" # name of log pipe
 debug = False
 
+# lines read from the pipe, and the time spent splitting and processing them,
+# not waiting for them
+linesread = 0
+busytime = 0.0
+
 # default plugin just keeps a circular buffer
 def defaultplugin(line):
     global totallines
     buffer.append(line)
     totallines = totallines + 1
-    if len(buffer) > maxlines:
-        del buffer[0]
+    return True
+
+def defaultplugin_batch(lines):
+    global totallines
+    buffer.extend(lines)
+    totallines = totallines + len(lines)
     return True
 
 def printbuffer():
     sys.stdout.writelines(buffer)
     print("Read %d total lines" % totallines)
+    if busytime:
+        print("Processed %d lines at %.0f lines/sec" % (linesread, linesread / busytime))
     print(logfname, "=" * 60)
     sys.stdout.flush()
 
 def defaultpost(): printbuffer()
 
 plgfuncs = [] # list of plugin functions
+plgbatchfuncs = [] # list of (name, function) taking a list of lines
 plgpostfuncs = [] # list of post plugin funcs
 
+def batchof(plgfunc):
+    '''wrap a plugin function taking a single line into one
+    taking a list of lines'''
+    def plugin_batch(lines):
+        for line in lines:
+            if not plgfunc(line):
+                return False
+        return True
+    return plugin_batch
+
 def finish():
     for postfunc in plgpostfuncs: postfunc()
     if options.scriptpidfile: os.unlink(options.scriptpidfile)
@@ -75,13 +101,21 @@ def my_import(plgfile):
     mod = __import__(base) # will throw exception if problem with python file
     sys.path.pop(0) # remove our path
 
-    # check for the plugin functions
+    # check for the plugin functions - a plugin may also, or only, define
+    # plugin_batch(lines), called with all the lines read from the pipe at once
     plgfunc = getattr(mod, 'plugin', None)
-    if not plgfunc:
+    plgbatchfunc = getattr(mod, 'plugin_batch', None)
+    if not plgfunc and not plgbatchfunc:
         return ('%s does not specify a plugin function' % plgfile, None, base)
-    if not isinstance(plgfunc, types.FunctionType):
+    if plgfunc and not isinstance(plgfunc, types.FunctionType):
         return ('the symbol "plugin" in %s is not a function' % plgfile, None, base)
-    plgfuncs.append(plgfunc) # add to list in cmd line order
+    if plgbatchfunc and not isinstance(plgbatchfunc, types.FunctionType):
+        return ('the symbol "plugin_batch" in %s is not a function' % plgfile, None, base)
+    if plgfunc:
+        plgfuncs.append(plgfunc) # add to list in cmd line order
+    if not plgbatchfunc:
+        plgbatchfunc = batchof(plgfunc)
+    plgbatchfuncs.append((base, plgbatchfunc))
 
     # check for 'post' func
     plgpostfunc = getattr(mod, 'post', None)
@@ -140,7 +174,8 @@ def open_pipe(logfname):
     logf = None
     while not opencompleted:
         try:
-            logf = open(logfname, 'r') # blocks until there is some input
+            # unbuffered - a read returns whatever the pipe holds
+            logf = open(logfname, 'rb', 0) # blocks until there is some input
             opencompleted = True
         except IOError as e:
             if e.errno == errno.EINTR:
@@ -208,13 +243,47 @@ def handle_script_pidfile(scriptpidfile):
         write_pid_file(scriptpidfile)
     return True
 
-def read_and_process_line(logf, plgfuncs):
-    line = None
-    done = False
+class LineReader:
+    '''split the blocks read from the pipe into lines - the block buffer
+    is reused for every read, and a line cut at the end of a block is
+    kept until the rest of it is read'''
+    def __init__(self, logf, blocksize=BLOCKSIZE):
+        self.logf = logf
+        self.block = bytearray(blocksize)
+        self.view = memoryview(self.block)
+        self.partial = b''
+
+    def readlines(self):
+        '''return the next complete lines, or an empty list at EOF'''
+        global busytime
+        while True:
+            nbytes = self.logf.readinto(self.block)
+            start = time.time()
+            if not nbytes: # EOF - pass on a last line without a newline
+                lines = [self.partial.decode('utf-8', 'replace')] if self.partial else []
+                self.partial = b''
+                return lines
+            end = self.block.rfind(b'\n', 0, nbytes) + 1
+            if not end: # no complete line yet
+                self.partial += self.view[:nbytes]
+                continue
+            data = self.partial + self.view[:end]
+            self.partial = bytes(self.view[end:nbytes])
+            lines = data.decode('utf-8', 'replace').split('\n')
+            lines.pop() # empty, after the last newline
+            lines = [line + '\n' for line in lines]
+            busytime += time.time() - start
+            return lines
+
+def read_and_process_lines(reader, plgbatchfuncs):
+    '''read the next lines in the pipe and pass them to the plugins -
+    return the number of lines read, 0 at EOF'''
+    global linesread, busytime
+    lines = None
     readcompleted = False
     while not readcompleted:
         try:
-            line = logf.readline()
+            lines = reader.readlines()
             readcompleted = True # read completed
         except IOError as e:
             if e.errno == errno.EINTR:
@@ -222,16 +291,17 @@ def read_and_process_line(logf, plgfuncs):
             else: # hard error
                 print("%s [%d]" % (e.strerror, e.errno))
                 sys.exit(1)
-    if line: # read something
-        for plgfunc in plgfuncs:
-            if not plgfunc(line):
-                print("Aborting processing due to function %s.%s" % (plgfunc.__module__, plgfunc.__name__))
-                finish() # this will exit the process
-                done = True
-                break
-    else: # EOF
-        done = True
-    return done
+    if not lines: # EOF
+        return 0
+    start = time.time()
+    for (name, plgbatchfunc) in plgbatchfuncs:
+        if not plgbatchfunc(lines):
+            print("Aborting processing due to plugin %s" % name)
+            finish() # this will exit the process
+            return 0
+    busytime += time.time() - start
+    linesread += len(lines)
+    return len(lines)
 
 def parse_options():
     from optparse import OptionParser
@@ -270,8 +340,12 @@ options, logfname = parse_options()
 if options.debug:
     debug = True
 
-if len(plgfuncs) == 0:
+maxlines = options.maxlines
+buffer = deque(maxlen=maxlines)
+
+if len(plgbatchfuncs) == 0:
     plgfuncs.append(defaultplugin)
+    plgbatchfuncs.append(("defaultplugin", defaultplugin_batch))
 if len(plgpostfuncs) == 0:
     plgpostfuncs.append(defaultpost)
 
@@ -362,16 +436,21 @@ while not done:
             print("cancelled startup timer")
 
     lines = 0
-    # read and process the next line in the pipe
+    reader = LineReader(logf)
+    # read and process the next lines in the pipe
     # if server exits while we are reading, we will get
-    # EOF and the func will return True - will also
-    # return True if a plugin returns failure
-    while not read_and_process_line(logf, plgfuncs):
-        lines += 1
+    # EOF and the func will return 0
+    while True:
+        nlines = read_and_process_lines(reader, plgbatchfuncs)
+        if not nlines:
+            break
+        lines += nlines
 
     # the other end of the pipe closed - we close our end too
     if debug:
         print("read", lines, "lines")
+        if busytime:
+            print("processed", linesread, "lines at %.0f lines/sec" % (linesread / busytime))
     logf.close()
     logf = None
     if debug:
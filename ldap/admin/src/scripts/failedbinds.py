@@ -1,16 +1,18 @@
 import re
 import sys
 import os, os.path
+import time
+from collections import OrderedDict, deque
 
 # regex that matches a BIND request line
 regex_num = r'[-]?\d+' # matches numbers including negative
-regex_new_conn = re.compile(r'^(\[.+\]) (conn=%s) (fd=%s) (slot=%s) (?:SSL )?connection from (\S+)' % (regex_num, regex_num, regex_num))
-regex_sslinfo = re.compile(r'^\[.+\] (conn=%s) SSL (.+)$' % regex_num)
-regex_bind_req = re.compile(r'^(\[.+\]) (conn=%s) (op=%s) BIND dn=(.+) method=(\S+) version=\d ?(?:mech=(\S+))?' % (regex_num, regex_num))
-regex_bind_res = re.compile(r'^(\[.+\]) (conn=%s) (op=%s) RESULT err=(%s) tag=97 ' % (regex_num, regex_num, regex_num))
-regex_unbind = re.compile(r'^\[.+\] (conn=%s) op=%s UNBIND' % (regex_num, regex_num))
-regex_closed = re.compile(r'^(\[.+\]) (conn=%s) (op=%s) fd=%s closed' % (regex_num, regex_num, regex_num))
-regex_ssl_map_fail = re.compile(r'^\[.+\] (conn=%s) (SSL failed to map client certificate.*)$' % regex_num)
+regex_new_conn = re.compile(r'^(\[[^]]+\]) (conn=%s) (fd=%s) (slot=%s) (?:SSL )?connection from (\S+)' % (regex_num, regex_num, regex_num))
+regex_sslinfo = re.compile(r'^\[[^]]+\] (conn=%s) SSL (.+)$' % regex_num)
+regex_bind_req = re.compile(r'^(\[[^]]+\]) (conn=%s) (op=%s) BIND dn=(.+) method=(\S+) version=\d ?(?:mech=(\S+))?' % (regex_num, regex_num))
+regex_bind_res = re.compile(r'^(\[[^]]+\]) (conn=%s) (op=%s) RESULT err=(%s) tag=97 ' % (regex_num, regex_num, regex_num))
+regex_unbind = re.compile(r'^\[[^]]+\] (conn=%s) op=%s UNBIND' % (regex_num, regex_num))
+regex_closed = re.compile(r'^(\[[^]]+\]) (conn=%s) (op=%s) fd=%s closed' % (regex_num, regex_num, regex_num))
+regex_ssl_map_fail = re.compile(r'^\[[^]]+\] (conn=%s) (SSL failed to map client certificate.*)$' % regex_num)
 
 # bind errors we can ignore
 ignore_errors = {'0': 'Success',
@@ -21,51 +23,76 @@ ignore_errors = {'0': 'Success',
 REQ = 0
 RES = 1
 
-class Conn:
+# Defaults of the plugin arguments bounding memory:
+# failedbinds.maxconns - connections tracked at once, least recently active dropped first
+# failedbinds.maxage - seconds after which an idle connection is dropped
+# failedbinds.maxips - client addresses with failure counters
+# failedbinds.window - seconds the failures of an address are counted over
+# failedbinds.threshold - log a THRESHOLD line when an address reaches this many
+#                         failures in the window, 0 to disable
+MAX_CONNS = 10000
+MAX_AGE = 3600
+MAX_IPS = 10000
+WINDOW = 60
+THRESHOLD = 0
+
+# requests waiting for their result on a single connection
+MAX_PENDING_OPS = 16
+
+class Conn(object):
+    __slots__ = ('conn', 'fd', 'slot', 'ip', 'timestamp', 'ops', 'sslinfo', 'seen')
+
     def __init__(self, timestamp, conn, fd, slot, ip):
         self.conn = conn
         self.fd = fd
         self.slot = slot
         self.ip = ip
         self.timestamp = timestamp
-        self.ops = {}
+        self.ops = None # only allocated while a bind is in progress
         self.sslinfo = ''
+        self.seen = 0
 
     def addssl(self, sslinfo):
         if self.sslinfo and sslinfo:
             self.sslinfo += ' '
         self.sslinfo += sslinfo
 
+    def pending(self, opnum):
+        if self.ops is None:
+            self.ops = {}
+        elif len(self.ops) >= MAX_PENDING_OPS: # drop the oldest, never answered
+            del self.ops[next(iter(self.ops))]
+        op = [None, None] # new empty list
+        self.ops[opnum] = op
+        return op
+
     def addreq(self, timestamp, opnum, dn, method, mech='SIMPLE'):
         retval = None
-        if opnum in self.ops: # result came before request?
+        if not mech: mech = "SIMPLE"
+        if self.ops and opnum in self.ops: # result came before request?
             op = self.ops.pop(opnum) # grab the op and remove from list
             if op[RES]['errnum'] in ignore_errors: # don't care about this op
                 return retval
-            if not mech: mech = "SIMPLE"
             op[REQ] = {'dn': dn, 'method': method, 'timestamp': timestamp,
                        'mech': mech}
             retval = self.logstr(opnum, op)
         else: # store request until we get the result
-            op = [None, None] # new empty list
-            if not mech: mech = "SIMPLE"
+            op = self.pending(opnum)
             op[REQ] = {'dn': dn, 'method': method, 'timestamp': timestamp,
                        'mech': mech}
-            self.ops[opnum] = op
         return retval
 
     def addres(self, timestamp, opnum, errnum):
         retval = None
-        if opnum in self.ops:
+        if self.ops and opnum in self.ops:
             op = self.ops.pop(opnum) # grab the op and remove from list
             if errnum in ignore_errors: # don't care about this op
                 return retval
             op[RES] = {'errnum': errnum, 'timestamp': timestamp}
             retval = self.logstr(opnum, op)
         else: # result came before request in access log - store until we find request
-            op = [None, None] # new empty list
+            op = self.pending(opnum)
             op[RES] = {'errnum': errnum, 'timestamp': timestamp}
-            self.ops[opnum] = op
         return retval
 
     def logstr(self, opnum, op):
@@ -76,24 +103,116 @@ class Conn:
             self.timestamp, self.ip, self.sslinfo
             )
         return logstr
-        
-# key is conn=X
-# val is ops hash
-#  key is op=Y
-#  value is list
-#    list[0] is BIND request
-#    list[1] is RESULT
-conns = {}
+
+class ConnTable(object):
+    """Connections by conn=X, least recently active first.
+
+    Clients that never close cleanly leave no closed line, so connections are
+    also dropped when their slot is reused by a new connection, when the table
+    is full, and when idle for more than maxage seconds.
+    """
+    def __init__(self, maxconns=MAX_CONNS, maxage=MAX_AGE):
+        self.maxconns = maxconns
+        self.maxage = maxage
+        self.conns = OrderedDict()
+        self.slots = {} # slot=X -> conn=X currently holding it
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.conns)
+
+    def new(self, timestamp, connid, fd, slot, ip):
+        # the server only reuses a slot once its connection is gone
+        self.remove(self.slots.get(slot))
+        self.remove(connid) # remove old one, if any
+        conn = Conn(timestamp, connid, fd, slot, ip)
+        self.slots[slot] = connid
+        self.add(conn)
+        return conn
+
+    def add(self, conn):
+        now = time.time()
+        conn.seen = now
+        self.conns[conn.conn] = conn
+        self.expire(now)
+
+    def get(self, connid):
+        conn = self.conns.get(connid)
+        if conn is not None:
+            conn.seen = time.time()
+            self.conns.move_to_end(connid)
+        return conn
+
+    def remove(self, connid):
+        conn = self.conns.pop(connid, None)
+        if conn is not None and self.slots.get(conn.slot) == connid:
+            del self.slots[conn.slot]
+        return conn
+
+    def expire(self, now):
+        while self.conns:
+            connid, conn = next(iter(self.conns.items()))
+            if len(self.conns) <= self.maxconns and now - conn.seen <= self.maxage:
+                break
+            self.remove(connid)
+            self.evicted += 1
+
+class FailureWindows(object):
+    """Failed binds per client address over the last window seconds, kept
+    in one second buckets, for at most maxips addresses"""
+    def __init__(self, window=WINDOW, maxips=MAX_IPS):
+        self.window = window
+        self.maxips = maxips
+        self.ips = OrderedDict() # ip -> deque of [second, count]
+
+    def add(self, ip, now=None):
+        second = int(time.time() if now is None else now)
+        buckets = self.ips.pop(ip, None)
+        if buckets is None:
+            buckets = deque()
+        if buckets and buckets[-1][0] == second:
+            buckets[-1][1] += 1
+        else:
+            buckets.append([second, 1])
+        while buckets[0][0] <= second - self.window:
+            buckets.popleft()
+        self.ips[ip] = buckets # most recent last
+        if len(self.ips) > self.maxips:
+            self.ips.popitem(last=False)
+        return sum(count for _, count in buckets)
 
 # file to log failed binds to
 logf = None
 
+conns = ConnTable()
+failures = FailureWindows()
+threshold = THRESHOLD
+
+def intarg(plgargs, name, default, minimum):
+    try:
+        value = int(plgargs.get(name, default))
+    except ValueError:
+        print("Error: failedbinds.%s must be a number" % name)
+        return None
+    if value < minimum:
+        print("Error: failedbinds.%s must be at least %d" % (name, minimum))
+        return None
+    return value
+
 def pre(plgargs):
-    global logf
+    global logf, conns, failures, threshold
     logfile = plgargs.get('logfile', None)
     if not logfile:
         print("Error: missing required argument failedbinds.logfile")
         return False
+    args = [intarg(plgargs, name, default, minimum) for (name, default, minimum) in
+            (('maxconns', MAX_CONNS, 1), ('maxage', MAX_AGE, 1), ('maxips', MAX_IPS, 1),
+             ('window', WINDOW, 1), ('threshold', THRESHOLD, 0))]
+    if None in args:
+        return False
+    (maxconns, maxage, maxips, window, threshold) = args
+    conns = ConnTable(maxconns, maxage)
+    failures = FailureWindows(window, maxips)
     needchmod = False
     if not os.path.isfile(logfile): needchmod = True
     if sys.version_info < (3, 0):
@@ -108,68 +227,81 @@ def post():
     logf.close()
     logf = None
 
+def getconn(connid):
+    conn = conns.get(connid)
+    if conn is None:
+        # should have seen new conn line - if not, have to create a dummy one
+        conn = Conn('unknown', connid, '', '', 'unknown')
+        conns.add(conn)
+    return conn
+
+def logfailure(conn, logmsg, timestamp):
+    logf.write(logmsg + "\n")
+    count = failures.add(conn.ip)
+    if threshold and count == threshold:
+        logf.write('%s THRESHOLD ip=%s failures=%d window=%ds\n' % (timestamp, conn.ip, count, failures.window))
+    logf.flush()
+
 def plugin(line):
-    # is this a new conn line?
-    match = regex_new_conn.match(line)
-    if match:
-        (timestamp, connid, fdid, slotid, ip) = match.groups()
-        if connid in conns: conns.pop(connid) # remove old one, if any
-        conn = Conn(timestamp, connid, fdid, slotid, ip)
-        conns[connid] = conn
+    # cheap substring tests pick the only regex that can match the line
+    if ' conn=' not in line:
         return True
 
-    # is this an UNBIND line?
-    match = regex_unbind.match(line)
-    if match:
-        connid = match.group(1)
-        if connid in conns: conns.pop(connid) # remove it
+    # is this a REQUEST line?
+    if ' BIND ' in line:
+        match = regex_bind_req.match(line)
+        if match:
+            (timestamp, connid, opnum, dn, method, mech) = match.groups()
+            conn = getconn(connid)
+            logmsg = conn.addreq(timestamp, opnum, dn, method, mech)
+            if logmsg:
+                logfailure(conn, logmsg, timestamp)
         return True
 
-    # is this a closed line?
-    match = regex_closed.match(line)
-    if match:
-        (timestamp, connid, opid) = match.groups()
-        if connid in conns: conns.pop(connid) # remove it
+    # is this a RESULT line?
+    if ' RESULT ' in line:
+        if ' tag=97 ' not in line:
+            return True
+        match = regex_bind_res.match(line)
+        if match:
+            (timestamp, connid, opnum, errnum) = match.groups()
+            conn = getconn(connid)
+            logmsg = conn.addres(timestamp, opnum, errnum)
+            if logmsg:
+                logfailure(conn, logmsg, timestamp)
         return True
 
-    # is this an SSL info line?
-    match = regex_sslinfo.match(line)
-    if match:
-        (connid, sslinfo) = match.groups()
-        if connid in conns:
-            conns[connid].addssl(sslinfo)
+    # is this a new conn line?
+    if ' connection from ' in line:
+        match = regex_new_conn.match(line)
+        if match:
+            (timestamp, connid, fdid, slotid, ip) = match.groups()
+            conns.new(timestamp, connid, fdid, slotid, ip)
         return True
 
-    # is this a line with extra SSL mapping info?
-    match = regex_ssl_map_fail.match(line)
-    if match:
-        (connid, sslinfo) = match.groups()
-        if connid in conns:
-            conns[connid].addssl(sslinfo)
+    # is this a closed line?
+    if ' closed' in line:
+        match = regex_closed.match(line)
+        if match:
+            (timestamp, connid, opid) = match.groups()
+            conns.remove(connid)
         return True
 
-    # is this a REQUEST line?
-    match = regex_bind_req.match(line)
-    if match:
-        (timestamp, connid, opnum, dn, method, mech) = match.groups()
-        # should have seen new conn line - if not, have to create a dummy one
-        conn = conns.get(connid, Conn('unknown', connid, '', '', 'unknown'))
-        logmsg = conn.addreq(timestamp, opnum, dn, method, mech)
-        if logmsg:
-            logf.write(logmsg + "\n")
-            logf.flush()
+    # is this an UNBIND line?
+    if ' UNBIND' in line:
+        match = regex_unbind.match(line)
+        if match:
+            conns.remove(match.group(1))
         return True
 
-    # is this a RESULT line?
-    match = regex_bind_res.match(line)
-    if match:
-        (timestamp, connid, opnum, errnum) = match.groups()
-        # should have seen new conn line - if not, have to create a dummy one
-        conn = conns.get(connid, Conn('unknown', connid, '', '', 'unknown'))
-        logmsg = conn.addres(timestamp, opnum, errnum)
-        if logmsg:
-            logf.write(logmsg + "\n")
-            logf.flush()
+    # is this an SSL info line, or a line with extra SSL mapping info?
+    if ' SSL ' in line:
+        match = regex_sslinfo.match(line) or regex_ssl_map_fail.match(line)
+        if match:
+            (connid, sslinfo) = match.groups()
+            conn = conns.get(connid)
+            if conn is not None:
+                conn.addssl(sslinfo)
         return True
 
     return True # no match
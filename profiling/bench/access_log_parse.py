@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Measure access log parsing throughput, in lines/sec.
+
+Compares the historical regex + dateutil parser of DirsrvAccessLog with the
+single pass tokenizer in lib389.dirsrv_log, on a generated log:
+
+    python3 profiling/bench/access_log_parse.py --lines 2000000
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+from dateutil.parser import parse as dt_parse
+from lib389.dirsrv_log import MONTH_LOOKUP, parse_access_line
+
+TEMPLATE = [
+    '[{ts}.{ns:09d} +1000] conn={conn} fd=64 slot=64 connection from 10.0.0.{ip} to 10.0.0.1\n',
+    '[{ts}.{ns:09d} +1000] conn={conn} op=0 BIND dn="uid=user{conn},ou=people,dc=example,dc=com" method=128 version=3\n',
+    '[{ts}.{ns:09d} +1000] conn={conn} op=0 RESULT err=0 tag=97 nentries=0 etime=0.000120 dn="uid=user{conn},ou=people,dc=example,dc=com"\n',
+    '[{ts}.{ns:09d} +1000] conn={conn} op=1 SRCH base="dc=example,dc=com" scope=2 filter="(uid=user{conn})" attrs=ALL\n',
+    '[{ts}.{ns:09d} +1000] conn={conn} op=1 RESULT err=0 tag=101 nentries=1 etime=0.000300 notes=U\n',
+    '[{ts}.{ns:09d} +1000] conn={conn} op=2 UNBIND\n',
+    '[{ts}.{ns:09d} +1000] conn={conn} op=2 fd=64 closed - U1\n',
+]
+
+
+class LegacyParser(object):
+    """The parser DirsrvAccessLog used before the tokenizer"""
+    def __init__(self):
+        self.prog_timestamp = re.compile(r'\[(?P<day>\d*)\/(?P<month>\w*)\/(?P<year>\d*):(?P<hour>\d*):(?P<minute>\d*):(?P<second>\d*)(.(?P<nanosecond>\d*))+\s(?P<tz>[\+\-]\d*)')   # noqa
+        self.prog_m1 = re.compile(r'^(?P<timestamp>\[.*\])\sconn=(?P<conn>\d*)\sop=(?P<op>\d*)\s(?P<action>\w*)\s(?P<rem>.*)')
+        self.prog_con = re.compile(r'^(?P<timestamp>\[.*\])\sconn=(?P<conn>\d*)\sfd=(?P<fd>\d*)\sslot=(?P<slot>\d*)\sconnection\sfrom\s(?P<remote>[^\s]*)\sto\s(?P<local>[^\s]*)')
+        self.prog_discon = re.compile(r'^(?P<timestamp>\[.*\])\sconn=(?P<conn>\d*)\sop=(?P<op>\d*)\sfd=(?P<fd>\d*)\s(?P<action>closed)\s-\s(?P<status>\w*)')
+        self.prog_notes = re.compile(r'err=(?P<err>\d*)\stag=(?P<tag>\d*)\snentries=(?P<nentries>\d*)\setime=(?P<etime>[0-9.]*)\snotes=(?P<notes>\w*)')
+        self.prog_repl = re.compile(r'err=(?P<err>\d*)\stag=(?P<tag>\d*)\snentries=(?P<nentries>\d*)\setime=(?P<etime>[0-9.]*)\scsn=(?P<csn>\w*)')
+        self.prog_result = re.compile(r'err=(?P<err>\d*)\stag=(?P<tag>\d*)\snentries=(?P<nentries>\d*)\setime=(?P<etime>[0-9.]*)\s(?P<rem>.*)')
+        self.full_regexs = [self.prog_m1, self.prog_con, self.prog_discon]
+        self.result_regexs = [self.prog_notes, self.prog_repl, self.prog_result]
+
+    def parse_timestamp(self, ts):
+        timedata = self.prog_timestamp.match(ts).groupdict()
+        dt_str = '{YEAR}-{MONTH}-{DAY} {HOUR}-{MINUTE}-{SECOND} {TZ}'.format(
+            YEAR=timedata['year'], MONTH=MONTH_LOOKUP[timedata['month']], DAY=timedata['day'],
+            HOUR=timedata['hour'], MINUTE=timedata['minute'], SECOND=timedata['second'], TZ=timedata['tz'])
+        dt = dt_parse(dt_str)
+        if timedata['nanosecond']:
+            dt = dt.replace(microsecond=int(int(timedata['nanosecond']) / 1000))
+        return dt
+
+    def parse_line(self, line):
+        line = line.strip()
+        action = {'action': 'CONNECT'}
+        for regex in self.full_regexs:
+            result = regex.match(line)
+            if result:
+                action.update(result.groupdict())
+                if regex == self.prog_discon:
+                    action['action'] = 'DISCONNECT'
+                break
+        if action['action'] == 'RESULT':
+            for regex in self.result_regexs:
+                result = regex.match(action['rem'])
+                if result:
+                    action.update(result.groupdict())
+                    break
+        if 'timestamp' in action:
+            action['datetime'] = self.parse_timestamp(action['timestamp'])
+        return action
+
+
+def generate(path, lines):
+    with open(path, 'w') as f:
+        written = 0
+        conn = 0
+        while written < lines:
+            conn += 1
+            second = conn // 50
+            ts = '27/Apr/2016:%02d:%02d:%02d' % ((second // 3600) % 24, (second // 60) % 60, second % 60)
+            for ns, template in enumerate(TEMPLATE):
+                f.write(template.format(ts=ts, ns=ns * 1000, conn=conn, ip=conn % 250))
+            written += len(TEMPLATE)
+    return written
+
+
+def measure(name, path, parse):
+    start = time.monotonic()
+    count = 0
+    with open(path, 'r') as f:
+        for line in f:
+            parse(line)
+            count += 1
+    elapsed = time.monotonic() - start
+    print('%-32s %10d lines %8.2fs %12.0f lines/sec' % (name, count, elapsed, count / elapsed))
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=2000000, help="Number of log lines to generate")
+    parser.add_argument('--legacy-lines', type=int, default=None,
+                        help="Only parse this many lines with the (slow) legacy parser")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'access')
+        legacy_path = os.path.join(tmpdir, 'access.legacy')
+        generate(path, args.lines)
+        generate(legacy_path, args.legacy_lines or args.lines)
+
+        legacy = LegacyParser()
+        before = measure('regex + dateutil (before)', legacy_path, legacy.parse_line)
+        after = measure('tokenizer + datetime (after)', path,
+                        lambda line: parse_access_line(line).datetime)
+        measure('tokenizer only', path, parse_access_line)
+        print('speedup: %.1fx' % (after / before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Measure the overhead of DirSrv on search_ext_s round trips.
+
+Runs the same base search over the LDAPI socket of a local instance, with a
+plain python-ldap connection and with a DirSrv, both bound with SASL
+EXTERNAL. The difference is what the method wrappers of DirSrv, and the
+Entry conversion of the results, add to each call:
+
+    PYTHONPATH=src/lib389 python3 profiling/bench/dirsrv_dispatch.py --instance localhost --calls 20000
+"""
+
+import argparse
+import time
+import ldap
+from lib389.pool import connect
+from lib389.utils import get_ldapurl_from_serverid
+
+
+def measure(search, base, attrs, calls):
+    """Return the seconds per call of search, after a warm up"""
+    for _ in range(min(calls, 1000)):
+        search(base, ldap.SCOPE_BASE, '(objectClass=*)', attrs)
+    start = time.perf_counter()
+    for _ in range(calls):
+        search(base, ldap.SCOPE_BASE, '(objectClass=*)', attrs)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--instance', required=True, help="The server ID of a local instance with LDAPI autobind")
+    parser.add_argument('--calls', type=int, default=20000, help="Number of searches per run")
+    parser.add_argument('--base', default='', help="The entry to read, the root DSE by default")
+    parser.add_argument('--attrs', nargs='*', default=['1.1'], help="The attributes to read")
+    args = parser.parse_args()
+
+    uri, _ = get_ldapurl_from_serverid(args.instance)
+    if uri is None or not uri.startswith('ldapi://'):
+        parser.error('Instance %s has no LDAPI autobind socket' % args.instance)
+
+    raw = ldap.initialize(uri)
+    raw.sasl_non_interactive_bind_s('EXTERNAL')
+    inst = connect(uri, saslmethod='EXTERNAL', serverid=args.instance)
+
+    def dirsrv_search(base, scope, filterstr, attrlist):
+        return inst.search_ext_s(base, scope, filterstr, attrlist, escapehatch='i am sure')
+
+    raw_call = measure(raw.search_ext_s, args.base, args.attrs, args.calls)
+    dirsrv_call = measure(dirsrv_search, args.base, args.attrs, args.calls)
+    print(f"python-ldap: {raw_call * 1e6:8.1f} us/call, {1 / raw_call:,.0f} calls/sec")
+    print(f"     DirSrv: {dirsrv_call * 1e6:8.1f} us/call, {1 / dirsrv_call:,.0f} calls/sec")
+    print(f"   overhead: {(dirsrv_call - raw_call) * 1e6:8.1f} us/call")
+    raw.unbind_s()
+    inst.close()
+
+
+if __name__ == '__main__':
+    main()
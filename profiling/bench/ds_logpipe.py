@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Measure how fast ds-logpipe drains its named pipe, in lines/sec.
+
+Writes a generated access log into the pipe as fast as the reader takes it,
+the way the server does during a burst, and reports the time the writer was
+held up. Extra arguments are passed to ds-logpipe, to measure a plugin:
+
+    python3 profiling/bench/ds_logpipe.py --lines 2000000
+    python3 profiling/bench/ds_logpipe.py -- --plugin=ldap/admin/src/scripts/failedbinds.py \\
+        failedbinds.logfile=/tmp/failedbinds.log
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+LOGPIPE = os.path.join(os.path.dirname(__file__), '..', '..', 'ldap', 'admin', 'src', 'scripts', 'ds-logpipe.py')
+
+TEMPLATE = [
+    '[27/Apr/2016:12:49:49.726093186 +1000] conn={conn} fd=64 slot=64 connection from 10.0.0.{ip} to 10.0.0.1\n',
+    '[27/Apr/2016:12:49:49.726093186 +1000] conn={conn} op=0 BIND dn="uid=user{conn},ou=people,dc=example,dc=com" method=128 version=3\n',
+    '[27/Apr/2016:12:49:49.726093186 +1000] conn={conn} op=0 RESULT err={err} tag=97 nentries=0 etime=0.000120\n',
+    '[27/Apr/2016:12:49:49.726093186 +1000] conn={conn} op=1 SRCH base="dc=example,dc=com" scope=2 filter="(uid=user{conn})" attrs=ALL\n',
+    '[27/Apr/2016:12:49:49.726093186 +1000] conn={conn} op=1 RESULT err=0 tag=101 nentries=1 etime=0.000300\n',
+    '[27/Apr/2016:12:49:49.726093186 +1000] conn={conn} op=2 UNBIND\n',
+    '[27/Apr/2016:12:49:49.726093186 +1000] conn={conn} op=2 fd=64 closed - U1\n',
+]
+
+
+def generate(lines):
+    data = []
+    conn = 0
+    while len(data) < lines:
+        conn += 1
+        for template in TEMPLATE:
+            data.append(template.format(conn=conn, ip=conn % 250, err=49 if conn % 3 == 0 else 0))
+    return ''.join(data[:lines]).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=1000000, help="Number of lines written to the pipe")
+    parser.add_argument('--script', default=LOGPIPE, help="The ds-logpipe.py to measure")
+    parser.add_argument('logpipe_args', nargs='*', help="Arguments passed to ds-logpipe")
+    args = parser.parse_args()
+
+    data = generate(args.lines)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pipe = os.path.join(tmpdir, 'access')
+        os.mkfifo(pipe)
+        # With a server pid, ds-logpipe exits once the pipe is closed.
+        proc = subprocess.Popen([sys.executable, args.script, pipe, '--serverpid', str(os.getpid())] +
+                                args.logpipe_args, stdout=subprocess.PIPE, universal_newlines=True)
+        with open(pipe, 'wb') as out:
+            start = time.perf_counter()
+            out.write(data)
+        written = time.perf_counter() - start
+        output, _ = proc.communicate()
+        drained = time.perf_counter() - start
+
+    for line in output.splitlines():
+        if line.startswith('Read ') or line.startswith('Processed '):
+            print(line)
+    print(f"{args.lines} lines written in {written:.2f}s, drained in {drained:.2f}s: "
+          f"{args.lines / drained:,.0f} lines/sec")
+
+
+if __name__ == '__main__':
+    main()
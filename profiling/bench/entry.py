@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Compare the memory and speed of lib389 Entry and CompactEntry.
+
+Builds both from the same generated search results, shaped like the ones of
+python-ldap, keeps them all alive like a large search does, and reads a few
+attributes of each:
+
+    PYTHONPATH=src/lib389 python3 profiling/bench/entry.py --entries 200000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from lib389._entry import CompactEntry, Entry
+
+
+def generate(entries):
+    """Search results of users, as python-ldap returns them"""
+    results = []
+    for i in range(entries):
+        uid = 'user%d' % i
+        results.append(('uid=%s,ou=People,dc=example,dc=com' % uid, {
+            'objectClass': [b'top', b'person', b'organizationalPerson', b'inetOrgPerson', b'nsAccount'],
+            'uid': [uid.encode()],
+            'cn': [b'User %d' % i],
+            'sn': [b'%d' % i],
+            'mail': [b'%s@example.com' % uid.encode()],
+            'uidNumber': [b'%d' % (1000 + i)],
+            'gidNumber': [b'1000'],
+            'homeDirectory': [b'/home/%s' % uid.encode()],
+            'nsUniqueId': [b'%08x-00000000-00000000-00000000' % i],
+        }))
+    return results
+
+
+def measure(cls, results):
+    """Return the seconds to build the entries, to read them, and the memory they hold"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    entries = [cls(r) for r in results]
+    built = time.perf_counter() - start
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for e in entries:
+        e.getValue('uid')
+        e.getValues('objectclass')
+        e.hasAttr('mail')
+    read = time.perf_counter() - start
+    return built, read, held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=200000, help="Number of entries")
+    args = parser.parse_args()
+
+    results = generate(args.entries)
+    for cls in (Entry, CompactEntry):
+        built, read, held = measure(cls, results)
+        print(f"{cls.__name__:>12}: built {args.entries / built:,.0f} entries/sec, "
+              f"read {args.entries / read:,.0f} entries/sec, "
+              f"{held / args.entries:,.0f} bytes/entry over the raw results")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Measure the throughput and memory of the ds-logpipe failedbinds plugin.
+
+Feeds a generated access log to the plugin, where a share of the clients
+never close their connection, and reports the lines and operations handled
+per second, and the size of the connection table at the end:
+
+    python3 profiling/bench/failedbinds.py --conns 200000
+"""
+
+import argparse
+import importlib.util
+import os
+import tempfile
+import time
+import tracemalloc
+
+PLUGIN = os.path.join(os.path.dirname(__file__), '..', '..', 'ldap', 'admin', 'src', 'scripts', 'failedbinds.py')
+
+TS = '[27/Apr/2016:12:49:49.726093186 +1000]'
+
+
+def generate(conns, leak_every):
+    """Yield the lines of conns connections. Every leak_every-th one never
+    closes, and every third bind fails."""
+    for conn in range(conns):
+        slot = 64 + conn % 4096
+        yield f'{TS} conn={conn} fd={slot} slot={slot} connection from 10.0.{conn % 250}.{conn % 200} to 10.0.0.1\n'
+        err = 49 if conn % 3 == 0 else 0
+        yield f'{TS} conn={conn} op=0 BIND dn="uid=user{conn},ou=people,dc=example,dc=com" method=128 version=3\n'
+        yield f'{TS} conn={conn} op=0 RESULT err={err} tag=97 nentries=0 etime=0.000120\n'
+        yield f'{TS} conn={conn} op=1 SRCH base="dc=example,dc=com" scope=2 filter="(uid=user{conn})" attrs=ALL\n'
+        yield f'{TS} conn={conn} op=1 RESULT err=0 tag=101 nentries=1 etime=0.000300\n'
+        if conn % leak_every:
+            yield f'{TS} conn={conn} op=2 UNBIND\n'
+            yield f'{TS} conn={conn} op=2 fd={slot} closed - U1\n'
+
+
+def run(lines, maxconns):
+    """Feed the lines to a freshly loaded plugin, return the time it took and the plugin"""
+    spec = importlib.util.spec_from_file_location('failedbinds', PLUGIN)
+    plugin = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(plugin)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        plugin.pre({'logfile': os.path.join(tmpdir, 'failedbinds.log'), 'maxconns': str(maxconns)})
+        start = time.perf_counter()
+        for line in lines:
+            plugin.plugin(line)
+        elapsed = time.perf_counter() - start
+        plugin.post()
+    return elapsed, plugin
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--conns', type=int, default=200000, help="Number of connections in the log")
+    parser.add_argument('--leak-every', type=int, default=2, help="One connection in N is never closed")
+    parser.add_argument('--maxconns', type=int, default=10000, help="The failedbinds.maxconns argument")
+    args = parser.parse_args()
+
+    lines = list(generate(args.conns, args.leak_every))
+    ops = sum(1 for line in lines if ' op=' in line and ' RESULT ' not in line)
+    elapsed, plugin = run(lines, args.maxconns)
+    print(f"{len(lines)} lines, {ops} operations in {elapsed:.2f}s")
+    print(f"{len(lines) / elapsed:,.0f} lines/sec, {ops / elapsed:,.0f} ops/sec")
+    print(f"{len(plugin.conns)} connections tracked, {plugin.conns.evicted} evicted")
+
+    # Tracing slows the plugin down a lot, so memory is measured on its own run
+    tracemalloc.start()
+    run(lines, args.maxconns)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"peak traced memory {peak / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -36,6 +36,7 @@ import shutil
 from datetime import datetime
 import logging
 import glob
+import importlib
 import tarfile
 import subprocess
 from collections.abc import Callable
@@ -97,11 +98,51 @@ DEBUGGING = os.getenv('DEBUGGING', default=False)
 logger = logging.getLogger(__name__)
 
 
-# Initiate the paths object here. Should this be part of the DirSrv class
-# for submodules?
+# The SimpleLDAPObject methods that are deprecated outside of lib389. Calling
+# them warns, unless escapehatch='i am sure' is given.
+_DEPRECATED_METHODS = frozenset([
+    'add_s',
+    'bind_s',
+    'delete_s',
+    'modify_s',
+    'modrdn_s',
+    'rename_s',
+    'sasl_interactive_bind_s',
+    'search_s',
+    'search_ext_s',
+    'simple_bind_s',
+    'unbind_s',
+])
+
+# The methods taking an Entry in place of the dn and modlist
+_ENTRY_ARG_METHODS = frozenset(['add', 'add_s', 'add_ext', 'add_ext_s'])
+
+# The methods python-ldap calls internally for each operation. Their wrapper
+# only drops escapehatch, so the hops of search_ext_s and the others cost as
+# little as possible.
+_PASSTHROUGH_METHODS = frozenset([
+    'get_option',
+    'result2',
+    'result3',
+    'result4',
+    'search_ext',
+    'set_option',
+])
+
+
+def _wrapped_methods(cls):
+    """Get the names of the methods of cls that DirSrv wraps. This only
+    depends on the class, so it's computed once rather than per instance."""
+    return tuple(name for name in dir(cls)
+                 if not name.startswith('_') and isinstance(getattr(cls, name), Callable))
+
+
+_WRAPPED_METHODS = _wrapped_methods(SimpleLDAPObject)
+
+
 def wrapper(f, name):
     """
-    Wrapper of all superclass methods using lib389.Entry.
+    Wrapper of the superclass methods using lib389.Entry.
         @param f - DirSrv method inherited from SimpleLDAPObject
         @param name - method to call
 
@@ -109,77 +150,75 @@ def wrapper(f, name):
     DirSrv.  Perhaps there is some way to do this with the new classmethod
     or staticmethod of 2.4.
 
-    We replace every call to a method in SimpleLDAPObject (the superclass
-    of DirSrv) with a call to inner.  The f argument to wrapper is the bound
+    We replace calls to the methods of SimpleLDAPObject (the superclass
+    of DirSrv) with calls to inner.  The f argument to wrapper is the bound
     method of DirSrv (which is inherited from the superclass).  Bound means
     that it will implicitly be called with the self argument, it is not in
     the args list.  name is the name of the method to call.  If name is a
     method that returns entry objects (e.g. result), we wrap the data returned
     by an Entry class.  If name is a method that takes an entry argument, we
     extract the raw data from the entry object to pass in.
+
+    The inner function is picked once per method, so that a call only does
+    the work its method needs, and the methods in _PASSTHROUGH_METHODS are
+    called as they are.
     """
-    def inner(*args, **kwargs):
-        if name in [
-            'add_s',
-            'bind_s',
-            'delete_s',
-            'modify_s',
-            'modrdn_s',
-            'rename_s',
-            'sasl_interactive_bind_s',
-            'search_s',
-            'search_ext_s',
-            'simple_bind_s',
-            'unbind_s',
-            'getEntry',
-        ] and not ('escapehatch' in kwargs and kwargs['escapehatch'] == 'i am sure'):
-            c_stack = inspect.stack()
-            frame = c_stack[1]
-
-            warnings.warn(DeprecationWarning("Use of raw ldap function %s. This will be removed in a future release. "
-                                             "Found in: %s:%s" % (name, frame.filename, frame.lineno)))
-            # Later, we will add a sleep here to make it even more painful.
-            # Finally, it will raise an exception.
-        elif 'escapehatch' in kwargs:
-            kwargs.pop('escapehatch')
-
-        if name == 'result':
+    if name.startswith('_'):
+        return f
+
+    if name in _PASSTHROUGH_METHODS:
+        def inner(*args, escapehatch=None, **kwargs):
+            return f(*args, **kwargs)
+        return inner
+
+    if name == 'result':
+        def inner(*args, escapehatch=None, **kwargs):
             objtype, data = f(*args, **kwargs)
             # data is either a 2-tuple or a list of 2-tuples
-            # print data
             if data:
                 if isinstance(data, tuple):
                     return objtype, Entry(data)
                 elif isinstance(data, list):
-                    # AD sends back these search references
-                    # if objtype == ldap.RES_SEARCH_RESULT and \
-                    #    isinstance(data[-1],tuple) and \
-                    #    not data[-1][0]:
-                    #     print "Received search reference: "
-                    #     pprint.pprint(data[-1][1])
-                    #     data.pop() # remove the last non-entry element
-
                     return objtype, [Entry(x) for x in data]
                 else:
                     raise TypeError("unknown data type %s returned by result" %
                                     type(data))
             else:
                 return objtype, data
-        elif name.startswith('add'):
-            # the first arg is self
-            # the second and third arg are the dn and the data to send
-            # We need to convert the Entry into the format used by
-            # python-ldap
-            ent = args[0]
-            if isinstance(ent, Entry):
-                return f(ent.dn, ent.toTupleList(), *args[2:])
-            else:
-                return f(*args, **kwargs)
-        else:
+        return inner
+
+    deprecated = name in _DEPRECATED_METHODS
+    if name in _ENTRY_ARG_METHODS:
+        def inner(*args, escapehatch=None, **kwargs):
+            if deprecated and escapehatch != 'i am sure':
+                _warn_raw_call(name)
+            # The first arg is the dn, or an Entry to convert into the dn
+            # and data used by python-ldap
+            if args and isinstance(args[0], Entry):
+                ent = args[0]
+                return f(ent.dn, ent.toTupleList(), *args[1:], **kwargs)
+            return f(*args, **kwargs)
+    elif deprecated:
+        def inner(*args, escapehatch=None, **kwargs):
+            if escapehatch != 'i am sure':
+                _warn_raw_call(name)
+            return f(*args, **kwargs)
+    else:
+        def inner(*args, escapehatch=None, **kwargs):
             return f(*args, **kwargs)
     return inner
 
 
+def _warn_raw_call(name):
+    # Our caller is the inner function of wrapper, the frame to report is
+    # the one that called it.
+    frame = inspect.stack()[2]
+    warnings.warn(DeprecationWarning("Use of raw ldap function %s. This will be removed in a future release. "
+                                     "Found in: %s:%s" % (name, frame.filename, frame.lineno)))
+    # Later, we will add a sleep here to make it even more painful.
+    # Finally, it will raise an exception.
+
+
 def pid_exists(pid):
     if not pid:
         return False
@@ -269,6 +308,42 @@ def _ds_shutil_copytree(src, dst, symlinks=False, ignore=None, copy_function=cop
     return dst
 
 
+class _Broker(object):
+    """A manager attribute of DirSrv, like inst.config. Importing and making
+    all of them on each open() costs more than most dsconf commands, so each
+    is made when it's first used, and then kept in the instance dict. As
+    before, they only exist once the instance was opened.
+
+    :param module: The module of the manager class
+    :type module: str
+    :param name: The name of the manager class
+    :type name: str
+    """
+
+    def __init__(self, module, name):
+        self._module = module
+        self._name = name
+        self._attr = None
+
+    def __set_name__(self, owner, attr):
+        self._attr = attr
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if not instance.__dict__.get('_brokers_enabled', False):
+            raise AttributeError("'%s' object has no attribute '%s'" % (owner.__name__, self._attr))
+        manager = getattr(importlib.import_module(self._module), self._name)(instance)
+        instance.__dict__[self._attr] = manager
+        return manager
+
+    @staticmethod
+    def names(cls):
+        """Get the names of the manager attributes of cls"""
+        return [name for klass in cls.__mro__ for name, attr in vars(klass).items()
+                if isinstance(attr, _Broker)]
+
+
 class DirSrv(SimpleLDAPObject, object):
 
     def __initPart2(self):
@@ -313,58 +388,43 @@ class DirSrv(SimpleLDAPObject, object):
         # self.start_tls_s()
         self.simple_bind_s(ensure_str(self.binddn), self.bindpw, escapehatch='i am sure')
 
+    # The managers of the instance, imported and made on first use once it
+    # is open, see _Broker.
+    # Need updating
+    agreement = _Broker('lib389.agreement', 'AgreementLegacy')
+    replica = _Broker('lib389.replica', 'ReplicaLegacy')
+    backend = _Broker('lib389.backend', 'BackendLegacy')
+    config = _Broker('lib389.config', 'Config')
+    index = _Broker('lib389.index', 'IndexLegacy')
+    mappingtree = _Broker('lib389.mappingTree', 'MappingTreeLegacy')
+    suffix = _Broker('lib389.suffix', 'Suffix')
+    schema = _Broker('lib389.schema', 'SchemaLegacy')
+    plugins = _Broker('lib389.plugins', 'Plugins')
+    tasks = _Broker('lib389.tasks', 'Tasks')
+    saslmap = _Broker('lib389.saslmap', 'SaslMapping')
+    pwpolicy = _Broker('lib389.pwpolicy', 'PwPolicyManager')
+    # Do we have a certdb path?
+    # if MAJOR < 3:
+    monitor = _Broker('lib389.monitor', 'Monitor')
+    monitorldbm = _Broker('lib389.monitor', 'MonitorLDBM')
+    rootdse = _Broker('lib389.rootdse', 'RootDSE')
+    backends = _Broker('lib389.backend', 'Backends')
+    mappingtrees = _Broker('lib389.mappingTree', 'MappingTrees')
+    replicas = _Broker('lib389.replica', 'Replicas')
+    aci = _Broker('lib389.aci', 'Aci')
+    rsa = _Broker('lib389.config', 'RSA')
+    encryption = _Broker('lib389.config', 'Encryption')
+    ds_access_log = _Broker('lib389.dirsrv_log', 'DirsrvAccessLog')
+    ds_error_log = _Broker('lib389.dirsrv_log', 'DirsrvErrorLog')
+    ldclt = _Broker('lib389.ldclt', 'Ldclt')
+    saslmaps = _Broker('lib389.saslmap', 'SaslMappings')
+
     def __add_brookers__(self):
-        from lib389.config import Config
-        from lib389.aci import Aci
-        from lib389.config import RSA
-        from lib389.config import Encryption
-        from lib389.dirsrv_log import DirsrvAccessLog, DirsrvErrorLog
-        from lib389.ldclt import Ldclt
-        from lib389.mappingTree import MappingTrees
-        from lib389.mappingTree import MappingTreeLegacy as MappingTree
-        from lib389.backend import Backends
-        from lib389.backend import BackendLegacy as Backend
-        from lib389.suffix import Suffix
-        from lib389.replica import ReplicaLegacy as Replica
-        from lib389.replica import Replicas
-        from lib389.agreement import AgreementLegacy as Agreement
-        from lib389.schema import SchemaLegacy as Schema
-        from lib389.plugins import Plugins
-        from lib389.tasks import Tasks
-        from lib389.index import IndexLegacy as Index
-        from lib389.monitor import Monitor, MonitorLDBM
-        from lib389.rootdse import RootDSE
-        from lib389.saslmap import SaslMapping, SaslMappings
-        from lib389.pwpolicy import PwPolicyManager
-
-        # Need updating
-        self.agreement = Agreement(self)
-        self.replica = Replica(self)
-        self.backend = Backend(self)
-        self.config = Config(self)
-        self.index = Index(self)
-        self.mappingtree = MappingTree(self)
-        self.suffix = Suffix(self)
-        self.schema = Schema(self)
-        self.plugins = Plugins(self)
-        self.tasks = Tasks(self)
-        self.saslmap = SaslMapping(self)
-        self.pwpolicy = PwPolicyManager(self)
-        # Do we have a certdb path?
-        # if MAJOR < 3:
-        self.monitor = Monitor(self)
-        self.monitorldbm = MonitorLDBM(self)
-        self.rootdse = RootDSE(self)
-        self.backends = Backends(self)
-        self.mappingtrees = MappingTrees(self)
-        self.replicas = Replicas(self)
-        self.aci = Aci(self)
-        self.rsa = RSA(self)
-        self.encryption = Encryption(self)
-        self.ds_access_log = DirsrvAccessLog(self)
-        self.ds_error_log = DirsrvErrorLog(self)
-        self.ldclt = Ldclt(self)
-        self.saslmaps = SaslMappings(self)
+        # Forget the managers made for a previous connection, they are made
+        # again when they are used.
+        for name in _Broker.names(type(self)):
+            self.__dict__.pop(name, None)
+        self._brokers_enabled = True
 
     def __init__(self, verbose=False, external_log=None):
         """
@@ -908,7 +968,7 @@ class DirSrv(SimpleLDAPObject, object):
         self.state = DIRSRV_STATE_ALLOCATED
 
     def open(self, uri=None, saslmethod=None, sasltoken=None, certdir=None, starttls=False, connOnly=False, reqcert=None,
-                usercert=None, userkey=None):
+                usercert=None, userkey=None, timeout=None):
         '''
             It opens a ldap bound connection to dirsrv so that online
             administrative tasks are possible.  It binds with the binddn
@@ -921,6 +981,8 @@ class DirSrv(SimpleLDAPObject, object):
             @param saslmethod - None, or GSSAPI
             @param sasltoken - The ldap.sasl token type to bind with.
             @param certdir - Certificate directory for TLS
+            @param timeout - Seconds to wait for the server to connect, and
+                             to answer each operation, None to wait for ever
             @return None
 
             @raise LDAPError
@@ -939,6 +1001,10 @@ class DirSrv(SimpleLDAPObject, object):
         else:
             super(DirSrv, self).__init__(uri, trace_level=TRACE_LEVEL)
 
+        if timeout is not None:
+            self.set_option(ldap.OPT_NETWORK_TIMEOUT, timeout)
+            self.set_option(ldap.OPT_TIMEOUT, timeout)
+
         if certdir is None and self.isLocal:
             certdir = self.get_cert_dir()
             self.log.debug("Using dirsrv ca certificate %s", certdir)
@@ -1032,6 +1098,9 @@ class DirSrv(SimpleLDAPObject, object):
         self.log.debug("open(): bound as %s", self.binddn)
         if not connOnly and self.isLocal:
             self.__initPart2()
+        # The server may have been reconfigured or restarted since the paths
+        # were last read online
+        self.ds_paths.invalidate()
         self.state = DIRSRV_STATE_ONLINE
         # Now that we're online, some of our methods may try to query the version online.
         self.__add_brookers__()
@@ -1067,6 +1136,8 @@ class DirSrv(SimpleLDAPObject, object):
 
             @raise ValueError
         '''
+        # The configuration may have been edited while the server was down
+        self.ds_paths.invalidate()
         if not self.isLocal:
             self.log.error("This is a remote instance!")
             input('Press Enter when the instance has started ...')
@@ -1218,6 +1289,8 @@ class DirSrv(SimpleLDAPObject, object):
             @raise ValueError
         '''
         self.stop(timeout)
+        # Changes to the configuration are applied by the restart
+        self.ds_paths.invalidate()
         time.sleep(1)
         self.start(timeout, post_open)
 
@@ -1721,14 +1794,12 @@ class DirSrv(SimpleLDAPObject, object):
                                     "I cannot search it", dn)
 
     def __wrapmethods(self):
-        """This wraps all methods of SimpleLDAPObject, so that we can intercept
+        """This wraps the methods of SimpleLDAPObject, so that we can intercept
         the methods that deal with entries.  Instead of using a raw list of
         tuples of lists of hashes of arrays as the entry object, we want to
         wrap entries in an Entry class that provides some useful methods"""
-        for name in dir(self.__class__.__bases__[0]):
-            attr = getattr(self, name)
-            if isinstance(attr, Callable):
-                setattr(self, name, wrapper(attr, name))
+        for name in _WRAPPED_METHODS:
+            setattr(self, name, wrapper(getattr(self, name), name))
 
     def addLDIF(self, input_file, cont=False):
         class LDIFAdder(ldif.LDIFParser):
@@ -390,6 +390,154 @@ class Entry(object):
         return self.acis
 
 
+# The attribute names of the compact entries are shared by all of them: the
+# lowercase form of each name, and the case it was first seen in.
+_attr_lower = {}
+_attr_case = {}
+
+
+def _lower_attr(name):
+    lname = _attr_lower.get(name)
+    if lname is None:
+        lname = sys.intern(name.lower())
+        _attr_lower[sys.intern(name)] = lname
+        _attr_case.setdefault(lname, name)
+    return lname
+
+
+class CompactEntry(object):
+    """A read-only search result entry, with the getValue(s)/hasAttr API of
+    Entry, for the searches returning many entries.
+
+    An Entry copies the attributes into a cidict, which holds two dicts per
+    entry. A CompactEntry keeps the value lists of python-ldap as they are,
+    in a single dict keyed by the interned lowercase attribute names. The
+    values stay the raw bytes until they are read, getValueUtf8() decodes on
+    access.
+
+    :param entrydata: The (dn, attributes) tuple of python-ldap, or
+                      (None, reference) for a continuation reference
+    :type entrydata: tuple
+    """
+
+    __slots__ = ('dn', 'ref', '_values')
+
+    def __init__(self, entrydata):
+        dn, attrs = entrydata
+        self.dn = dn
+        if dn is None:
+            self.ref = attrs
+            self._values = {}
+        else:
+            self.ref = None
+            self._values = {_lower_attr(k): v for k, v in attrs.items()}
+
+    def __bool__(self):
+        return len(self._values) > 0
+
+    def __eq__(self, other):
+        """Compare the DN and the values, like Entry.__eq__()"""
+        if not isinstance(other, (Entry, CompactEntry)):
+            return False
+        if self.dn != other.dn:
+            return False
+        if set(a.lower() for a in self.getAttrs()) != set(a.lower() for a in other.getAttrs()):
+            return False
+        for key in self.getAttrs():
+            if set(self.getValues(key)) != set(other.getValues(key)):
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __getitem__(self, name):
+        return self.getValue(name)
+
+    def __getattr__(self, name):
+        """Return the first value of the attribute name, as Entry does"""
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self.getValue(name)
+
+    def hasAttr(self, name):
+        """Return True if this entry has an attribute named name"""
+        return ensure_str(name).lower() in self._values
+
+    def getValues(self, name):
+        """Get the list of values of the attribute named name"""
+        return self._values.get(name.lower(), [])
+
+    def getValue(self, name):
+        """Get the first value of the attribute named name, or None"""
+        vals = self._values.get(name.lower())
+        return vals[0] if vals else None
+
+    def getValuesUtf8(self, name):
+        """Get the values of the attribute named name, decoded"""
+        return [ensure_str(v) for v in self.getValues(name)]
+
+    def getValueUtf8(self, name):
+        """Get the first value of the attribute named name, decoded, or None"""
+        val = self.getValue(name)
+        return ensure_str(val) if val is not None else None
+
+    def getValuesSet(self, keys):
+        """Returns a dict of the values of each of keys"""
+        return {k: self.getValues(k) for k in keys}
+
+    def hasValue(self, name, val=None):
+        """True if the given attribute is present and has the given value"""
+        if not self.hasAttr(name):
+            return False
+        if not val:
+            return True
+        if isinstance(val, (list, tuple)):
+            return list(val) == self.getValues(name)
+        return ensure_bytes(val) in self.getValues(name)
+
+    def hasValueCase(self, name, val):
+        """True if the given attribute has the given value, ignoring case"""
+        if not self.hasAttr(name):
+            return False
+        return val.lower() in [x.lower() for x in self.getValues(name)]
+
+    def getAttrs(self):
+        """The attribute names, in the case the server returned them"""
+        return [_attr_case.get(k, k) for k in self._values]
+
+    def iterAttrs(self, attrsOnly=False):
+        if attrsOnly:
+            return iter(self.getAttrs())
+        return ((_attr_case.get(k, k), v) for k, v in self._values.items())
+
+    @property
+    def data(self):
+        """The attributes as a cidict, built on each access"""
+        return cidict(dict(self.iterAttrs()))
+
+    def getref(self):
+        return self.ref
+
+    def toTupleList(self):
+        return list(self.iterAttrs())
+
+    def to_entry(self):
+        """Get an Entry of this entry, to modify it
+
+        :returns: Entry
+        """
+        if self.dn is None:
+            return Entry((None, self.ref))
+        return Entry((self.dn, dict(self.iterAttrs())))
+
+    def __repr__(self):
+        """The LDIF of the entry"""
+        return self.to_entry().__repr__()
+
+    __str__ = __repr__
+
+
 class EntryAci(object):
     """Breaks down an aci attribute string from 389, into a dictionary
     of terms and values. These values can then be manipulated, and
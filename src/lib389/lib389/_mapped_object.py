@@ -13,8 +13,11 @@ from ldap.controls import SimplePagedResultsControl
 from ldap import filter as ldap_filter
 import logging
 import json
+import time
+from contextlib import contextmanager
 from functools import partial
-from lib389._entry import Entry
+from lib389._entry import CompactEntry, Entry
+from lib389.bulk import ADD, DELETE, MODIFY, DEFAULT_WINDOW, BulkOp, BulkOperations, BulkResult, invalid
 from lib389._constants import DIRSRV_STATE_ONLINE
 from lib389._mapped_object_lint import DSLint, DSLints
 from lib389.utils import (
@@ -22,6 +25,15 @@ from lib389.utils import (
         ensure_list_int, display_log_value, display_log_data
         )
 
+# How many values values_present() asserts per search
+VALUES_PRESENT_BATCH = 500
+
+# How long, in seconds, a snapshot taken with DSLdapObject.fetch() serves reads
+DEFAULT_SNAPSHOT_TTL = 30
+
+# The page size of DSLdapObjects.iter() and ifilter()
+DEFAULT_PAGE_SIZE = 500
+
 # This function filter and term generation provided thanks to
 # The University of Adelaide. <william@adelaide.edu.au>
 
@@ -67,6 +79,49 @@ def _gen_filter(attrtypes, values, extra=None):
     return filt
 
 
+def _escape_filter_value(value):
+    """Escape a str or bytes value for an assertion in a search filter"""
+    if isinstance(value, bytes):
+        try:
+            value = value.decode('utf-8')
+        except UnicodeDecodeError:
+            return ''.join('\\%02x' % b for b in value)
+    return ldap_filter.escape_filter_chars(value)
+
+
+def _mods_to_modlist(mods):
+    """Turn the mods of apply_mods() into a python-ldap modlist"""
+    mod_list = []
+    for mod in mods:
+        if len(mod) < 2:
+            # Error
+            raise ValueError('Not enough arguments in the mod op')
+        elif len(mod) == 2:  # no action
+            # This hack exists because the original lib389 Entry type
+            # does odd things.
+            action, key = mod
+            if action != ldap.MOD_DELETE:
+                raise ValueError('Only MOD_DELETE takes two arguments %s' % mod)
+            value = None
+            # Just add the raw mod, because we don't have a value
+            mod_list.append((action, key, value))
+        elif len(mod) == 3:
+            action, key, value = mod
+            if action != ldap.MOD_REPLACE and \
+               action != ldap.MOD_ADD and \
+               action != ldap.MOD_DELETE:
+                raise ValueError('Invalid mod action(%s)' % str(action))
+            if isinstance(value, list):
+                value = ensure_list_bytes(value)
+            else:
+                value = [ensure_bytes(value)]
+            mod_list.append((action, key, value))
+        else:
+            # Error too many items
+            raise ValueError('Too many arguments in the mod op')
+    return mod_list
+
+
 class DSLogging(object):
     """The benefit of this is automatic name detection, and correct application
     of level and verbosity to the object.
@@ -112,6 +167,12 @@ class DSLdapObject(DSLogging, DSLint):
         self._server_controls = None
         self._client_controls = None
         self._object_filter = '(objectClass=*)'
+        # Opt-in cache of the entry, see fetch()
+        self._snapshot = None
+        self._snapshot_attrs = None
+        self._snapshot_expires = 0
+        self._round_trips = 0
+        self._cache_hits = 0
 
     def __unicode__(self):
         val = self._dn
@@ -129,10 +190,116 @@ class DSLdapObject(DSLogging, DSLint):
         :returns: Entry object
         """
 
-        return self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter, attrlist=["*"],
+        return self._search_entry(["*"])
+
+    def _search_entry(self, attrlist):
+        """Read the entry with a base search
+
+        :param attrlist: The attributes to read
+        :type attrlist: list
+        :returns: Entry object
+        """
+
+        self._round_trips += 1
+        return self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter, attrlist=attrlist,
                                            serverctrls=self._server_controls, clientctrls=self._client_controls,
                                            escapehatch='i am sure')[0]
 
+    def _read_entry(self, attrlist):
+        """Read the entry, from the snapshot if there is a valid one holding
+        all the attributes of attrlist, else with a base search
+
+        :param attrlist: The attributes to read
+        :type attrlist: list
+        :returns: Entry object
+        """
+
+        if self._snapshot is not None:
+            if time.monotonic() > self._snapshot_expires:
+                self.invalidate()
+            elif self._snapshot_covers(attrlist):
+                self._cache_hits += 1
+                return self._snapshot
+        return self._search_entry(attrlist)
+
+    def _snapshot_covers(self, attrlist):
+        fetched = self._snapshot_attrs
+        if '*' in fetched and '+' in fetched:
+            return True
+        # '*' only returns the user attributes, so the other attributes must
+        # have been asked for by name.
+        for attr in attrlist:
+            if attr.lower() not in fetched:
+                return False
+        return True
+
+    def fetch(self, attrs=None, ttl=DEFAULT_SNAPSHOT_TTL):
+        """Load the entry with a single search, and serve the following
+        attribute reads from this snapshot until it expires, or until the
+        entry is changed through this object. Changes made by others are
+        not seen until then.
+
+        :param attrs: The attributes to load, all the user and operational
+                      attributes by default
+        :type attrs: list
+        :param ttl: How long the snapshot is used, in seconds
+        :type ttl: float
+        :returns: self
+        """
+
+        attrlist = list(attrs) if attrs else ['*', '+']
+        self._set_snapshot(self._search_entry(attrlist), attrlist, ttl)
+        return self
+
+    def _set_snapshot(self, entry, attrlist, ttl=DEFAULT_SNAPSHOT_TTL):
+        self._snapshot = entry
+        self._snapshot_attrs = set(attr.lower() for attr in attrlist)
+        self._snapshot_expires = time.monotonic() + ttl
+
+    @contextmanager
+    def snapshot(self, attrs=None, ttl=DEFAULT_SNAPSHOT_TTL):
+        """Serve the attribute reads of a with block from a single search:
+
+            with account.snapshot():
+                account.get_attr_val_utf8('uid')
+                account.present('nsAccountLock')
+
+        :param attrs: The attributes to load, all by default
+        :type attrs: list
+        :param ttl: How long the snapshot is used, in seconds
+        :type ttl: float
+        """
+
+        self.fetch(attrs, ttl)
+        try:
+            yield self
+        finally:
+            self.invalidate()
+
+    def invalidate(self):
+        """Drop the snapshot of the entry, the next reads search the server"""
+
+        self._snapshot = None
+        self._snapshot_attrs = None
+
+    @property
+    def round_trips(self):
+        """The number of operations sent to the server for this object"""
+
+        return self._round_trips
+
+    @property
+    def cache_hits(self):
+        """The number of reads served from the snapshot"""
+
+        return self._cache_hits
+
+    def _modify(self, mods):
+        self.invalidate()
+        self._round_trips += 1
+        return self._instance.modify_ext_s(self._dn, mods, serverctrls=self._server_controls,
+                                           clientctrls=self._client_controls, escapehatch='i am sure')
+
     def exists(self):
         """Check if the entry exists
 
@@ -140,6 +307,7 @@ class DSLdapObject(DSLogging, DSLint):
         """
 
         try:
+            self._round_trips += 1
             self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter, attrsonly=1,
                                         serverctrls=self._server_controls, clientctrls=self._client_controls,
                                         escapehatch='i am sure')
@@ -153,9 +321,7 @@ class DSLdapObject(DSLogging, DSLint):
 
         :returns: LDIF formatted string
         """
-        e = self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter, attrlist=attrlist,
-                                        serverctrls=self._server_controls, clientctrls=self._client_controls,
-                                        escapehatch='i am sure')[0]
+        e = self._read_entry(attrlist)
         return e.__repr__()
 
     def display_attr(self, attr):
@@ -239,16 +405,20 @@ class DSLdapObject(DSLogging, DSLint):
         :type value: str
 
         :returns: True if attr is present
+
+        A value is matched by the server, with the equality rule of the
+        attribute, unless the entry is in a snapshot, see fetch().
         """
 
         if self._instance.state != DIRSRV_STATE_ONLINE:
             raise ValueError("Invalid state. Cannot get presence on instance that is not ONLINE")
         self._log.debug("%s present(%r) %s" % (self._dn, attr, value))
 
-        self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter, attrlist=[attr, ],
-                                        serverctrls=self._server_controls, clientctrls=self._client_controls,
-                                        escapehatch='i am sure')[0]
-        values = self.get_attr_vals_bytes(attr)
+        if value is not None and not (self._snapshot is not None and self._snapshot_covers([attr])):
+            # Let the server match the value, rather than download them all
+            return self._value_present(attr, value)
+
+        values = ensure_list_bytes(self._read_entry([attr]).getValues(attr))
         self._log.debug("%s contains %s" % (self._dn, values))
 
         if value is None:
@@ -258,6 +428,83 @@ class DSLdapObject(DSLogging, DSLint):
             # Check if a value really does exist.
             return ensure_bytes(value).lower() in [x.lower() for x in values]
 
+    def _value_present(self, attr, value):
+        """Check a value with a base search asserting it, which returns
+        no attributes: the entry only comes back if the value matches.
+        """
+
+        filterstr = '(&%s(%s=%s))' % (self._object_filter, attr, _escape_filter_value(value))
+        self._round_trips += 1
+        results = self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, filterstr, attrlist=['1.1'], attrsonly=1,
+                                              serverctrls=self._server_controls, clientctrls=self._client_controls,
+                                              escapehatch='i am sure')
+        present = len(results) > 0
+        self._log.debug("%s contains %s: %s" % (self._dn, value, present))
+        return present
+
+    def values_present(self, attr, values):
+        """Check which of many values are present on the entry. Each search
+        asserts a batch of values at once, with a base search that only
+        returns the entry if one of them matches. The values of a batch that
+        matches are then compared, with all the compare operations in flight
+        at once.
+
+        :param attr: an attribute name
+        :type attr: str
+        :param values: attribute values
+        :type values: list
+
+        :returns: A dict of each value to True if it is present
+        """
+
+        if self._instance.state != DIRSRV_STATE_ONLINE:
+            raise ValueError("Invalid state. Cannot get presence on instance that is not ONLINE")
+        self._log.debug("%s values_present(%r) %d values" % (self._dn, attr, len(values)))
+
+        result = {}
+        values = list(values)
+        for i in range(0, len(values), VALUES_PRESENT_BATCH):
+            batch = values[i:i + VALUES_PRESENT_BATCH]
+            filterstr = '(&%s(|%s))' % (self._object_filter,
+                                        ''.join('(%s=%s)' % (attr, _escape_filter_value(value)) for value in batch))
+            self._round_trips += 1
+            matched = self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, filterstr, attrlist=['1.1'],
+                                                  attrsonly=1, serverctrls=self._server_controls,
+                                                  clientctrls=self._client_controls, escapehatch='i am sure')
+            if not matched:
+                # None of the values of the batch is present
+                for value in batch:
+                    result[value] = False
+            elif len(batch) == 1:
+                result[batch[0]] = True
+            else:
+                result.update(self._compare_values(attr, batch))
+        return result
+
+    def _compare_values(self, attr, values):
+        """Check values with compare operations, matched by the server with
+        the equality rule of the attribute. They are all sent before their
+        results are read, so this costs a single round trip.
+        """
+
+        self._round_trips += 1
+        msgids = [self._instance.compare_ext(self._dn, attr, ensure_bytes(value),
+                                             serverctrls=self._server_controls,
+                                             clientctrls=self._client_controls, escapehatch='i am sure')
+                  for value in values]
+        result = {}
+        for value, msgid in zip(values, msgids):
+            try:
+                self._instance.result3(msgid, all=1, timeout=self._instance.timeout)
+            except ldap.COMPARE_TRUE:
+                result[value] = True
+            except (ldap.COMPARE_FALSE, ldap.NO_SUCH_ATTRIBUTE):
+                result[value] = False
+            else:
+                raise ldap.PROTOCOL_ERROR('Compare of %s on %s returned no compare result' % (attr, self._dn))
+        self._log.debug("%s contains %s" % (self._dn, [value for value in values if result[value]]))
+        return result
+
     def add(self, key, value):
         """Add an attribute with a value
 
@@ -300,8 +547,7 @@ class DSLdapObject(DSLogging, DSLint):
             else:
                 value = [ensure_bytes(arg[1])]
             mods.append((ldap.MOD_REPLACE, ensure_str(arg[0]), value))
-        return self._instance.modify_ext_s(self._dn, mods, serverctrls=self._server_controls,
-                                           clientctrls=self._client_controls, escapehatch='i am sure')
+        return self._modify(mods)
 
     # This needs to work on key + val, and key
     def remove(self, key, value):
@@ -444,9 +690,7 @@ class DSLdapObject(DSLogging, DSLint):
         elif value is not None:
             value = [ensure_bytes(value)]
 
-        return self._instance.modify_ext_s(self._dn, [(action, key, value)],
-                                           serverctrls=self._server_controls, clientctrls=self._client_controls,
-                                           escapehatch='i am sure')
+        return self._modify([(action, key, value)])
 
     def apply_mods(self, mods):
         """Perform modification operation using several mods at once
@@ -456,35 +700,7 @@ class DSLdapObject(DSLogging, DSLint):
         :raises: ValueError - if a provided mod op is invalid
         """
 
-        mod_list = []
-        for mod in mods:
-            if len(mod) < 2:
-                # Error
-                raise ValueError('Not enough arguments in the mod op')
-            elif len(mod) == 2:  # no action
-                # This hack exists because the original lib389 Entry type
-                # does odd things.
-                action, key = mod
-                if action != ldap.MOD_DELETE:
-                    raise ValueError('Only MOD_DELETE takes two arguments %s' % mod)
-                value = None
-                # Just add the raw mod, because we don't have a value
-                mod_list.append((action, key, value))
-            elif len(mod) == 3:
-                action, key, value = mod
-                if action != ldap.MOD_REPLACE and \
-                   action != ldap.MOD_ADD and \
-                   action != ldap.MOD_DELETE:
-                    raise ValueError('Invalid mod action(%s)' % str(action))
-                if isinstance(value, list):
-                    value = ensure_list_bytes(value)
-                else:
-                    value = [ensure_bytes(value)]
-                mod_list.append((action, key, value))
-            else:
-                # Error too many items
-                raise ValueError('Too many arguments in the mod op')
-        return self._instance.modify_ext_s(self._dn, mod_list, serverctrls=self._server_controls, clientctrls=self._client_controls, escapehatch='i am sure')
+        return self._modify(_mods_to_modlist(mods))
 
     def _unsafe_compare_attribute(self, other):
         """Compare two attributes from two objects. This is currently marked unsafe as it's
@@ -580,9 +796,7 @@ class DSLdapObject(DSLogging, DSLint):
             raise ValueError("Invalid state. Cannot get properties on instance that is not ONLINE")
         else:
             # retrieving real(*) and operational attributes(+)
-            attrs_entry = self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter,
-                                                      attrlist=["*", "+"], serverctrls=self._server_controls,
-                                                      clientctrls=self._client_controls, escapehatch='i am sure')[0]
+            attrs_entry = self._read_entry(["*", "+"])
             # getting dict from 'entry' object
             attrs_dict = attrs_entry.data
             # Should we normalise the attr names here to lower()?
@@ -600,9 +814,7 @@ class DSLdapObject(DSLogging, DSLint):
             raise ValueError("Invalid state. Cannot get properties on instance that is not ONLINE")
         else:
             # retrieving real(*) and operational attributes(+)
-            attrs_entry = self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter,
-                                                      attrlist=["*", "+"], serverctrls=self._server_controls,
-                                                      clientctrls=self._client_controls, escapehatch='i am sure')[0]
+            attrs_entry = self._read_entry(["*", "+"])
             # getting dict from 'entry' object
             r = {}
             for (k, vo) in attrs_entry.data.items():
@@ -614,18 +826,14 @@ class DSLdapObject(DSLogging, DSLint):
         if self._instance.state != DIRSRV_STATE_ONLINE:
             raise ValueError("Invalid state. Cannot get properties on instance that is not ONLINE")
         else:
-            entry = self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter,
-                                                attrlist=keys, serverctrls=self._server_controls,
-                                                clientctrls=self._client_controls, escapehatch='i am sure')[0]
+            entry = self._read_entry(keys)
             return entry.getValuesSet(keys)
 
     def get_attrs_vals_utf8(self, keys, use_json=False):
         self._log.debug("%s get_attrs_vals_utf8(%r)" % (self._dn, keys))
         if self._instance.state != DIRSRV_STATE_ONLINE:
             raise ValueError("Invalid state. Cannot get properties on instance that is not ONLINE")
-        entry = self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter, attrlist=keys,
-                                            serverctrls=self._server_controls, clientctrls=self._client_controls,
-                                            escapehatch='i am sure')[0]
+        entry = self._read_entry(keys)
         vset = entry.getValuesSet(keys)
         r = {}
         for (k, vo) in vset.items():
@@ -642,9 +850,7 @@ class DSLdapObject(DSLogging, DSLint):
         else:
             # It would be good to prevent the entry code intercepting this ....
             # We have to do this in this method, because else we ignore the scope base.
-            entry = self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter,
-                                                attrlist=[key], serverctrls=self._server_controls,
-                                                clientctrls=self._client_controls, escapehatch='i am sure')[0]
+            entry = self._read_entry([key])
             vals = entry.getValues(key)
             if use_json:
                 result = {key: []}
@@ -662,9 +868,7 @@ class DSLdapObject(DSLogging, DSLint):
             # In the future, I plan to add a mode where if local == true, we
             # can use get on dse.ldif to get values offline.
         else:
-            entry = self._instance.search_ext_s(self._dn, ldap.SCOPE_BASE, self._object_filter,
-                                                attrlist=[key], serverctrls=self._server_controls,
-                                                clientctrls=self._client_controls, escapehatch='i am sure')[0]
+            entry = self._read_entry([key])
             return entry.getValue(key)
 
     def get_attr_val_bytes(self, key, use_json=False):
@@ -793,6 +997,8 @@ class DSLdapObject(DSLogging, DSLint):
         if self._protected:
             return
 
+        self.invalidate()
+        self._round_trips += 1
         self._instance.rename_s(self._dn, new_rdn, newsuperior,
                                 serverctrls=self._server_controls, clientctrls=self._client_controls,
                                 delold=deloldrdn, escapehatch='i am sure')
@@ -815,6 +1021,7 @@ class DSLdapObject(DSLogging, DSLint):
 
         self._log.debug("%s delete" % (self._dn))
         if not self._protected:
+            self.invalidate()
             # Is there a way to mark this as offline and kill it
             if recursive:
                 filterstr = "(|(objectclass=*)(objectclass=ldapsubentry))"
@@ -822,6 +1029,7 @@ class DSLdapObject(DSLogging, DSLint):
                 for ent in sorted(ents, key=lambda e: len(e.dn), reverse=True):
                     self._instance.delete_ext_s(ent.dn, serverctrls=self._server_controls, clientctrls=self._client_controls, escapehatch='i am sure')
             else:
+                self._round_trips += 1
                 self._instance.delete_ext_s(self._dn, serverctrls=self._server_controls, clientctrls=self._client_controls, escapehatch='i am sure')
 
     def _validate(self, rdn, properties, basedn):
@@ -915,6 +1123,7 @@ class DSLdapObject(DSLogging, DSLint):
         self._log.debug('Validated dn {}'.format(dn))
 
         exists = False
+        self.invalidate()
 
         if ensure:
             # If we are running in stateful ensure mode, we need to check if the object exists, and
@@ -957,6 +1166,20 @@ class DSLdapObject(DSLogging, DSLint):
             raise AssertionError("Impossible State Reached in _create")
         return self
 
+    def _bulk_add_op(self, rdn, properties, basedn, item):
+        """Validate a create request like _create(), and return the add of
+        the entry for BulkOperations. The DN is set when the add is sent,
+        check the result before using the object.
+        """
+        basedn = ensure_str(basedn)
+        (dn, valid_props) = self._validate(rdn, properties, basedn)
+        e = Entry(dn)
+        e.update({'objectclass': ensure_list_bytes(self._create_objectclasses)})
+        e.update(valid_props)
+        self.invalidate()
+        self._dn = dn
+        return BulkOp(ADD, dn, e.toTupleList(), item, self)
+
     def create(self, rdn=None, properties=None, basedn=None):
         """Add a new entry
 
@@ -1049,45 +1272,7 @@ class DSLdapObjects(DSLogging, DSLints):
 
         if type(paged_search) == int:
             self._log.debug('listing with paged search -> %d', paged_search)
-            # If paged_search ->
-            results = []
-            pages = 0
-            pctrls = []
-            req_pr_ctrl = SimplePagedResultsControl(paged_critical, size=paged_search, cookie='')
-            if self._server_controls is not None:
-                controls = [req_pr_ctrl] + self._server_controls
-            else:
-                controls = [req_pr_ctrl]
-            while True:
-                msgid = self._instance.search_ext(
-                        base=self._basedn,
-                        scope=self._scope,
-                        filterstr=filterstr,
-                        attrlist=self._list_attrlist,
-                        serverctrls=controls,
-                        clientctrls=self._client_controls,
-                        escapehatch='i am sure'
-                    )
-                self._log.info('Getting page %d' % (pages,))
-                rtype, rdata, rmsgid, rctrls = self._instance.result3(msgid, escapehatch='i am sure')
-                results.extend(rdata)
-                pages += 1
-                self._log.debug("%s" % rctrls)
-                pctrls = [ c for c in rctrls
-                    if c.controlType == SimplePagedResultsControl.controlType]
-                if pctrls and pctrls[0].cookie:
-                    req_pr_ctrl.cookie = pctrls[0].cookie
-                    if self._server_controls is not None:
-                        controls = [req_pr_ctrl] + self._server_controls
-                    else:
-                        controls = [req_pr_ctrl]
-                else:
-                    break
-                #End while
-            # Result3 doesn't map through Entry, so we have to do it manually.
-            results = [Entry(r) for r in results]
-            insts = [self._entry_to_instance(dn=r.dn, entry=r) for r in results]
-            # End paged search
+            insts = list(self.iter(page_size=paged_search, paged_critical=paged_critical))
         else:
             # If not paged
             try:
@@ -1106,6 +1291,99 @@ class DSLdapObjects(DSLogging, DSLints):
                 insts = []
         return insts
 
+    def iter(self, page_size=DEFAULT_PAGE_SIZE, attrs=None, paged_critical=True):
+        """Iterate over the children entries, like list(), but with a paged
+        search yielding the entries of a page before the next page is asked
+        for. The entries are never all held in memory at once.
+
+        :param page_size: The number of entries per page
+        :type page_size: int
+        :param attrs: Attributes to read with the entries, the reads of these
+                      attributes on the yielded objects are then served
+                      without a search, see DSLdapObject.fetch()
+        :type attrs: list
+        :param paged_critical: Whether the paged results control is critical
+        :type paged_critical: bool
+        :returns: A generator of children entries
+        """
+
+        filterstr = self._get_objectclass_filter()
+        self._log.debug('iter filter = %s' % filterstr)
+        return self._paged_search(filterstr, self._scope, page_size, attrs, paged_critical)
+
+    def ifilter(self, search, scope=None, page_size=DEFAULT_PAGE_SIZE, attrs=None, paged_critical=True):
+        """Iterate over the children entries matching a filter, like
+        filter(), but with a paged search, see iter()
+
+        :param search: An additional filter
+        :type search: str
+        :param scope: The search scope, the scope of the object by default
+        :type scope: int
+        :param page_size: The number of entries per page
+        :type page_size: int
+        :param attrs: Attributes to read with the entries
+        :type attrs: list
+        :param paged_critical: Whether the paged results control is critical
+        :type paged_critical: bool
+        :returns: A generator of children entries
+        """
+
+        if search:
+            search_filter = _gen_and([self._get_objectclass_filter(), search])
+        else:
+            search_filter = self._get_objectclass_filter()
+        if scope is None:
+            scope = self._scope
+        self._log.debug(f'ifilter filter = {search_filter} with scope {scope}')
+        return self._paged_search(search_filter, scope, page_size, attrs, paged_critical)
+
+    def _paged_search(self, filterstr, scope, page_size, attrs, paged_critical):
+        attrlist = list(self._list_attrlist)
+        if attrs:
+            attrlist += [attr for attr in attrs if attr not in attrlist]
+        req_pr_ctrl = SimplePagedResultsControl(paged_critical, size=page_size, cookie='')
+        pages = 0
+        try:
+            while True:
+                controls = [req_pr_ctrl] + (self._server_controls or [])
+                try:
+                    msgid = self._instance.search_ext(
+                            base=self._basedn,
+                            scope=scope,
+                            filterstr=filterstr,
+                            attrlist=attrlist,
+                            serverctrls=controls,
+                            clientctrls=self._client_controls
+                        )
+                    self._log.debug('Getting page %d' % (pages,))
+                    rtype, rdata, rmsgid, rctrls = self._instance.result3(msgid)
+                except ldap.NO_SUCH_OBJECT:
+                    # There are no objects to select from
+                    return
+                pages += 1
+                pctrls = [c for c in rctrls if c.controlType == SimplePagedResultsControl.controlType]
+                req_pr_ctrl.cookie = pctrls[0].cookie if pctrls else ''
+                # Result3 doesn't map through Entry. A CompactEntry is enough
+                # for reads, and much cheaper on large results.
+                for r in rdata:
+                    entry = CompactEntry(r)
+                    inst = self._entry_to_instance(dn=entry.dn, entry=entry)
+                    if attrs:
+                        inst._set_snapshot(entry, attrs)
+                    yield inst
+                if not req_pr_ctrl.cookie:
+                    break
+        except GeneratorExit:
+            if req_pr_ctrl.cookie:
+                # The caller stopped early, release the search on the server
+                # with a page of size 0.
+                req_pr_ctrl.size = 0
+                msgid = self._instance.search_ext(base=self._basedn, scope=scope, filterstr=filterstr,
+                                                  attrlist=['1.1'], serverctrls=[req_pr_ctrl] + (self._server_controls or []),
+                                                  clientctrls=self._client_controls)
+                self._instance.result3(msgid)
+            raise
+
     def exists(self, selector=[], dn=None):
         """Check if a child entry exists
 
@@ -1214,6 +1492,128 @@ class DSLdapObjects(DSLogging, DSLints):
         # Now actually commit the creation req
         return co.create(rdn, properties, self._basedn)
 
+    def _bulk(self, window):
+        return BulkOperations(self._instance, window=window, serverctrls=self._server_controls,
+                              clientctrls=self._client_controls)
+
+    def create_many(self, items, window=DEFAULT_WINDOW):
+        """Create many objects under base DN of our entry, keeping up to
+        window adds in flight rather than waiting for each one. Unlike
+        create(), nothing is raised when an add fails: the result of each
+        item says if it did.
+
+            results = users.create_many(({'uid': ...} for ...), window=64)
+            failed = [r for r in results if not r.ok]
+
+        Each item is validated by the _validate() of its type, and gets the
+        objectclasses of its type, as with create(). The types that override
+        create() are created one at a time with it instead, so their
+        defaults are kept.
+
+        :param items: The properties of each new entry, or (rdn, properties)
+        :type items: iterable
+        :param window: The maximum number of adds in flight
+        :type window: int
+
+        :returns: A list of BulkResult, with the DSLdapObject as obj
+        """
+
+        childtype = type(self._entry_to_instance(dn=None, entry=None))
+        if (type(self).create is not DSLdapObjects.create or childtype.create is not DSLdapObject.create or
+                childtype._create is not DSLdapObject._create):
+            return self._create_each(items)
+
+        def operations():
+            for item in items:
+                if isinstance(item, tuple):
+                    (rdn, properties) = item
+                else:
+                    (rdn, properties) = (None, item)
+                try:
+                    co = self._entry_to_instance(dn=None, entry=None)
+                    self._rdn_attribute = co._rdn_attribute
+                    (rdn, properties) = self._validate(rdn, dict(properties))
+                    yield co._bulk_add_op(rdn, properties, self._basedn, item)
+                except (ldap.LDAPError, ValueError) as e:
+                    yield invalid(item, e)
+
+        return self._bulk(window).execute(operations())
+
+    def _create_each(self, items):
+        """Create the items of create_many() one at a time with create()"""
+
+        results = []
+        for item in items:
+            if isinstance(item, tuple):
+                (rdn, properties) = item
+            else:
+                (rdn, properties) = (None, item)
+            try:
+                kwargs = {'properties': dict(properties)}
+                if rdn is not None:
+                    kwargs['rdn'] = rdn
+                obj = self.create(**kwargs)
+            except ldap.SERVER_DOWN:
+                raise
+            except (ldap.LDAPError, ValueError) as e:
+                results.append(BulkResult(invalid(item, e), e))
+                continue
+            results.append(BulkResult(BulkOp(ADD, obj.dn, None, item, obj)))
+        return results
+
+    def modify_many(self, changes, window=DEFAULT_WINDOW):
+        """Modify many entries, keeping up to window modifies in flight
+
+        :param changes: (DSLdapObject or dn, mods) pairs, the mods as in
+                        DSLdapObject.apply_mods()
+        :type changes: iterable
+        :param window: The maximum number of modifies in flight
+        :type window: int
+
+        :returns: A list of BulkResult
+        """
+
+        def operations():
+            for item in changes:
+                (obj, mods) = item
+                try:
+                    mod_list = _mods_to_modlist(mods)
+                except ValueError as e:
+                    yield invalid(item, e)
+                    continue
+                if isinstance(obj, DSLdapObject):
+                    obj.invalidate()
+                    yield BulkOp(MODIFY, obj.dn, mod_list, item, obj)
+                else:
+                    yield BulkOp(MODIFY, obj, mod_list, item, None)
+
+        return self._bulk(window).execute(operations())
+
+    def delete_many(self, objs, window=DEFAULT_WINDOW):
+        """Delete many entries, keeping up to window deletes in flight.
+        Protected objects are not deleted, and reported failed.
+
+        :param objs: DSLdapObjects or dns
+        :type objs: iterable
+        :param window: The maximum number of deletes in flight
+        :type window: int
+
+        :returns: A list of BulkResult
+        """
+
+        def operations():
+            for obj in objs:
+                if isinstance(obj, DSLdapObject):
+                    if obj._protected:
+                        yield invalid(obj, ldap.UNWILLING_TO_PERFORM('%s is protected' % obj.dn))
+                        continue
+                    obj.invalidate()
+                    yield BulkOp(DELETE, obj.dn, None, obj, obj)
+                else:
+                    yield BulkOp(DELETE, obj, None, obj, None)
+
+        return self._bulk(window).execute(operations())
+
     def ensure_state(self, rdn=None, properties=None):
         """Create an object under base DN of our entry, or
         assert it exists and update it's properties.
@@ -11,6 +11,8 @@ import re
 import time
 import json
 import datetime
+import threading
+from concurrent.futures import Future
 from lib389._constants import *
 from lib389.properties import *
 from lib389._entry import FormatDict
@@ -19,6 +21,39 @@ from lib389 import Entry, DirSrv, NoSuchEntryError, InvalidArgumentError
 from lib389._mapped_object import DSLdapObject, DSLdapObjects
 
 
+class ConsumerRUVCache(object):
+    """The database RUVs read from the consumers of agreements. The agreements
+    to the same consumer and suffix share the RUV, which is read only once,
+    even by several threads at the same time.
+    """
+
+    def __init__(self):
+        self._ruvs = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, read):
+        """Get the RUV of a consumer, and read it the first time
+
+        :param key: The consumer and suffix of the RUV
+        :type key: tuple
+        :param read: A function reading the RUV
+        :type read: function
+        :returns: What read() returned, or raises the exception it raised
+        """
+
+        with self._lock:
+            future = self._ruvs.get(key)
+            reader = future is None
+            if reader:
+                future = self._ruvs[key] = Future()
+        if reader:
+            try:
+                future.set_result(read())
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+
 class Agreement(DSLdapObject):
     """A replication agreement from this server instance to
     another instance of directory server.
@@ -134,12 +169,17 @@ class Agreement(DSLdapObject):
         self._log.debug('get_agmt_maxcsn - did not find matching agmt maxcsn from RUV')
         return None
 
-    def get_consumer_maxcsn(self, binddn=None, bindpw=None):
+    def get_consumer_maxcsn(self, binddn=None, bindpw=None, pool=None, ruvs=None):
         """Attempt to get the consumer's maxcsn from its database RUV entry
         :param binddn: Specifies a specific bind DN to use when contacting the remote consumer
         :type binddn: str
         :param bindpw: Password for the bind DN
         :type bindpw: str
+        :param pool: Borrow the connection to the consumer from this pool,
+                     rather than open a new one
+        :type pool: lib389.pool.ConnectionPool
+        :param ruvs: Share the consumer RUV with the other agreements to it
+        :type ruvs: ConsumerRUVCache
         :returns: CSN string if found, otherwise "Unavailable" is returned
         """
         host = self.get_attr_val_utf8(AGMT_HOST)
@@ -162,26 +202,56 @@ class Agreement(DSLdapObject):
         replica = replicas.get(suffix)
         rid = replica.get_attr_val_utf8(REPL_ID)
 
+        def read_ruv():
+            return self._get_consumer_ruv(host, port, protocol, suffix, binddn, bindpw, pool)
+
+        if ruvs is not None:
+            elements = ruvs.get((host.lower(), port, protocol, normalizeDN(suffix), binddn, bindpw), read_ruv)
+        else:
+            elements = read_ruv()
+        for ruv in elements or []:
+            if ('replica %s ' % rid) in ruv:
+                ruv_parts = ruv.split()
+                if len(ruv_parts) == 5:
+                    result_msg = ruv_parts[4]
+                break
+        return result_msg
+
+    def _get_consumer_ruv(self, host, port, protocol, suffix, binddn, bindpw, pool):
+        """Read the database RUV of the consumer, None if it is unavailable"""
+
         # Open a connection to the consumer
-        consumer = DirSrv(verbose=self._instance.verbose)
-        args_instance[SER_HOST] = host
-        if protocol == "ssl" or protocol == "ldaps":
-            args_instance[SER_SECURE_PORT] = int(port)
+        if pool is not None:
+            scheme = 'ldaps' if protocol == "ssl" or protocol == "ldaps" else 'ldap'
+            try:
+                consumer = pool.acquire('%s://%s:%s/' % (scheme, host, port), binddn=binddn, bindpw=bindpw)
+            except ldap.INVALID_CREDENTIALS as e:
+                raise(e)
+            except ldap.LDAPError as e:
+                self._log.debug('Connection to consumer ({}:{}) failed, error: {}'.format(host, port, e))
+                return None
         else:
-            args_instance[SER_PORT] = int(port)
-        args_instance[SER_ROOT_DN] = binddn
-        args_instance[SER_ROOT_PW] = bindpw
-        args_standalone = args_instance.copy()
-        consumer.allocate(args_standalone)
-        try:
-            consumer.open()
-        except ldap.INVALID_CREDENTIALS as e:
-            raise(e)
-        except ldap.LDAPError as e:
-            self._log.debug('Connection to consumer ({}:{}) failed, error: {}'.format(host, port, e))
-            return result_msg
+            consumer = DirSrv(verbose=self._instance.verbose)
+            args_instance[SER_HOST] = host
+            if protocol == "ssl" or protocol == "ldaps":
+                args_instance[SER_SECURE_PORT] = int(port)
+            else:
+                args_instance[SER_PORT] = int(port)
+            args_instance[SER_ROOT_DN] = binddn
+            args_instance[SER_ROOT_PW] = bindpw
+            args_standalone = args_instance.copy()
+            consumer.allocate(args_standalone)
+            try:
+                consumer.open()
+            except ldap.INVALID_CREDENTIALS as e:
+                raise(e)
+            except ldap.LDAPError as e:
+                self._log.debug('Connection to consumer ({}:{}) failed, error: {}'.format(host, port, e))
+                return None
 
         # Search for the tombstone RUV entry
+        discard = False
+        elements = None
         try:
             entry = consumer.search_s(suffix, ldap.SCOPE_SUBTREE,
                                       REPLICA_RUV_FILTER, ['nsds50ruv'])
@@ -189,27 +259,30 @@ class Agreement(DSLdapObject):
                 self._log.debug("Failed to retrieve database RUV entry from consumer")
             else:
                 elements = ensure_list_str(entry[0].getValues('nsds50ruv'))
-                for ruv in elements:
-                    if ('replica %s ' % rid) in ruv:
-                        ruv_parts = ruv.split()
-                        if len(ruv_parts) == 5:
-                            result_msg = ruv_parts[4]
-                        break
         except ldap.INVALID_CREDENTIALS as e:
             raise(e)
         except ldap.LDAPError as e:
+            discard = isinstance(e, (ldap.SERVER_DOWN, ldap.CONNECT_ERROR))
             self._log.debug('Failed to search for the suffix ' +
                                      '({}) consumer ({}:{}) failed, error: {}'.format(
                                          suffix, host, port, e))
-        consumer.close()
-        return result_msg
+        finally:
+            if pool is not None:
+                pool.release(consumer, discard=discard)
+            else:
+                consumer.close()
+        return elements
 
-    def get_agmt_status(self, binddn=None, bindpw=None, return_json=False):
+    def get_agmt_status(self, binddn=None, bindpw=None, return_json=False, pool=None, ruvs=None):
         """Return the status message
         :param binddn: Specifies a specific bind DN to use when contacting the remote consumer
         :type binddn: str
         :param bindpw: Password for the bind DN
         :type bindpw: str
+        :param pool: Borrow the connection to the consumer from this pool
+        :type pool: lib389.pool.ConnectionPool
+        :param ruvs: Share the consumer RUV with the other agreements to it
+        :type ruvs: ConsumerRUVCache
         :returns: A status message about the replication agreement
         """
         con_maxcsn = "Unknown"
@@ -218,7 +291,7 @@ class Agreement(DSLdapObject):
             agmt_status = json.loads(self.get_attr_val_utf8_l(AGMT_UPDATE_STATUS_JSON))
             if agmt_maxcsn is not None:
                 try:
-                    con_maxcsn = self.get_consumer_maxcsn(binddn=binddn, bindpw=bindpw)
+                    con_maxcsn = self.get_consumer_maxcsn(binddn=binddn, bindpw=bindpw, pool=pool, ruvs=ruvs)
                     if con_maxcsn:
                         if agmt_maxcsn == con_maxcsn:
                             if return_json:
@@ -262,7 +335,7 @@ class Agreement(DSLdapObject):
         except ldap.LDAPError as e:
             raise ValueError(str(e))
 
-    def get_lag_time(self, suffix, agmt_name, binddn=None, bindpw=None):
+    def get_lag_time(self, suffix, agmt_name, binddn=None, bindpw=None, pool=None, ruvs=None):
         """Get the lag time between the supplier and the consumer
         :param suffix: The replication suffix
         :type suffix: str
@@ -272,13 +345,17 @@ class Agreement(DSLdapObject):
         :type binddn: str
         :param bindpw: Password for the bind DN
         :type bindpw: str
+        :param pool: Borrow the connection to the consumer from this pool
+        :type pool: lib389.pool.ConnectionPool
+        :param ruvs: Share the consumer RUV with the other agreements to it
+        :type ruvs: ConsumerRUVCache
         :returns: A time-formated string of the the replication lag (HH:MM:SS).
         :raises: ValueError - if unable to get consumer's maxcsn
         """
 
         try:
             agmt_maxcsn = self.get_agmt_maxcsn()
-            con_maxcsn = self.get_consumer_maxcsn(binddn=binddn, bindpw=bindpw)
+            con_maxcsn = self.get_consumer_maxcsn(binddn=binddn, bindpw=bindpw, pool=pool, ruvs=ruvs)
         except ldap.LDAPError as e:
             raise ValueError("Unable to get lag time: " + str(e))
 
@@ -305,7 +382,8 @@ class Agreement(DSLdapObject):
         # Return a nice formated timestamp
         return "{:0>8}".format(str(lag))
 
-    def status(self, winsync=False, just_status=False, use_json=False, binddn=None, bindpw=None):
+    def status(self, winsync=False, just_status=False, use_json=False, binddn=None, bindpw=None, pool=None,
+               ruvs=None):
         """Get the status of a replication agreement
         :param winsync: Specifies if the the agreement is a winsync replication agreement
         :type winsync: boolean
@@ -317,6 +395,10 @@ class Agreement(DSLdapObject):
         :type binddn: str
         :param bindpw: Password for the bind DN
         :type bindpw: str
+        :param pool: Borrow the connections to the consumer from this pool
+        :type pool: lib389.pool.ConnectionPool
+        :param ruvs: Share the consumer RUV with the other agreements to it
+        :type ruvs: ConsumerRUVCache
         :returns: A status message
         :raises: ValueError - if failing to get agmt status
         """
@@ -328,8 +410,11 @@ class Agreement(DSLdapObject):
         # RUV entry under the suffix, then we can't get the status.  So in this case we
         # need to provide a DN and password.
         if not winsync:
+            # The status and the lag time both need the consumer RUV, read it once
+            if ruvs is None:
+                ruvs = ConsumerRUVCache()
             try:
-                status = self.get_agmt_status(binddn=binddn, bindpw=bindpw)
+                status = self.get_agmt_status(binddn=binddn, bindpw=bindpw, pool=pool, ruvs=ruvs)
             except ldap.INVALID_CREDENTIALS as e:
                 raise(e)
             except ValueError as e:
@@ -343,7 +428,7 @@ class Agreement(DSLdapObject):
             # Get the lag time
             suffix = ensure_str(status_attrs_dict['nsds5replicaroot'][0])
             agmt_name = ensure_str(status_attrs_dict['cn'][0])
-            lag_time = self.get_lag_time(suffix, agmt_name, binddn=binddn, bindpw=bindpw)
+            lag_time = self.get_lag_time(suffix, agmt_name, binddn=binddn, bindpw=bindpw, pool=pool, ruvs=ruvs)
         else:
             lag_time = "Not available for Winsync agreements"
             status = "Not available for Winsync agreements"
@@ -0,0 +1,433 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""asyncio access to lib389 mapped objects.
+
+Operations are sent with the asynchronous python-ldap calls, and their
+results are read when the socket of the connection becomes readable, from
+the event loop itself. Any number of operations can be in flight on one
+connection, and many connections can be served by one loop:
+
+    async def main(insts):
+        conns = await asyncio.gather(*[AsyncConnection.connect(inst) for inst in insts])
+        users = [conn.objects(UserAccounts, DEFAULT_SUFFIX) for conn in conns]
+        per_instance = await asyncio.gather(*[u.list() for u in users])
+        for conn in conns:
+            conn.close()
+
+The mapped objects are the synchronous ones, used to build the requests:
+their own methods still block, and must not be used on an AsyncConnection.
+"""
+
+import asyncio
+import ldap
+from lib389._entry import Entry
+from lib389._mapped_object import _escape_filter_value, _gen_and, _mods_to_modlist
+from lib389.pool import ConnectionPool, connect
+
+# Results are also polled this often, in seconds, for the data a TLS layer
+# may have read from the socket before the loop saw it readable.
+POLL_INTERVAL = 0.05
+
+
+class AsyncConnection(object):
+    """Run operations on an open DirSrv from an asyncio event loop. The
+    DirSrv must not be used by anything else meanwhile.
+
+    :param conn: An open connection
+    :type conn: lib389.DirSrv
+    :param max_inflight: The maximum number of operations in flight, None
+                         for no limit
+    :type max_inflight: int
+    """
+
+    def __init__(self, conn, max_inflight=None):
+        self._conn = conn
+        self._max_inflight = max_inflight
+        self._inflight = None
+        self._pending = {}
+        self._loop = None
+        self._fd = None
+        self._poll_handle = None
+
+    @classmethod
+    async def connect(cls, inst=None, max_inflight=None, **kwargs):
+        """Open a new connection, like the instance inst does, or with the
+        arguments of ConnectionPool.acquire(). The bind runs in an executor.
+
+        :param inst: An instance
+        :type inst: lib389.DirSrv
+        :param max_inflight: The maximum number of operations in flight
+        :type max_inflight: int
+        :returns: AsyncConnection
+        """
+
+        if inst is not None:
+            kwargs.update(ConnectionPool.instance_params(inst))
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(None, lambda: connect(**kwargs))
+        return cls(conn, max_inflight=max_inflight)
+
+    @property
+    def conn(self):
+        """The DirSrv of the connection"""
+        return self._conn
+
+    def objects(self, cls, *args, **kwargs):
+        """Make a DSLdapObjects of class cls, for this connection
+
+            groups = conn.objects(Groups, DEFAULT_SUFFIX)
+
+        :returns: AsyncDSLdapObjects
+        """
+        return AsyncDSLdapObjects(self, cls(self._conn, *args, **kwargs))
+
+    def object(self, cls, *args, **kwargs):
+        """Make a DSLdapObject of class cls, for this connection
+
+            group = conn.object(Group, dn=...)
+
+        :returns: AsyncDSLdapObject
+        """
+        return AsyncDSLdapObject(self, cls(self._conn, *args, **kwargs))
+
+    def _attach(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._fd = self._conn.get_option(ldap.OPT_DESC)
+            self._loop.add_reader(self._fd, self._drain)
+            if self._max_inflight:
+                self._inflight = asyncio.Semaphore(self._max_inflight)
+
+    async def _submit(self, method, *args, **kwargs):
+        self._attach()
+        if self._inflight is not None:
+            await self._inflight.acquire()
+        try:
+            msgid = method(*args, **kwargs)
+            future = self._loop.create_future()
+            self._pending[msgid] = future
+            self._schedule_poll()
+            try:
+                return await future
+            except asyncio.CancelledError:
+                if self._pending.pop(msgid, None) is not None:
+                    self._conn.abandon(msgid)
+                raise
+        finally:
+            if self._inflight is not None:
+                self._inflight.release()
+
+    def _drain(self):
+        """Read all the results available, without waiting"""
+        while self._pending:
+            try:
+                rtype, rdata, msgid, rctrls = self._conn.result3(ldap.RES_ANY, all=1, timeout=0)
+            except ldap.LDAPError as e:
+                info = e.args[0] if e.args and isinstance(e.args[0], dict) else {}
+                future = self._pending.pop(info.get('msgid'), None)
+                if future is None:
+                    # We can't tell which operation failed, ask each one
+                    self._drain_each()
+                    return
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if rtype is None:
+                return
+            future = self._pending.pop(msgid, None)
+            if future is not None and not future.done():
+                future.set_result((rtype, rdata, rctrls))
+
+    def _drain_each(self):
+        for msgid in list(self._pending):
+            try:
+                rtype, rdata, _, rctrls = self._conn.result3(msgid, all=1, timeout=0)
+            except ldap.LDAPError as e:
+                future = self._pending.pop(msgid)
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if rtype is not None:
+                future = self._pending.pop(msgid)
+                if not future.done():
+                    future.set_result((rtype, rdata, rctrls))
+
+    def _schedule_poll(self):
+        if self._pending and self._poll_handle is None:
+            self._poll_handle = self._loop.call_later(POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        self._poll_handle = None
+        self._drain()
+        self._schedule_poll()
+
+    async def search(self, base, scope, filterstr='(objectClass=*)', attrlist=None, serverctrls=None,
+                     clientctrls=None):
+        """Search, as search_ext_s()
+
+        :returns: A list of Entry
+        """
+        _, rdata, _ = await self._submit(self._conn.search_ext, base, scope, filterstr, attrlist=attrlist,
+                                         serverctrls=serverctrls, clientctrls=clientctrls)
+        return [Entry(r) for r in rdata]
+
+    async def add(self, dn, modlist, serverctrls=None, clientctrls=None):
+        """Add an entry, as add_ext_s()"""
+        await self._submit(self._conn.add_ext, dn, modlist, serverctrls=serverctrls, clientctrls=clientctrls)
+
+    async def modify(self, dn, modlist, serverctrls=None, clientctrls=None):
+        """Modify an entry, as modify_ext_s()"""
+        await self._submit(self._conn.modify_ext, dn, modlist, serverctrls=serverctrls, clientctrls=clientctrls)
+
+    async def delete(self, dn, serverctrls=None, clientctrls=None):
+        """Delete an entry, as delete_ext_s()"""
+        await self._submit(self._conn.delete_ext, dn, serverctrls=serverctrls, clientctrls=clientctrls)
+
+    def close(self):
+        """Close the connection, the operations in flight fail with SERVER_DOWN"""
+        if self._loop is not None:
+            self._loop.remove_reader(self._fd)
+            if self._poll_handle is not None:
+                self._poll_handle.cancel()
+                self._poll_handle = None
+            self._loop = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ldap.SERVER_DOWN({'desc': 'The connection was closed'}))
+        self._pending.clear()
+        self._conn.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class AsyncDSLdapObject(object):
+    """The awaitable operations of a DSLdapObject
+
+    :param aconn: The connection to use
+    :type aconn: AsyncConnection
+    :param obj: The object
+    :type obj: DSLdapObject
+    """
+
+    def __init__(self, aconn, obj):
+        self._aconn = aconn
+        self._obj = obj
+
+    @property
+    def dn(self):
+        return self._obj.dn
+
+    @property
+    def obj(self):
+        """The synchronous object"""
+        return self._obj
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, self._obj.dn)
+
+    async def _entry(self, attrlist):
+        obj = self._obj
+        entries = await self._aconn.search(obj.dn, ldap.SCOPE_BASE, obj._object_filter, attrlist=attrlist,
+                                           serverctrls=obj._server_controls, clientctrls=obj._client_controls)
+        if not entries:
+            # The entry exists, but it is not an object of this type
+            raise ldap.NO_SUCH_OBJECT("Entry %s does not match the filter %s" % (obj.dn, obj._object_filter))
+        return entries[0]
+
+    async def exists(self):
+        """Check if the entry exists
+
+        :returns: True if it exists
+        """
+        try:
+            await self._entry(['1.1'])
+        except ldap.NO_SUCH_OBJECT:
+            return False
+        return True
+
+    async def get_attr_vals_bytes(self, key):
+        return (await self._entry([key])).getValues(key)
+
+    async def get_attr_vals_utf8(self, key):
+        return [v.decode('UTF-8') for v in await self.get_attr_vals_bytes(key)]
+
+    async def get_attr_val_bytes(self, key):
+        return (await self._entry([key])).getValue(key)
+
+    async def get_attr_val_utf8(self, key):
+        val = await self.get_attr_val_bytes(key)
+        return val.decode('UTF-8') if val is not None else None
+
+    async def get_all_attrs(self):
+        """Get the user and operational attributes
+
+        :returns: A dict of attribute to list of bytes values
+        """
+        return (await self._entry(['*', '+'])).data
+
+    async def present(self, attr, value=None):
+        """Assert that some attr, or some attr / value exist on the entry,
+        as DSLdapObject.present()"""
+        if value is None:
+            return len(await self.get_attr_vals_bytes(attr)) > 0
+        obj = self._obj
+        filterstr = '(&%s(%s=%s))' % (obj._object_filter, attr, _escape_filter_value(value))
+        results = await self._aconn.search(obj.dn, ldap.SCOPE_BASE, filterstr, attrlist=['1.1'],
+                                           serverctrls=obj._server_controls, clientctrls=obj._client_controls)
+        return len(results) > 0
+
+    async def apply_mods(self, mods):
+        """Perform modification operation using several mods at once
+
+        :param mods: [(action, key, value),] or [(ldap.MOD_DELETE, key),]
+        :type mods: list of tuples
+        :raises: ValueError - if a provided mod op is invalid
+        """
+        obj = self._obj
+        mod_list = _mods_to_modlist(mods)
+        obj.invalidate()
+        await self._aconn.modify(obj.dn, mod_list, serverctrls=obj._server_controls,
+                                 clientctrls=obj._client_controls)
+
+    async def replace(self, key, value):
+        await self.apply_mods([(ldap.MOD_REPLACE, key, value)])
+
+    async def add(self, key, value):
+        await self.apply_mods([(ldap.MOD_ADD, key, value)])
+
+    async def remove(self, key, value):
+        await self.apply_mods([(ldap.MOD_DELETE, key, value)])
+
+    async def create(self, rdn=None, properties=None, basedn=None):
+        """Add a new entry, as DSLdapObject.create()
+
+        :returns: self
+        """
+        obj = self._obj
+        op = obj._bulk_add_op(rdn, properties, basedn, None)
+        await self._aconn.add(op.dn, op.data, serverctrls=obj._server_controls, clientctrls=obj._client_controls)
+        return self
+
+    async def delete(self):
+        """Delete the entry, unless it is protected"""
+        obj = self._obj
+        if obj._protected:
+            return
+        obj.invalidate()
+        await self._aconn.delete(obj.dn, serverctrls=obj._server_controls, clientctrls=obj._client_controls)
+
+    async def wait_task(self, timeout=120, interval=2):
+        """Wait until the task of this entry is complete, as Task.wait()
+
+        :param timeout: Seconds to wait, None for ever
+        :type timeout: int
+        :param interval: Seconds between checks
+        :type interval: int
+        :returns: The exit code of the task, None if it is unknown
+        """
+        waited = 0
+        while timeout is None or waited < timeout:
+            try:
+                entry = await self._entry(['nsTaskExitCode', 'nsTaskLog', 'nsTaskWarning'])
+            except ldap.NO_SUCH_OBJECT:
+                # The task cleaned it self up.
+                return None
+            exit_code = entry.getValue('nsTaskExitCode')
+            if exit_code is not None:
+                # Keep the task object in the same state as after Task.wait()
+                self._obj._exit_code = exit_code.decode('UTF-8')
+                self._obj._task_log = (entry.getValue('nsTaskLog') or b'').decode('UTF-8')
+                return int(exit_code)
+            await asyncio.sleep(interval)
+            waited += interval
+        return None
+
+
+class AsyncDSLdapObjects(object):
+    """The awaitable operations of a DSLdapObjects
+
+    :param aconn: The connection to use
+    :type aconn: AsyncConnection
+    :param objects: The collection
+    :type objects: DSLdapObjects
+    """
+
+    def __init__(self, aconn, objects):
+        self._aconn = aconn
+        self._objects = objects
+
+    @property
+    def objects(self):
+        """The synchronous collection"""
+        return self._objects
+
+    async def _search(self, base, scope, filterstr):
+        objects = self._objects
+        try:
+            entries = await self._aconn.search(base, scope, filterstr, attrlist=objects._list_attrlist,
+                                               serverctrls=objects._server_controls,
+                                               clientctrls=objects._client_controls)
+        except ldap.NO_SUCH_OBJECT:
+            # There are no objects to select from
+            return []
+        return [AsyncDSLdapObject(self._aconn, objects._entry_to_instance(dn=e.dn, entry=e)) for e in entries]
+
+    async def list(self):
+        """Get the children entries, as DSLdapObjects.list()
+
+        :returns: A list of AsyncDSLdapObject
+        """
+        return await self._search(self._objects._basedn, self._objects._scope,
+                                  self._objects._get_objectclass_filter())
+
+    async def filter(self, search, scope=None):
+        """Get the children entries matching search, as DSLdapObjects.filter()
+
+        :returns: A list of AsyncDSLdapObject
+        """
+        objects = self._objects
+        if search:
+            search_filter = _gen_and([objects._get_objectclass_filter(), search])
+        else:
+            search_filter = objects._get_objectclass_filter()
+        if scope is None:
+            scope = objects._scope
+        return await self._search(objects._basedn, scope, search_filter)
+
+    async def get(self, selector=[], dn=None):
+        """Get a child entry with dn or selector, as DSLdapObjects.get()
+
+        :returns: AsyncDSLdapObject
+        """
+        objects = self._objects
+        if dn is not None:
+            results = await self._search(dn, ldap.SCOPE_BASE, objects._get_objectclass_filter())
+        else:
+            results = await self._search(objects._basedn, objects._scope, objects._get_selector_filter(selector))
+        if len(results) == 0:
+            raise ldap.NO_SUCH_OBJECT("No object exists given the filter criteria %s" % selector)
+        if len(results) > 1:
+            raise ldap.UNWILLING_TO_PERFORM("Too many objects matched selection criteria %s" % selector)
+        return results[0]
+
+    async def create(self, rdn=None, properties=None):
+        """Create an object under base DN of the collection, as
+        DSLdapObjects.create()
+
+        :returns: AsyncDSLdapObject
+        """
+        objects = self._objects
+        co = objects._entry_to_instance(dn=None, entry=None)
+        objects._rdn_attribute = co._rdn_attribute
+        (rdn, properties) = objects._validate(rdn, properties)
+        return await AsyncDSLdapObject(self._aconn, co).create(rdn, properties, objects._basedn)
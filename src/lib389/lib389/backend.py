@@ -1077,16 +1077,21 @@ class DatabaseConfig(DSLdapObject):
         return self._db_lib
 
     def set(self, value_pairs):
-        for attr, val in value_pairs:
-            attr = attr.lower()
-            if attr in self._global_attrs:
-                global_config = DSLdapObject(self._instance, dn=self._dn)
-                global_config.replace(attr, val)
-            elif attr in self._db_attrs['bdb']:
-                db_config = DSLdapObject(self._instance, dn=self._db_dn)
-                db_config.replace(attr, val)
-            elif attr in self._db_attrs['lmdb']:
-                pass
-            else:
-                # Unknown attribute
-                raise ValueError("Can not update database configuration with unknown attribute: " + attr)
+        # Paths caches the nsslapd-directory and nsslapd-db-home-directory
+        # of an online instance
+        try:
+            for attr, val in value_pairs:
+                attr = attr.lower()
+                if attr in self._global_attrs:
+                    global_config = DSLdapObject(self._instance, dn=self._dn)
+                    global_config.replace(attr, val)
+                elif attr in self._db_attrs['bdb']:
+                    db_config = DSLdapObject(self._instance, dn=self._db_dn)
+                    db_config.replace(attr, val)
+                elif attr in self._db_attrs['lmdb']:
+                    pass
+                else:
+                    # Unknown attribute
+                    raise ValueError("Can not update database configuration with unknown attribute: " + attr)
+        finally:
+            self._instance.ds_paths.invalidate()
@@ -0,0 +1,178 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Pipelined bulk operations.
+
+The synchronous _s calls wait for the result of an operation before the
+next one is sent, so adding many entries is bound by the round-trip time.
+BulkOperations keeps a window of operations in flight on the connection,
+and collects their results by message id, in the order they were sent.
+"""
+
+from collections import deque, namedtuple
+import ldap
+
+# How many operations BulkOperations keeps in flight by default
+DEFAULT_WINDOW = 64
+
+ADD = 'add'
+MODIFY = 'modify'
+DELETE = 'delete'
+# An operation that failed before it could be sent, its data is the error
+INVALID = 'invalid'
+
+# An operation to send. kind is ADD, MODIFY or DELETE, data the add or modify
+# modlist, or None for a delete. item is what the caller asked for, and obj
+# the DSLdapObject the operation is for, if any: both are returned with the
+# result.
+BulkOp = namedtuple('BulkOp', ['kind', 'dn', 'data', 'item', 'obj'])
+
+
+class BulkResult(object):
+    """The outcome of one operation of a bulk request
+
+    :param op: The operation
+    :type op: BulkOp
+    :param error: The exception the operation failed with, or None
+    :type error: Exception
+    """
+
+    __slots__ = ('op', 'error')
+
+    def __init__(self, op, error=None):
+        self.op = op
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def dn(self):
+        return self.op.dn
+
+    @property
+    def item(self):
+        return self.op.item
+
+    @property
+    def obj(self):
+        return self.op.obj
+
+    def __repr__(self):
+        if self.ok:
+            return '<BulkResult %s %s ok>' % (self.op.kind, self.op.dn)
+        return '<BulkResult %s %s %r>' % (self.op.kind, self.op.dn, self.error)
+
+
+def invalid(item, error):
+    """Make an operation that is reported failed with error, without being sent"""
+    return BulkOp(INVALID, None, error, item, None)
+
+
+class BulkOperations(object):
+    """Send operations with add_ext, modify_ext and delete_ext, keeping up
+    to window of them in flight.
+
+    :param instance: An instance
+    :type instance: lib389.DirSrv
+    :param window: The maximum number of operations in flight
+    :type window: int
+    :param serverctrls: Server controls sent with each operation
+    :type serverctrls: list
+    :param clientctrls: Client controls used with each operation
+    :type clientctrls: list
+    :param timeout: How long to wait for a result, in seconds, -1 for ever
+    :type timeout: int
+    """
+
+    def __init__(self, instance, window=DEFAULT_WINDOW, serverctrls=None, clientctrls=None, timeout=-1):
+        if window < 1:
+            raise ValueError('The window must be at least 1')
+        self._instance = instance
+        self._window = window
+        self._serverctrls = serverctrls
+        self._clientctrls = clientctrls
+        self._timeout = timeout
+        self.sent = 0
+        self.failed = 0
+
+    def _send(self, op):
+        if op.kind == ADD:
+            return self._instance.add_ext(op.dn, op.data, serverctrls=self._serverctrls,
+                                          clientctrls=self._clientctrls)
+        elif op.kind == MODIFY:
+            return self._instance.modify_ext(op.dn, op.data, serverctrls=self._serverctrls,
+                                             clientctrls=self._clientctrls)
+        elif op.kind == DELETE:
+            return self._instance.delete_ext(op.dn, serverctrls=self._serverctrls,
+                                             clientctrls=self._clientctrls)
+        raise ValueError('Invalid bulk operation %s' % op.kind)
+
+    def _collect(self, msgid, op):
+        try:
+            self._instance.result3(msgid, all=1, timeout=self._timeout)
+        except ldap.LDAPError as e:
+            self.failed += 1
+            return BulkResult(op, e)
+        return BulkResult(op)
+
+    def run(self, operations):
+        """Send the operations, and yield their results in the same order.
+        The operations are consumed as the window allows, so they can come
+        from a generator.
+
+        :param operations: The operations to send
+        :type operations: iterable of BulkOp
+        :returns: A generator of BulkResult
+        """
+
+        inflight = deque()
+        try:
+            for op in operations:
+                if op.kind == INVALID:
+                    # Keep the order of the results
+                    self.failed += 1
+                    inflight.append((None, BulkResult(op, op.data)))
+                else:
+                    try:
+                        msgid = self._send(op)
+                        self.sent += 1
+                        inflight.append((msgid, op))
+                    except ldap.SERVER_DOWN:
+                        raise
+                    except ldap.LDAPError as e:
+                        self.failed += 1
+                        inflight.append((None, BulkResult(op, e)))
+                while len(inflight) >= self._window:
+                    yield self._next(inflight)
+            while inflight:
+                yield self._next(inflight)
+        except GeneratorExit:
+            # The caller stopped reading the results, don't leave them queued
+            # on the connection. The operations may still have been applied.
+            for msgid, _ in inflight:
+                if msgid is not None:
+                    self._instance.abandon(msgid)
+            raise
+
+    def _next(self, inflight):
+        msgid, pending = inflight.popleft()
+        if msgid is None:
+            return pending
+        return self._collect(msgid, pending)
+
+    def execute(self, operations):
+        """Send the operations, and return the list of their results
+
+        :param operations: The operations to send
+        :type operations: iterable of BulkOp
+        :returns: A list of BulkResult, in the order of operations
+        """
+
+        return list(self.run(operations))
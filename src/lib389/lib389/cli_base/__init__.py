@@ -9,6 +9,7 @@
 
 import ast
 import logging
+import os
 import sys
 import json
 import ldap
@@ -160,6 +161,37 @@ def disconnect_instance(inst):
         inst.close()
 
 
+def create_subparsers(subparsers, commands, argv=None):
+    """Add the parsers of the subcommands of a tool. Importing every CLI
+    module to build the whole argparse tree takes longer than most commands,
+    so only the modules of the subcommands named on the command line are
+    imported. All of them are for --help, when no subcommand is named, and
+    for shell completion.
+
+    :param subparsers: The subparsers of the tool
+    :type subparsers: argparse._SubParsersAction
+    :param commands: The subcommands, in the order of the help, as tuples of
+                     the names the module adds, the module, and the name of
+                     its function adding them
+    :type commands: list of (tuple, str, str)
+    :param argv: The arguments of the tool, sys.argv by default
+    :type argv: list
+    """
+
+    if argv is None:
+        argv = sys.argv[1:]
+    # An option value may look like a subcommand, loading its module as well
+    # is harmless.
+    named = set(argv)
+    wanted = [command for command in commands if named.intersection(command[0])]
+    if not wanted or '_ARGCOMPLETE' in os.environ:
+        wanted = commands
+    for _, module, function in wanted:
+        # __import__ rather than importlib, so that python -X importtime
+        # reports the module
+        getattr(__import__(module, fromlist=[function]), function)(subparsers)
+
+
 def populate_attr_arguments(parser, attributes):
     for attr in attributes:
         parser.add_argument('--%s' % attr, nargs='?', help="Value of %s" % attr)
@@ -177,26 +209,34 @@ def _format_status(log, mtype, json=False):
                 log.info('{}: {}'.format(k, vi))
 
 
+def _print_json_list(items):
+    """Print the same document as json.dumps({"type": "list", "items": items}, indent=4),
+    item by item, so that items can be a generator"""
+    print('{\n    "type": "list",\n    "items": [', end='')
+    sep = '\n'
+    for item in items:
+        print(sep + '        ' + json.dumps(item), end='')
+        sep = ',\n'
+    if sep == '\n':
+        # No items
+        print(']\n}')
+    else:
+        print('\n    ]\n}')
+
+
 def _generic_list(inst, basedn, log, manager_class, args=None):
     mc = manager_class(inst, basedn)
-    ol = mc.list()
-    if len(ol) == 0:
-        if args and args.json:
-            print(json.dumps({"type": "list", "items": []}, indent=4))
-        else:
+    # Stream the entries, a large list is never held in memory
+    ol = (o.__unicode__() for o in mc.iter())
+    if args and args.json:
+        _print_json_list(ol)
+    else:
+        found = False
+        for o_str in ol:
+            found = True
+            print(o_str)
+        if not found:
             log.info("No objects to display")
-    elif len(ol) > 0:
-        # We might sort this in the future
-        if args and args.json:
-            json_result = {"type": "list", "items": []}
-        for o in ol:
-            o_str = o.__unicode__()
-            if args and args.json:
-                json_result['items'].append(o_str)
-            else:
-                print(o_str)
-        if args and args.json:
-            print(json.dumps(json_result, indent=4))
 
 
 # Display these entries better!
@@ -6,6 +6,7 @@
 # See LICENSE for details.
 # --- END COPYRIGHT BLOCK ---
 
+import argparse
 import re
 import logging
 import os
@@ -17,7 +18,8 @@ from getpass import getpass
 from lib389._constants import ReplicaRole, DSRC_HOME
 from lib389.cli_base.dsrc import dsrc_to_repl_monitor
 from lib389.utils import is_a_dn, copy_with_permissions, ds_supports_new_changelog
-from lib389.replica import Replicas, ReplicationMonitor, BootstrapReplicationManager, Changelog5, ChangelogLDIF, Changelog
+from lib389.replica import (Replicas, ReplicationMonitor, BootstrapReplicationManager, Changelog5, ChangelogLDIF, Changelog,
+                            DEFAULT_MONITOR_WORKERS)
 from lib389.tasks import CleanAllRUVTask, AbortCleanAllRUVTask
 from lib389._mapped_object import DSLdapObjects
 
@@ -97,6 +99,17 @@ def get_agmt_name(args):
     return agmt_name
 
 
+def _positive_int(value):
+    """An argparse type for the counts that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid int value: '%s'" % value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1, not %d" % number)
+    return number
+
+
 def _args_to_attrs(args):
     attrs = {}
     for arg in vars(args):
@@ -418,7 +431,8 @@ def get_repl_monitor_info(inst, basedn, log, args):
         credentials_cache[key] = credentials
         return credentials
 
-    repl_monitor = ReplicationMonitor(inst)
+    repl_monitor = ReplicationMonitor(inst, workers=getattr(args, 'workers', DEFAULT_MONITOR_WORKERS),
+                                      timeout=getattr(args, 'timeout', None))
     report_dict = repl_monitor.generate_report(get_credentials, args.json)
     report_items = []
 
@@ -475,6 +489,8 @@ def get_repl_monitor_info(inst, basedn, log, args):
 
     if args.json:
         log.info(json.dumps({"type": "list", "items": report_items}, indent=4))
+    else:
+        log.info(f"Report generated in {repl_monitor.duration:.2f} seconds")
 
 # This subcommand is available when 'not ds_supports_new_changelog'
 def create_cl(inst, basedn, log, args):
@@ -1370,6 +1386,12 @@ def create_parser(subparsers):
     repl_monitor_parser.add_argument('-a', '--aliases', nargs="*",
                                      help="If a host:port is assigned an alias, then the alias instead of "
                                           "host:port will be displayed in the output. The format: alias=host:port")
+    repl_monitor_parser.add_argument('--workers', type=_positive_int, default=DEFAULT_MONITOR_WORKERS,
+                                     help="The number of instances of the topology to read at the same time "
+                                          "(default %d)" % DEFAULT_MONITOR_WORKERS)
+    repl_monitor_parser.add_argument('--timeout', type=float, default=None,
+                                     help="The seconds to wait for each instance of the topology to connect, "
+                                          "and to answer each operation. By default there is no timeout")
 #
     ############################################
     # Replication Agmts
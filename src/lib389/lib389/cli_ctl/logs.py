@@ -0,0 +1,229 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+import json
+from dateutil.parser import parse as dt_parse
+from functools import partial
+from lib389._constants import DIRSRV_STATE_ONLINE
+from lib389.dirsrv_log import DirsrvAccessLog, DirsrvErrorLog, parse_log_timestamp, seek_log
+from lib389.dseldif import DSEldif
+from lib389.index_advisor import IndexAdvisor, UnindexedSearchStats
+from lib389.latency import LatencyAggregator, DIMENSIONS, DEFAULT_PERCENTILES
+from lib389.logconv import AccessLogAnalyzer
+
+
+def logs_analyze(inst, log, args):
+    """Produce a logconv style report of the access logs"""
+    analyzer = AccessLogAnalyzer(DirsrvAccessLog(inst), jobs=args.jobs, root_dn=args.rootdn)
+    stats = analyzer.analyze(paths=args.file or None, archive=not args.current)
+    if args.json:
+        log.info(json.dumps(stats.to_dict(args.top), indent=4))
+    else:
+        for line in stats.format_report(args.top):
+            log.info(line)
+
+
+def _format_latency(log, title, summary, percentiles):
+    values = ' '.join('p%s=%.6f' % (pct, summary['p%s' % pct]) for pct in percentiles)
+    log.info(f"{summary['count']:>10}  {values}  max={summary['max']:.6f}  {title}")
+
+
+def logs_latency(inst, log, args):
+    """Report etime percentiles by operation type, base, filter shape and client"""
+    percentiles = tuple(args.percentiles)
+    access_log = DirsrvAccessLog(inst)
+    if args.follow:
+        aggregator = LatencyAggregator(dimensions=args.by, max_minutes=args.minutes)
+        reported = set()
+        for record in access_log.follow(checkpoint=args.checkpoint).follow(args.interval):
+            aggregator.feed_record(record)
+            # Report each minute once it is complete, that is once a later one started.
+            for minute in list(aggregator.series)[:-1]:
+                if minute not in reported:
+                    reported.add(minute)
+                    summary = aggregator.series[minute].to_dict(percentiles)
+                    if args.json:
+                        log.info(json.dumps(dict(minute=minute, **summary)))
+                    else:
+                        _format_latency(log, minute, summary, percentiles)
+            reported.intersection_update(aggregator.series)
+        return
+
+    factory = partial(LatencyAggregator, dimensions=args.by)
+    analyzer = AccessLogAnalyzer(access_log, jobs=args.jobs, factory=factory)
+    aggregator = analyzer.analyze(paths=args.file or None, archive=not args.current)
+    report = aggregator.to_dict(percentiles, args.top)
+    if args.json:
+        log.info(json.dumps(report, indent=4))
+        return
+    if report['overall']['count'] == 0:
+        log.info("No operations with an etime were found")
+        return
+    log.info("----- Overall -----")
+    _format_latency(log, 'all operations', report['overall'], percentiles)
+    for dim in args.by:
+        log.info(f"\n----- Top {args.top} by {dim} -----")
+        for summary in report['dimensions'][dim]:
+            _format_latency(log, summary['key'], summary, percentiles)
+    log.info("\n----- Per minute -----")
+    for summary in report['series']:
+        _format_latency(log, summary['minute'], summary, percentiles)
+
+
+def _dsconf_command(inst, suggestion):
+    attr = suggestion['attribute']
+    new_types = [t for t in suggestion['types'] if t not in suggestion['existing']]
+    if suggestion['existing']:
+        types = ' '.join(f'--add-type {t}' for t in new_types)
+        return f"dsconf {inst.serverid} backend index set --attr {attr} {types} --reindex {suggestion['backend']}"
+    types = ' '.join(f'--index-type {t}' for t in new_types)
+    return f"dsconf {inst.serverid} backend index add --attr {attr} {types} --reindex {suggestion['backend']}"
+
+
+def logs_index_advice(inst, log, args):
+    """Recommend the indexes that would remove the costliest unindexed searches"""
+    analyzer = AccessLogAnalyzer(DirsrvAccessLog(inst), jobs=args.jobs, factory=UnindexedSearchStats)
+    stats = analyzer.analyze(paths=args.file or None, archive=not args.current)
+    if inst.state == DIRSRV_STATE_ONLINE:
+        backends = IndexAdvisor.get_backends(inst)
+    else:
+        backends = DSEldif(inst).get_backend_indexes()
+    advice = IndexAdvisor(backends).advise(stats)
+    suggestions = advice['suggestions'][:args.top]
+    for suggestion in suggestions:
+        suggestion['command'] = _dsconf_command(inst, suggestion)
+    if args.json:
+        log.info(json.dumps({'suggestions': suggestions, 'unresolved': advice['unresolved'][:args.top]}, indent=4))
+        return
+    if not stats.searches:
+        log.info("No unindexed searches were found")
+        return
+    log.info("----- Suggested indexes -----")
+    for rank, suggestion in enumerate(suggestions, 1):
+        benefit = suggestion['benefit']
+        log.info(f"\n[{rank}] {suggestion['attribute']} ({', '.join(suggestion['types'])}) in backend "
+                 f"{suggestion['backend']} ({suggestion['suffix']})")
+        if suggestion['existing']:
+            log.info(f"      - existing index:  {', '.join(suggestion['existing'])}")
+        log.info(f"      - searches:        {suggestion['searches']}")
+        log.info(f"      - cost:            {suggestion['cost']:.6f}")
+        log.info(f"      - predicted gain:  {benefit['etime_saved']:.6f} seconds of etime "
+                 f"({benefit['percent']:.1f}% of the unindexed searches)")
+        for srch_filter in suggestion['filters']:
+            log.info(f"      - filter:          {srch_filter}")
+        log.info(f"      - apply with:      {suggestion['command']}")
+    if advice['unresolved']:
+        log.info("\n----- Unindexed searches no new index would help -----")
+        for search in advice['unresolved'][:args.top]:
+            log.info(f"\n  {search['filter']} under {search['base']}")
+            log.info(f"      - searches:        {search['count']}")
+            log.info(f"      - etime:           {search['etime']:.6f}")
+            log.info(f"      - reason:          {search['reason']}")
+
+
+def _parse_time(value):
+    """Accept the log timestamp format as well as ISO 8601 and the like"""
+    if value is None:
+        return None
+    try:
+        return parse_log_timestamp(value)
+    except (ValueError, KeyError):
+        pass
+    try:
+        return dt_parse(value)
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid time '{value}', use a format like 2016-04-27T10:02:00 or 27/Apr/2016:10:02:00")
+
+
+def logs_extract(inst, log, args):
+    """Print the lines logged within a time window"""
+    start = _parse_time(args.start)
+    end = _parse_time(args.end)
+    if args.file:
+        lines = (line for path in args.file for line in seek_log(path, start, end))
+    else:
+        server_log = DirsrvErrorLog(inst) if args.error else DirsrvAccessLog(inst)
+        lines = server_log.seek(start, end, archive=args.archive)
+    if args.output:
+        with open(args.output, 'w') as out:
+            out.writelines(lines)
+    else:
+        for line in lines:
+            log.info(line.rstrip('\n'))
+
+
+def create_parser(subparsers):
+    logs_parser = subparsers.add_parser('logs', help="Analyze the server logs")
+    subcommands = logs_parser.add_subparsers(help='action')
+
+    analyze_parser = subcommands.add_parser('analyze', help="Generate a report of the access logs, including rotated and "
+                                                            "compressed logs. This replaces logconv.pl")
+    analyze_parser.set_defaults(func=logs_analyze)
+    analyze_parser.add_argument('-f', '--file', nargs='+', default=None,
+                                help="Analyze these access logs (oldest first) instead of the instance logs")
+    analyze_parser.add_argument('--current', action='store_true', default=False,
+                                help="Only analyze the current access log, skipping rotated logs")
+    analyze_parser.add_argument('--jobs', type=int, default=None,
+                                help="Number of worker processes, defaults to the number of CPUs")
+    analyze_parser.add_argument('-D', '--rootdn', default='cn=Directory Manager',
+                                help="The Directory Manager DN, used to count root binds")
+    analyze_parser.add_argument('-s', '--top', type=int, default=20,
+                                help="The number of entries in the top N lists of the report")
+
+    latency_parser = subcommands.add_parser('latency', help="Report etime percentiles broken down by operation type, "
+                                                            "search base, filter shape and client address")
+    latency_parser.set_defaults(func=logs_latency)
+    latency_parser.add_argument('-f', '--file', nargs='+', default=None,
+                                help="Analyze these access logs (oldest first) instead of the instance logs")
+    latency_parser.add_argument('--current', action='store_true', default=False,
+                                help="Only analyze the current access log, skipping rotated logs")
+    latency_parser.add_argument('--jobs', type=int, default=None,
+                                help="Number of worker processes, defaults to the number of CPUs")
+    latency_parser.add_argument('--by', nargs='+', choices=DIMENSIONS, default=list(DIMENSIONS),
+                                help="The dimensions to break the latencies down by")
+    latency_parser.add_argument('--percentiles', nargs='+', type=float, default=list(DEFAULT_PERCENTILES),
+                                help="The percentiles to report")
+    latency_parser.add_argument('-s', '--top', type=int, default=20,
+                                help="The number of keys reported per dimension")
+    latency_parser.add_argument('--follow', action='store_true', default=False,
+                                help="Follow the access log, and report the percentiles of each minute as it completes")
+    latency_parser.add_argument('--interval', type=float, default=5.0,
+                                help="In follow mode, how often to read the log, in seconds")
+    latency_parser.add_argument('--checkpoint', default=None,
+                                help="In follow mode, a file to keep the read position in across runs")
+    latency_parser.add_argument('--minutes', type=int, default=60,
+                                help="In follow mode, the number of minutes of history to keep")
+
+    advice_parser = subcommands.add_parser('index-advice', help="Recommend indexes from the unindexed searches of the "
+                                                                "access logs, ranked by their predicted benefit")
+    advice_parser.set_defaults(func=logs_index_advice)
+    advice_parser.add_argument('-f', '--file', nargs='+', default=None,
+                               help="Analyze these access logs (oldest first) instead of the instance logs")
+    advice_parser.add_argument('--current', action='store_true', default=False,
+                               help="Only analyze the current access log, skipping rotated logs")
+    advice_parser.add_argument('--jobs', type=int, default=None,
+                               help="Number of worker processes, defaults to the number of CPUs")
+    advice_parser.add_argument('-s', '--top', type=int, default=10,
+                               help="The number of suggestions to report")
+
+    extract_parser = subcommands.add_parser('extract', help="Print the lines logged within a time window. The window is "
+                                                            "found by binary search, so this is fast even on huge logs")
+    extract_parser.set_defaults(func=logs_extract)
+    extract_parser.add_argument('--start', default=None,
+                                help="Skip the lines logged before this time, such as 2016-04-27T10:02:00 or "
+                                     "27/Apr/2016:10:02:00 +1000. Times without a timezone are local time")
+    extract_parser.add_argument('--end', default=None,
+                                help="Stop at the first line logged after this time")
+    extract_parser.add_argument('--error', action='store_true', default=False,
+                                help="Read the errors log instead of the access log")
+    extract_parser.add_argument('--archive', action='store_true', default=False,
+                                help="Also read the rotated logs covering the window")
+    extract_parser.add_argument('-f', '--file', nargs='+', default=None,
+                                help="Read these logs (oldest first) instead of the instance logs")
+    extract_parser.add_argument('-o', '--output', default=None,
+                                help="Write the lines to this file instead of the standard output")
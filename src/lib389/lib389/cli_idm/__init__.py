@@ -10,6 +10,7 @@
 import ldap
 from getpass import getpass
 import json
+from lib389.cli_base import _print_json_list
 
 
 def _get_arg(args, msg=None):
@@ -64,24 +65,17 @@ def _warn(data, msg=None):
 
 def _generic_list(inst, basedn, log, manager_class, args=None):
     mc = manager_class(inst, basedn)
-    ol = mc.list()
-    if len(ol) == 0:
-        if args and args.json:
-            print(json.dumps({"type": "list", "items": []}, indent=4))
-        else:
+    # Stream the entries, a large list is never held in memory
+    ol = (o.__unicode__() for o in mc.iter())
+    if args and args.json:
+        _print_json_list(ol)
+    else:
+        found = False
+        for o_str in ol:
+            found = True
+            log.info(o_str)
+        if not found:
             log.info("No objects to display")
-    elif len(ol) > 0:
-        # We might sort this in the future
-        if args and args.json:
-            json_result = {"type": "list", "items": []}
-        for o in ol:
-            o_str = o.__unicode__()
-            if args and args.json:
-                json_result['items'].append(o_str)
-            else:
-                log.info(o_str)
-        if args and args.json:
-            print(json.dumps(json_result, indent=4))
 
 
 # Display these entries better!
@@ -73,6 +73,14 @@ class Config(DSLdapObject):
             selinux_label_port(value)
         super(Config, self).replace(key,  value)
 
+    def _modify(self, mods):
+        # Paths reads the directories and logs of an online instance from
+        # cn=config, and caches them
+        try:
+            return super(Config, self)._modify(mods)
+        finally:
+            self._instance.ds_paths.invalidate()
+
     def _alter_log_enabled(self, service, state):
         if service not in ('access', 'error', 'audit'):
             self._log.error('Attempted to enable invalid log service "%s"' % service)
@@ -501,6 +509,13 @@ class LDBMConfig(DSLdapObject):
         self._rdn_attribute = 'cn'
         self._protected = True
 
+    def _modify(self, mods):
+        # Paths caches the nsslapd-directory of an online instance
+        try:
+            return super(LDBMConfig, self)._modify(mods)
+        finally:
+            self._instance.ds_paths.invalidate()
+
 
 class BDB_LDBMConfig(DSLdapObject):
     """
@@ -518,3 +533,10 @@ class BDB_LDBMConfig(DSLdapObject):
         self._config_compare_exclude = []
         self._rdn_attribute = 'cn'
         self._protected = True
+
+    def _modify(self, mods):
+        # Paths caches the nsslapd-db-home-directory of an online instance
+        try:
+            return super(BDB_LDBMConfig, self)._modify(mods)
+        finally:
+            self._instance.ds_paths.invalidate()
@@ -9,12 +9,17 @@
 """Helpers for managing the directory server internal logs.
 """
 
+import asyncio
 import copy
+import json
+import os
 import re
 import gzip
-from dateutil.parser import parse as dt_parse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from glob import glob
-from lib389.utils import ensure_bytes
 from lib389._mapped_object_lint import DSLint
 from lib389.lint import (
     DSLOGNOTES0001,  # Unindexed search
@@ -33,13 +38,604 @@ MONTH_LOOKUP = {
     'Jun': 6,
     'Jul': 7,
     'Aug': 8,
-    'Oct': 9,
-    'Sep': 10,
+    'Sep': 9,
+    'Oct': 10,
     'Nov': 11,
     'Dec': 12,
 }
 
 
+@lru_cache(maxsize=64)
+def _tz_offset(tz):
+    """Turn a log timezone like +1000 into a tzinfo"""
+    offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5]))
+    if tz[0] == '-':
+        offset = -offset
+    return timezone(offset)
+
+
+@lru_cache(maxsize=4096)
+def _decode_second(second, tz):
+    """Decode the second resolution part of a timestamp. Consecutive log lines
+    share the same second, so this is memoized. A timestamp without a
+    timezone is local time.
+    """
+    date, hour, minute, sec = second.split(':')
+    day, month, year = date.split('/')
+    if not tz:
+        return datetime(int(year), MONTH_LOOKUP[month], int(day),
+                        int(hour), int(minute), int(sec)).astimezone()
+    return datetime(int(year), MONTH_LOOKUP[month], int(day),
+                    int(hour), int(minute), int(sec), tzinfo=_tz_offset(tz))
+
+
+def parse_log_timestamp(ts):
+    """Parse a log timestamp such as [27/Apr/2016:12:49:49.726093186 +1000]
+    @param ts - The timestamp string from a log, with or without brackets,
+                and with or without the timezone
+    @return - a "datetime" object
+    """
+    stamp, _, tz = ts.strip('[]').partition(' ')
+    second, _, fraction = stamp.partition('.')
+    dt = _decode_second(second, tz)
+    if fraction:
+        dt = dt.replace(microsecond=int(fraction[:6].ljust(6, '0')))
+    return dt
+
+
+# The operations an AccessLogIndex records the request line of. The SORT,
+# VLV, ENTRY and ABANDON lines of an operation are not requests.
+_REQUEST_ACTIONS = frozenset([b'SRCH', b'MOD', b'ADD', b'DEL', b'MODRDN', b'CMP', b'BIND', b'EXT'])
+
+# Fields of a RESULT line that are copied onto the record.
+_RESULT_KEYS = frozenset(['err', 'tag', 'nentries', 'wtime', 'optime', 'etime', 'notes', 'csn'])
+
+
+class AccessLogRecord(object):
+    """A compact, parsed access log line.
+
+    All values are kept as the strings found in the log, fields that are not
+    present in the line are None. The datetime is only decoded on access.
+    """
+    __slots__ = ('timestamp', 'conn', 'op', 'action', 'fd', 'slot', 'remote', 'local', 'status',
+                 'err', 'tag', 'nentries', 'wtime', 'optime', 'etime', 'notes', 'csn', 'rem')
+
+    def __init__(self, timestamp, conn):
+        self.timestamp = timestamp
+        self.conn = conn
+        self.op = None
+        self.action = None
+        self.fd = None
+        self.slot = None
+        self.remote = None
+        self.local = None
+        self.status = None
+        self.err = None
+        self.tag = None
+        self.nentries = None
+        self.wtime = None
+        self.optime = None
+        self.etime = None
+        self.notes = None
+        self.csn = None
+        self.rem = None
+
+    def __repr__(self):
+        return '<AccessLogRecord %s>' % ' '.join('%s=%s' % (k, getattr(self, k))
+                                                 for k in self.__slots__ if getattr(self, k) is not None)
+
+    @property
+    def datetime(self):
+        return parse_log_timestamp(self.timestamp)
+
+    def quoted(self, key):
+        """Return the value of key="..." from the operation arguments, such as
+        the base or the filter of a SRCH, or None
+        """
+        args = self.rem
+        if args is None:
+            return None
+        idx = args.find(key + '="')
+        if idx == -1:
+            return None
+        start = idx + len(key) + 2
+        end = args.find('" ', start)
+        if end == -1:
+            end = args.rfind('"')
+        return args[start:end]
+
+    def keyword(self, key):
+        """Return the value of an unquoted key=value from the operation
+        arguments, such as the version of a BIND, or None
+        """
+        args = self.rem
+        if args is None:
+            return None
+        if args.startswith(key + '='):
+            start = len(key) + 1
+        else:
+            idx = args.find(' ' + key + '=')
+            if idx == -1:
+                return None
+            start = idx + len(key) + 2
+        end = args.find(' ', start)
+        if end == -1:
+            return args[start:]
+        return args[start:end]
+
+    def to_dict(self):
+        """Return the record as the dictionary historically returned by
+        DirsrvAccessLog.parse_line
+        """
+        action = {k: getattr(self, k) for k in self.__slots__ if getattr(self, k) is not None}
+        action['datetime'] = self.datetime
+        return action
+
+
+def parse_access_line(line):
+    """Break up an access log line in a single pass, without regexes
+    @param line - A text line from an access log
+    @return - an AccessLogRecord, or None if this is not a connection line
+    """
+    ts_end = line.find('] conn=')
+    if ts_end == -1 or line[:1] != '[':
+        return None
+    conn, _, rest = line[ts_end + 7:].rstrip().partition(' ')
+    record = AccessLogRecord(line[:ts_end + 1], conn)
+
+    if rest.startswith('op='):
+        record.op, _, rest = rest[3:].partition(' ')
+        if rest.startswith('fd='):
+            # fd=64 closed - U1
+            record.fd, _, rest = rest[3:].partition(' ')
+            record.action = 'DISCONNECT'
+            record.status = rest.rpartition(' - ')[2]
+            return record
+        record.action, _, record.rem = rest.partition(' ')
+        if record.action == 'RESULT':
+            for token in record.rem.split(' '):
+                key, sep, value = token.partition('=')
+                if sep and key in _RESULT_KEYS:
+                    setattr(record, key, value)
+    elif rest.startswith('fd='):
+        # fd=64 slot=64 [SSL ]connection from ::1 to ::1
+        record.fd, _, rest = rest[3:].partition(' ')
+        record.action = 'CONNECT'
+        if rest.startswith('slot='):
+            record.slot, _, rest = rest[5:].partition(' ')
+        idx = rest.find('connection from ')
+        if idx != -1:
+            record.remote, _, record.local = rest[idx + 16:].partition(' to ')
+    else:
+        # TLS/SSL details, or other per connection information
+        record.action, _, record.rem = rest.partition(' ')
+    return record
+
+
+class AccessLogIndex(object):
+    """A one pass index of an access log, from (conn, op) to the byte offsets
+    of the request lines (SRCH, MOD, ...) and of the RESULT lines.
+
+    The index is persisted next to the log as a hidden file, keyed by the
+    inode and size of the log. When the log has only grown since the index
+    was saved, only the new bytes are scanned.
+
+    Connection numbers restart with the server, so a (conn, op) pair can map
+    to several offsets, in log order.
+
+    @param path - the access log to index
+    @param index_path - where to persist the index, defaults to .<log>.idx
+    """
+    VERSION = 2
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        if index_path is None:
+            index_path = os.path.join(os.path.dirname(path), '.%s.idx' % os.path.basename(path))
+        self.index_path = index_path
+        self.inode = None
+        self.size = 0
+        self.requests = {}
+        self.results = {}
+
+    def _load(self, st):
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != self.VERSION or data.get('inode') != st.st_ino or data.get('size', 0) > st.st_size:
+            return False
+        self.inode = data['inode']
+        self.size = data['size']
+        self.requests = data['requests']
+        self.results = data['results']
+        return True
+
+    def _save(self):
+        data = {
+            'version': self.VERSION,
+            'inode': self.inode,
+            'size': self.size,
+            'requests': self.requests,
+            'results': self.results,
+        }
+        tmp_path = self.index_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            # The log directory may not be writable by us, the index then
+            # only lives as long as this object.
+            pass
+
+    def _scan(self, lf, start):
+        """Index the complete lines from start onward, return the offset after
+        the last complete line
+        """
+        requests = self.requests
+        results = self.results
+        pos = start
+        lf.seek(start)
+        for line in lf:
+            if not line.endswith(b'\n'):
+                # A line that is still being written, index it next time.
+                break
+            offset = pos
+            pos += len(line)
+            idx = line.find(b'] conn=')
+            if idx == -1:
+                continue
+            conn_end = line.find(b' ', idx + 7)
+            if line[conn_end + 1:conn_end + 4] != b'op=':
+                continue
+            op_end = line.find(b' ', conn_end + 4)
+            action = line[op_end + 1:line.find(b' ', op_end + 1)]
+            if action == b'RESULT':
+                target = results
+            elif action in _REQUEST_ACTIONS:
+                target = requests
+            else:
+                continue
+            key = line[idx + 7:conn_end].decode() + ',' + line[conn_end + 4:op_end].decode()
+            offsets = target.get(key)
+            if offsets is None:
+                target[key] = [offset]
+            else:
+                offsets.append(offset)
+        return pos
+
+    def build(self):
+        """Load the persisted index, and bring it up to date with the log
+        @return - self
+        """
+        st = os.stat(self.path)
+        if self.inode != st.st_ino or self.size > st.st_size:
+            if not self._load(st):
+                self.inode = st.st_ino
+                self.size = 0
+                self.requests = {}
+                self.results = {}
+        if self.size < st.st_size:
+            with open(self.path, 'rb') as lf:
+                self.size = self._scan(lf, self.size)
+            self._save()
+        return self
+
+    def read_line(self, offset):
+        """Read the log line starting at offset"""
+        with open(self.path, 'rb') as lf:
+            lf.seek(offset)
+            return lf.readline().decode('utf-8', errors='replace')
+
+    def request_offset(self, conn, op, before=None):
+        """Find the request line of an operation
+        @param conn - the connection number
+        @param op - the operation number
+        @param before - the offset of the matching RESULT, to pick the right
+                        operation when the server has restarted
+        @return - the byte offset of the request, or None
+        """
+        offsets = self.requests.get('%s,%s' % (conn, op), [])
+        if before is not None:
+            offsets = [o for o in offsets if o < before]
+        return offsets[-1] if offsets else None
+
+    def result_offset(self, conn, op, after=None):
+        """Find the RESULT line of an operation
+        @param conn - the connection number
+        @param op - the operation number
+        @param after - the offset of the request, to pick the right operation
+                       when the server has restarted
+        @return - the byte offset of the result, or None
+        """
+        offsets = self.results.get('%s,%s' % (conn, op), [])
+        if after is not None:
+            offsets = [o for o in offsets if o > after]
+        return offsets[0] if offsets else None
+
+    def get_request(self, conn, op, before=None):
+        """Return the request line of an operation, or None"""
+        offset = self.request_offset(conn, op, before)
+        return None if offset is None else self.read_line(offset)
+
+    def get_result(self, conn, op, after=None):
+        """Return the RESULT line of an operation, or None"""
+        offset = self.result_offset(conn, op, after)
+        return None if offset is None else self.read_line(offset)
+
+
+def open_log(path):
+    """Open a log for reading as text, decompressing rotated gzip logs
+    @param path - the path of the log
+    @return - a file object
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', errors='replace')
+    return open(path, 'r', errors='replace')
+
+
+def _first_timestamp(path):
+    """Return the datetime of the first timestamped line of a log, or None.
+    Only the head of the file is read, even when it is compressed.
+    """
+    with open_log(path) as lf:
+        for line in lf:
+            if line.startswith('['):
+                ts_end = line.find(']')
+                try:
+                    return parse_log_timestamp(line[:ts_end + 1])
+                except (ValueError, KeyError):
+                    continue
+    return None
+
+
+def _search_log(path, pattern, start=None, end=None):
+    """Return the lines of a (possibly compressed) log matching pattern, and
+    within [start, end] when a time range is given. Compressed logs are
+    decompressed as a stream.
+    """
+    results = []
+    prog = re.compile(pattern)
+    with open_log(path) as lf:
+        for line in lf:
+            if not prog.match(line):
+                continue
+            if start is not None or end is not None:
+                if not line.startswith('['):
+                    continue
+                try:
+                    dt = parse_log_timestamp(line[:line.find(']') + 1])
+                except (ValueError, KeyError):
+                    continue
+                if (start is not None and dt < start) or (end is not None and dt > end):
+                    continue
+            results.append(line)
+    return results
+
+
+def _search_log_args(args):
+    return _search_log(*args)
+
+
+def _aware(dt):
+    """Log timestamps carry their timezone, naive datetimes are local time"""
+    if dt is not None and dt.tzinfo is None:
+        return dt.astimezone()
+    return dt
+
+
+def _line_timestamp(line):
+    """Return the datetime of a binary log line, or None if it has none"""
+    if not line.startswith(b'['):
+        return None
+    try:
+        return parse_log_timestamp(line[:line.find(b']') + 1].decode('ascii'))
+    except (ValueError, KeyError, UnicodeDecodeError):
+        return None
+
+
+def _timestamp_at(lf, offset, limit):
+    """Return (offset, datetime) of the first timestamped line starting at or
+    after offset and before limit, or (None, None)
+    """
+    if offset > 0:
+        # Realign on the start of the next line, unless we are on one already
+        lf.seek(offset - 1)
+        offset += len(lf.readline()) - 1
+    else:
+        lf.seek(0)
+    while offset < limit:
+        line = lf.readline()
+        if not line:
+            break
+        dt = _line_timestamp(line)
+        if dt is not None:
+            return offset, dt
+        offset += len(line)
+    return None, None
+
+
+def seek_log_time(lf, when, size=None):
+    """Binary search the offset of the first line logged at or after when.
+    Lines without a timestamp, like the continuation of multi line error log
+    messages, belong to the timestamped line before them.
+    @param lf - a log opened in binary mode
+    @param when - timezone aware datetime
+    @param size - the size of the log, defaults to the size of lf
+    @return - the byte offset of the line, or size if there is none
+    """
+    if size is None:
+        size = os.fstat(lf.fileno()).st_size
+    # The line we look for starts in [lo, hi], hi being the size or the
+    # start of a line logged at or after when.
+    lo = 0
+    hi = size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        pos, dt = _timestamp_at(lf, mid, hi)
+        if pos is None or dt >= when:
+            hi = mid
+        else:
+            lo = pos + 1
+    pos, _ = _timestamp_at(lf, lo, size)
+    return size if pos is None else pos
+
+
+def seek_log(path, start=None, end=None):
+    """Iterate over the lines of a log logged between start and end. The
+    start is found by binary search, so only the lines of the window are
+    read. Compressed logs can't be seeked, and are filtered as a stream.
+    @param path - the path of the log
+    @param start - datetime, skip the lines logged before it
+    @param end - datetime, stop at the first line logged after it
+    @return - a generator of lines (str)
+    """
+    start = _aware(start)
+    end = _aware(end)
+    if path.endswith('.gz'):
+        lf = gzip.open(path, 'rb')
+        skipping = start is not None
+    else:
+        lf = open(path, 'rb')
+        if start is not None:
+            lf.seek(seek_log_time(lf, start))
+        skipping = False
+    with lf:
+        for line in lf:
+            dt = _line_timestamp(line)
+            if dt is not None:
+                if skipping:
+                    if dt < start:
+                        continue
+                    skipping = False
+                if end is not None and dt > end:
+                    return
+            elif skipping:
+                continue
+            yield line.decode('utf-8', errors='replace')
+
+
+class LogFollower(object):
+    """Incrementally read the records appended to a log since the last read.
+
+    The position is kept as an (inode, offset) checkpoint, optionally saved
+    to a file so that it survives restarts of the collector. When the log
+    has been rotated, the remainder of the rotated file is read before the
+    new log, so each cycle costs O(new bytes). Rotated logs that have been
+    compressed in the meantime can't be resumed, and are skipped.
+
+    @param dirsrv_log - a DirsrvAccessLog or DirsrvErrorLog
+    @param checkpoint - path of the file to persist the checkpoint in
+    @param from_start - with no checkpoint, read the existing content of the
+                        log rather than only what is appended from now on
+    """
+
+    def __init__(self, dirsrv_log, checkpoint=None, from_start=False):
+        self._log = dirsrv_log
+        self._checkpoint = checkpoint
+        self.inode = None
+        self.offset = 0
+        if not self._load() and not from_start:
+            try:
+                st = os.stat(self._log._get_log_path())
+                self.inode = st.st_ino
+                self.offset = st.st_size
+            except OSError:
+                pass
+
+    def _load(self):
+        if self._checkpoint is None:
+            return False
+        try:
+            with open(self._checkpoint, 'r') as f:
+                data = json.load(f)
+            self.inode = data['inode']
+            self.offset = data['offset']
+        except (OSError, ValueError, KeyError):
+            return False
+        return True
+
+    def save(self):
+        """Persist the checkpoint, if a checkpoint file was given"""
+        if self._checkpoint is None:
+            return
+        tmp_path = self._checkpoint + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'inode': self.inode, 'offset': self.offset}, f)
+        os.replace(tmp_path, self._checkpoint)
+
+    def _pending_files(self):
+        """Return the (path, inode, offset) to read, oldest first"""
+        current = self._log._get_log_path()
+        try:
+            st = os.stat(current)
+        except OSError:
+            return []
+        if self.inode is None or self.inode == st.st_ino:
+            # Same file, unless it was truncated in place.
+            offset = self.offset if self.offset <= st.st_size else 0
+            return [(current, st.st_ino, offset)]
+
+        # Rotated: finish the file we were reading, then anything rotated
+        # after it, then start the new log from the beginning.
+        pending = []
+        rotated = sorted(p for p in self._log._get_all_log_paths()
+                         if p != current and not p.endswith('.gz'))
+        found = False
+        for path in rotated:
+            try:
+                inode = os.stat(path).st_ino
+            except OSError:
+                continue
+            if inode == self.inode:
+                found = True
+                pending.append((path, inode, self.offset))
+            elif found:
+                pending.append((path, inode, 0))
+        pending.append((current, st.st_ino, 0))
+        return pending
+
+    def read(self):
+        """Yield the records appended since the last read, and advance the
+        checkpoint as they are consumed. Lines that can't be parsed, and a
+        trailing line that is still being written, are not yielded.
+        """
+        try:
+            for path, inode, offset in self._pending_files():
+                self.inode = inode
+                self.offset = offset
+                with open(path, 'rb') as lf:
+                    lf.seek(offset)
+                    for raw in lf:
+                        if not raw.endswith(b'\n'):
+                            break
+                        self.offset += len(raw)
+                        record = self._log.parse_record(raw.decode('utf-8', errors='replace'))
+                        if record is not None:
+                            yield record
+        finally:
+            self.save()
+
+    def follow(self, interval=1.0):
+        """Yield new records forever, polling the log every interval seconds
+        @param interval - the polling interval in seconds
+        """
+        while True:
+            yield from self.read()
+            time.sleep(interval)
+
+    async def follow_async(self, interval=1.0):
+        """Asynchronous variant of follow, for use with "async for"
+        @param interval - the polling interval in seconds
+        """
+        while True:
+            for record in self.read():
+                yield record
+            await asyncio.sleep(interval)
+
+
 class DirsrvLog(DSLint):
     """Class of functions to working with the various DIrectory Server logs
     """
@@ -60,6 +656,15 @@ class DirsrvLog(DSLint):
         """Return all the log paths"""
         return glob("%s.*-*" % self._get_log_path()) + [self._get_log_path()]
 
+    def follow(self, checkpoint=None, from_start=False):
+        """Return an incremental reader of the records appended to this log
+        @param checkpoint - path of a file to persist the read position in
+        @param from_start - with no checkpoint, start at the beginning of
+                            the current log instead of its end
+        @return - a LogFollower
+        """
+        return LogFollower(self, checkpoint=checkpoint, from_start=from_start)
+
     def readlines_archive(self):
         """
         Returns an array of all the lines in all logs, included rotated logs
@@ -69,14 +674,9 @@ class DirsrvLog(DSLint):
         @return - an array of all the lines in all logs
         """
         lines = []
-        for log in self._get_all_log_paths():
-            # Open the log
-            if log.endswith(ensure_bytes('.gz')):
-                with gzip.open(log, 'r') as lf:
-                    lines += lf.readlines()
-            else:
-                with open(log, 'r') as lf:
-                    lines += lf.readlines()
+        for log in self._get_all_log_paths_sorted():
+            with open_log(log) as lf:
+                lines += lf.readlines()
         return lines
 
     def readlines(self):
@@ -93,27 +693,84 @@ class DirsrvLog(DSLint):
                 lines = lf.readlines()
         return lines
 
+    def _get_all_log_paths_sorted(self):
+        """Return all the log paths, oldest first"""
+        current = self._get_log_path()
+        # Rotated logs are suffixed with YYYYMMDD-HHMMSS, so name order is time order.
+        rotated = sorted(p for p in self._get_all_log_paths() if p != current)
+        return rotated + [current]
+
+    def _prune_log_paths(self, paths, start=None, end=None):
+        """Drop the logs whose time range can't overlap [start, end]. A log
+        covers the time from its first line up to the first line of the
+        log that follows it, so only the head of each file is read.
+        """
+        if start is None and end is None:
+            return paths
+        firsts = [_first_timestamp(p) if os.path.exists(p) else None for p in paths]
+        pruned = []
+        for i, path in enumerate(paths):
+            first = firsts[i]
+            following = [f for f in firsts[i + 1:] if f is not None]
+            last = following[0] if following else None
+            if first is not None and end is not None and first > end:
+                continue
+            if last is not None and start is not None and last < start:
+                continue
+            pruned.append(path)
+        return pruned
+
+    def search_archive(self, pattern, start=None, end=None, jobs=None):
+        """Search all the log files, including compressed rotated logs, in
+        parallel worker processes
+        @param pattern - a regex pattern, matched from the start of the line
+        @param start - datetime, skip lines logged before it. Naive
+                       datetimes are local time.
+        @param end - datetime, skip lines logged after it. Naive datetimes
+                     are local time.
+        @param jobs - the number of worker processes, defaults to the cpu
+                      count. With 1 the search runs in this process.
+        @return - the matching lines, in chronological order
+        """
+        start = _aware(start)
+        end = _aware(end)
+        paths = [p for p in self._get_all_log_paths_sorted() if os.path.exists(p)]
+        paths = self._prune_log_paths(paths, start, end)
+        work = [(path, pattern, start, end) for path in paths]
+        jobs = jobs or os.cpu_count() or 1
+        results = []
+        if jobs == 1 or len(work) <= 1:
+            for lines in map(_search_log_args, work):
+                results += lines
+            return results
+        with ProcessPoolExecutor(max_workers=min(jobs, len(work))) as executor:
+            # map() yields in submission order, so the result stays chronological.
+            for lines in executor.map(_search_log_args, work):
+                results += lines
+        return results
+
+    def seek(self, start=None, end=None, archive=False):
+        """Iterate over the lines logged between start and end, finding the
+        start of the window by binary search rather than reading the whole log
+        @param start - datetime, naive datetimes are local time
+        @param end - datetime, naive datetimes are local time
+        @param archive - also read the rotated logs covering the window
+        @return - a generator of lines (str), in chronological order
+        """
+        if archive:
+            paths = [p for p in self._get_all_log_paths_sorted() if os.path.exists(p)]
+            paths = self._prune_log_paths(paths, _aware(start), _aware(end))
+        else:
+            paths = [self._get_log_path()]
+        for path in paths:
+            yield from seek_log(path, start, end)
+
     def match_archive(self, pattern):
         """Search all the log files, including "zipped" logs
         @param pattern - a regex pattern
         @return - results of the pattern matching
         """
-        results = []
-        prog = re.compile(pattern)
-        for log in self._get_all_log_paths():
-            if log.endswith(ensure_bytes('.gz')):
-                with gzip.open(log, 'r') as lf:
-                    for line in lf:
-                        mres = prog.match(line)
-                        if mres:
-                            results.append(line)
-            else:
-                with open(log, 'r') as lf:
-                    for line in lf:
-                        mres = prog.match(line)
-                        if mres:
-                            results.append(line)
-        return results
+        return self.search_archive(pattern, jobs=1)
 
     def match(self, pattern):
         """Search the current log file for the pattern
@@ -136,21 +793,7 @@ class DirsrvLog(DSLint):
         @param ts - The timestamp string from a log
         @return - a "datetime" object
         """
-        timedata = self.prog_timestamp.match(ts).groupdict()
-        # Now, have to convert month to an int.
-        dt_str = '{YEAR}-{MONTH}-{DAY} {HOUR}-{MINUTE}-{SECOND} {TZ}'.format(
-            YEAR=timedata['year'],
-            MONTH=MONTH_LOOKUP[timedata['month']],
-            DAY=timedata['day'],
-            HOUR=timedata['hour'],
-            MINUTE=timedata['minute'],
-            SECOND=timedata['second'],
-            TZ=timedata['tz'],
-            )
-        dt = dt_parse(dt_str)
-        if timedata['nanosecond']:
-            dt = dt.replace(microsecond=int(int(timedata['nanosecond']) / 1000))
-        return dt
+        return parse_log_timestamp(ts)
 
     def get_time_in_secs(self, log_line):
         """Take the timestamp (not the date) from a DS log and convert it
@@ -182,33 +825,53 @@ class DirsrvAccessLog(DirsrvLog):
         @param dirsrv - A DirSrv object
         """
         super(DirsrvAccessLog, self).__init__(dirsrv)
-        ## We precompile our regex for parse_line to make it faster.
-        self.prog_m1 = re.compile(r'^(?P<timestamp>\[.*\])\sconn=(?P<conn>\d*)\sop=(?P<op>\d*)\s(?P<action>\w*)\s(?P<rem>.*)')
-        self.prog_con = re.compile(r'^(?P<timestamp>\[.*\])\sconn=(?P<conn>\d*)\sfd=(?P<fd>\d*)\sslot=(?P<slot>\d*)\sconnection\sfrom\s(?P<remote>[^\s]*)\sto\s(?P<local>[^\s]*)')
-        self.prog_discon = re.compile(r'^(?P<timestamp>\[.*\])\sconn=(?P<conn>\d*)\sop=(?P<op>\d*)\sfd=(?P<fd>\d*)\s(?P<action>closed)\s-\s(?P<status>\w*)')
-        # RESULT regex's (based off action.rem)
-        self.prog_notes = re.compile(r'err=(?P<err>\d*)\stag=(?P<tag>\d*)\snentries=(?P<nentries>\d*)\setime=(?P<etime>[0-9.]*)\snotes=(?P<notes>\w*)')
-        self.prog_repl = re.compile(r'err=(?P<err>\d*)\stag=(?P<tag>\d*)\snentries=(?P<nentries>\d*)\setime=(?P<etime>[0-9.]*)\scsn=(?P<csn>\w*)')
-        self.prog_result = re.compile(r'err=(?P<err>\d*)\stag=(?P<tag>\d*)\snentries=(?P<nentries>\d*)\setime=(?P<etime>[0-9.]*)\s(?P<rem>.*)')
-        # Lists for each regex type
-        self.full_regexs = [self.prog_m1, self.prog_con, self.prog_discon]
-        self.result_regexs = [self.prog_notes, self.prog_repl,
-                              self.prog_result]
+        self._index = None
+
     @classmethod
     def lint_uid(cls):
         return 'logs'
 
-    def _log_get_search_stats(self, conn, op):
-        lines = self.match(f".* conn={conn} op={op} SRCH base=.*")
-        if len(lines) != 1:
+    def index(self):
+        """Return the (conn, op) offset index of the current access log,
+        brought up to date with the log
+        @return - an AccessLogIndex
+        """
+        path = self._get_log_path()
+        if self._index is None or self._index.path != path:
+            self._index = AccessLogIndex(path)
+        return self._index.build()
+
+    def get_request(self, conn, op):
+        """Return the request line (SRCH, MOD, ...) of an operation from the
+        current access log, using the offset index
+        @param conn - the connection number
+        @param op - the operation number
+        @return - the log line, or None
+        """
+        return self.index().get_request(conn, op)
+
+    def get_result(self, conn, op):
+        """Return the RESULT line of an operation from the current access
+        log, using the offset index
+        @param conn - the connection number
+        @param op - the operation number
+        @return - the log line, or None
+        """
+        return self.index().get_result(conn, op)
+
+    def _log_get_search_stats(self, conn, op, before=None, index=None):
+        if index is None:
+            index = self.index()
+        line = index.get_request(conn, op, before)
+        if line is None or ' SRCH base=' not in line:
             return None
 
-        quoted_vals = re.findall('"([^"]*)"', lines[0])
+        quoted_vals = re.findall('"([^"]*)"', line)
         return {
             'base': quoted_vals[0],
             'filter': quoted_vals[1],
-            'timestamp': re.findall('[(.*)]', lines[0])[0],
-            'scope': lines[0].split(' scope=', 1)[1].split(' ',1)[0]
+            'timestamp': line[:line.find(']') + 1],
+            'scope': line.split(' scope=', 1)[1].split(' ', 1)[0]
         }
 
     def _lint_notes(self):
@@ -216,82 +879,98 @@ class DirsrvAccessLog(DirsrvLog):
         Check for notes=A (fully unindexed searches), and
         notes=F (unknown attribute in filter)
         """
-        for pattern, lint_report in [(".* notes=A", DSLOGNOTES0001), (".* notes=F", DSLOGNOTES0002)]:
-            lines = self.match(pattern)
-            if len(lines) > 0:
-                count = 0
-                searches = []
-                for line in lines:
-                    if ' RESULT err=' in line:
-                        # Looks like a valid notes=A/F
-                        conn = line.split(' conn=', 1)[1].split(' ',1)[0]
-                        op = line.split(' op=', 1)[1].split(' ',1)[0]
-                        etime = line.split(' etime=', 1)[1].split(' ',1)[0]
-                        stats = self._log_get_search_stats(conn, op)
-                        if stats is not None:
-                            timestamp = stats['timestamp']
-                            base = stats['base']
-                            scope = stats['scope']
-                            srch_filter = stats['filter']
-                            count += 1
-                            if lint_report == DSLOGNOTES0001:
-                                searches.append(f'\n  [{count}] Unindexed Search\n'
-                                                f'      - date:    {timestamp}\n'
-                                                f'      - conn/op: {conn}/{op}\n'
-                                                f'      - base:    {base}\n'
-                                                f'      - scope:   {scope}\n'
-                                                f'      - filter:  {srch_filter}\n'
-                                                f'      - etime:   {etime}\n')
-                            else:
-                                searches.append(f'\n  [{count}] Invalid Attribute in Filter\n'
-                                                f'      - date:    {timestamp}\n'
-                                                f'      - conn/op: {conn}/{op}\n'
-                                                f'      - filter:  {srch_filter}\n')
-                if len(searches) > 0:
-                    report = copy.deepcopy(lint_report)
-                    report['items'].append(self._get_log_path())
-                    report['detail'] = report['detail'].replace('NUMBER', str(count))
-                    for srch in searches:
-                        report['detail'] += srch
-                    report['check'] = f'logs:notes'
-                    yield report
+        path = self._get_log_path()
+        if not os.path.exists(path):
+            return
+        index = self.index()
+        searches = {DSLOGNOTES0001['dsle']: [], DSLOGNOTES0002['dsle']: []}
+        # A single pass over the log: the matching SRCH lines are looked up
+        # in the index rather than by rescanning the log for each result.
+        with open(path, 'rb') as lf:
+            pos = 0
+            for raw in lf:
+                offset = pos
+                pos += len(raw)
+                if b' RESULT err=' not in raw or b' notes=' not in raw:
+                    continue
+                record = parse_access_line(raw.decode('utf-8', errors='replace'))
+                if record is None or record.notes is None:
+                    continue
+                conn = record.conn
+                op = record.op
+                etime = record.etime
+                for note, lint_report in [('A', DSLOGNOTES0001), ('F', DSLOGNOTES0002)]:
+                    if note not in record.notes:
+                        continue
+                    stats = self._log_get_search_stats(conn, op, before=offset, index=index)
+                    if stats is None:
+                        continue
+                    timestamp = stats['timestamp']
+                    base = stats['base']
+                    scope = stats['scope']
+                    srch_filter = stats['filter']
+                    found = searches[lint_report['dsle']]
+                    count = len(found) + 1
+                    if lint_report == DSLOGNOTES0001:
+                        found.append(f'\n  [{count}] Unindexed Search\n'
+                                     f'      - date:    {timestamp}\n'
+                                     f'      - conn/op: {conn}/{op}\n'
+                                     f'      - base:    {base}\n'
+                                     f'      - scope:   {scope}\n'
+                                     f'      - filter:  {srch_filter}\n'
+                                     f'      - etime:   {etime}\n')
+                    else:
+                        found.append(f'\n  [{count}] Invalid Attribute in Filter\n'
+                                     f'      - date:    {timestamp}\n'
+                                     f'      - conn/op: {conn}/{op}\n'
+                                     f'      - filter:  {srch_filter}\n')
 
+        for lint_report in [DSLOGNOTES0001, DSLOGNOTES0002]:
+            found = searches[lint_report['dsle']]
+            if len(found) > 0:
+                report = copy.deepcopy(lint_report)
+                report['items'].append(path)
+                report['detail'] = report['detail'].replace('NUMBER', str(len(found)))
+                for srch in found:
+                    report['detail'] += srch
+                report['fix'] = report['fix'].replace('YOUR_INSTANCE', self.dirsrv.serverid)
+                report['check'] = f'logs:notes'
+                yield report
 
     def _get_log_path(self):
         """Return the current log file location"""
         return self.dirsrv.ds_paths.access_log
 
+    def parse_record(self, line):
+        """Break up an access log line into a compact record
+        @param line - A text line from an access log
+        @return - An AccessLogRecord, or None if the line can't be parsed
+        """
+        return parse_access_line(line)
+
+    def parse_records(self, lines):
+        """Parse multiple log lines into compact records, skipping lines that
+        can't be parsed
+        @param lines - an iterable of log lines
+        @return - A generator of AccessLogRecord
+        """
+        for line in lines:
+            record = parse_access_line(line)
+            if record is not None:
+                yield record
+
     def parse_line(self, line):
         """
         This knows how to break up an access log line into the specific fields.
         @param line - A text line from an access log
         @return - A dictionary of the log parts
         """
-        line = line.strip()
-        action = {
-            'action': 'CONNECT'
-        }
-        # First, pull some well known info out.
         if self.dirsrv.verbose:
-            self.log.info("--> %s ", line)
-
-        for regex in self.full_regexs:
-            result = regex.match(line)
-            if result:
-                action.update(result.groupdict())
-                if regex == self.prog_discon:
-                    action['action'] = 'DISCONNECT'
-                break
-
-        if action['action'] == 'RESULT':
-            for regex in self.result_regexs:
-                result = regex.match(action['rem'])
-                if result:
-                    action.update(result.groupdict())
-                    break
-
-        action['datetime'] = self.parse_timestamp(action['timestamp'])
-
+            self.log.info("--> %s ", line.strip())
+        record = parse_access_line(line)
+        if record is None:
+            raise ValueError("Unable to parse access log line: %s" % line.strip())
+        action = record.to_dict()
         if self.dirsrv.verbose:
             self.log.info(action)
         return action
@@ -311,7 +990,6 @@ class DirsrvErrorLog(DirsrvLog):
         @param diursrv - A DirSrv object
         """
         super(DirsrvErrorLog, self).__init__(dirsrv)
-        self.prog_m1 = re.compile(r'^(?P<timestamp>\[.*\])\s(?P<message>.*)')
 
     def _get_log_path(self):
         """Return the current log file location"""
@@ -323,11 +1001,27 @@ class DirsrvErrorLog(DirsrvLog):
         @return - A dictionary of the log parts
         """
         line = line.strip()
-        action = self.prog_m1.match(line).groupdict()
-
-        action['datetime'] = self.parse_timestamp(action['timestamp'])
+        ts_end = line.find('] ')
+        if ts_end == -1 or line[:1] != '[':
+            raise ValueError("Unable to parse errors log line: %s" % line)
+        action = {
+            'timestamp': line[:ts_end + 1],
+            'message': line[ts_end + 2:],
+        }
+        action['datetime'] = parse_log_timestamp(action['timestamp'])
         return action
 
+    def parse_record(self, line):
+        """Parse an errors log line, without failing on lines that don't
+        start with a timestamp, such as continuation lines
+        @line - a text string from an errors log
+        @return - A dictionary of the log parts, or None
+        """
+        try:
+            return self.parse_line(line)
+        except ValueError:
+            return None
+
     def parse_lines(self, lines):
         """Parse multiple lines from an errors log
         @param lines - a lits of strings/lines from an errors log
@@ -317,6 +317,42 @@ class DSEldif(DSLint):
 
         return states
 
+    def get_backend_indexes(self):
+        """Read the suffix and the index types of the ldbm backends, for use
+        when the server is offline
+
+        :returns: A dict of backend name to {'suffix': suffix, 'indexes':
+                  {attr: set of index types}}. The backend names are as
+                  written in the first entry of the backend, the suffix,
+                  attributes and index types are lowercased.
+        """
+        ldbm = ",cn=ldbm database,cn=plugins,cn=config"
+        backends = {}
+        # The backend names by their lowercased form, for the DNs of the
+        # entries that don't write the name the same way
+        names = {}
+        dn = None
+        for line in self._contents:
+            if line.startswith("dn: "):
+                dn = line[4:].strip()
+                continue
+            if dn is None or not dn.lower().endswith(ldbm):
+                continue
+            rdns = dn[:-len(ldbm)].split(',')
+            attr, _, value = line.partition(':')
+            attr = attr.lower()
+            value = value.strip().lower()
+            if len(rdns) == 1 and attr == 'nsslapd-suffix':
+                name = names.setdefault(rdns[0][3:].lower(), rdns[0][3:])
+                backend = backends.setdefault(name, {'suffix': None, 'indexes': {}})
+                backend['suffix'] = value
+            elif len(rdns) == 3 and rdns[1].lower() == 'cn=index' and attr == 'nsindextype':
+                name = names.setdefault(rdns[2][3:].lower(), rdns[2][3:])
+                backend = backends.setdefault(name, {'suffix': None, 'indexes': {}})
+                backend['indexes'].setdefault(rdns[0][3:].lower(), set()).add(value)
+
+        return backends
+
     def _increaseTimeSkew(self, suffix, timeSkew):
         # Increase csngen state local_offset by timeSkew
         # Warning: instance must be stopped before calling this function
@@ -41,3 +41,8 @@ class NotImplementedError(Error):
 class DsError(Error):
     """Generic DS Error."""
     pass
+
+
+class PoolTimeout(Error):
+    """No pooled connection became available in time."""
+    pass
@@ -51,6 +51,17 @@ class Group(DSLdapObject):
 
         return self.present('member', dn)
 
+    def members_present(self, dns):
+        """Check which of many DNs are members, asserting them in batches
+        rather than one search per DN
+
+        :param dns: Entry DNs
+        :type dns: list
+        :returns: A dict of each DN to True if it is a member
+        """
+
+        return self.values_present('member', dns)
+
     def add_member(self, dn):
         """Add DN as a member
 
@@ -78,6 +89,18 @@ class Group(DSLdapObject):
 
         self.ensure_present('member', dn)
 
+    def ensure_members(self, dns):
+        """Ensure many DNs are members, adding the missing ones in a single
+        modify
+
+        :param dns: Entry DNs
+        :type dns: list
+        """
+
+        missing = [dn for (dn, present) in self.members_present(dns).items() if not present]
+        if missing:
+            self.add('member', missing)
+
 class Groups(DSLdapObjects):
     """DSLdapObjects that represents Groups entry
     By default it uses 'ou=Groups' as rdn.
@@ -120,6 +143,10 @@ class UniqueGroup(DSLdapObject):
         # Check if dn is a member
         return self.present('uniquemember', dn)
 
+    def members_present(self, dns):
+        # Check which of the dns are members
+        return self.values_present('uniquemember', dns)
+
     def add_member(self, dn):
         self.add('uniquemember', dn)
 
@@ -0,0 +1,488 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Index recommendations from the unindexed searches of the access logs.
+
+Search filters are normalized to fingerprints, so that searches that only
+differ by their assertion values, or by the order of the components of an
+AND or an OR, are accounted together. The cost of each fingerprint is then
+mapped onto the index configuration of the backend holding the search base
+to find the smallest set of indexes that would make the searches indexed.
+"""
+
+from lib389.backend import Backends
+from lib389.dirsrv_log import parse_access_line
+from lib389.latency import DEFAULT_MAX_PENDING
+
+# Fingerprints past this many are counted, but not kept
+DEFAULT_MAX_KEYS = 10000
+
+# Results without their request that wait for the request of an earlier shard
+DEFAULT_MAX_ORPHANS = 10000
+
+# The index type an assertion is looked up with
+INDEX_TYPES = {
+    'eq': 'eq',
+    'ge': 'eq',
+    'le': 'eq',
+    'approx': 'approx',
+    'sub': 'sub',
+    'pres': 'pres',
+}
+
+# Prefer the most selective index types when there is a choice
+_TYPE_WEIGHTS = {'eq': 0, 'approx': 1, 'sub': 2, 'pres': 3}
+
+_OPERATORS = {'~': 'approx', '>': 'ge', '<': 'le'}
+
+
+def _attribute(name):
+    """Index names are case insensitive and have no options"""
+    return name.strip().split(';', 1)[0].lower()
+
+
+def _parse_item(text):
+    pos = text.find('=')
+    if pos <= 0:
+        raise ValueError('Invalid filter component (%s)' % text)
+    attr, value = text[:pos], text[pos + 1:]
+    kind = _OPERATORS.get(attr[-1], 'eq')
+    if kind != 'eq':
+        attr = attr[:-1]
+    elif attr.endswith(':'):
+        # Extensible match: attr:dn:rule:=value
+        parts = attr[:-1].split(':')
+        return ('ext', _attribute(parts[0]), ':'.join(parts[1:]).lower(), value)
+    attr = _attribute(attr)
+    if not attr:
+        raise ValueError('Invalid filter component (%s)' % text)
+    if kind != 'eq' or '*' not in value:
+        return (kind, attr, value)
+    if value == '*':
+        return ('pres', attr)
+    pieces = value.split('*')
+    return ('sub', attr, (pieces[0], pieces[1:-1], pieces[-1]))
+
+
+def _parse(text, pos):
+    if pos >= len(text) or text[pos] != '(':
+        raise ValueError('Invalid filter, expected ( at %d: %s' % (pos, text))
+    pos += 1
+    if pos < len(text) and text[pos] in '&|!':
+        kind = text[pos]
+        pos += 1
+        children = []
+        while pos < len(text) and text[pos] == '(':
+            child, pos = _parse(text, pos)
+            children.append(child)
+        if pos >= len(text) or text[pos] != ')' or (kind == '!' and len(children) != 1):
+            raise ValueError('Invalid filter, unbalanced %s at %d: %s' % (kind, pos, text))
+        if kind == '!':
+            return ('!', children[0]), pos + 1
+        return (kind, children), pos + 1
+    # Parentheses in values are escaped, so the component ends at the next one
+    end = text.find(')', pos)
+    if end < 0 or '(' in text[pos:end]:
+        raise ValueError('Invalid filter, unbalanced parentheses: %s' % text)
+    return _parse_item(text[pos:end]), end + 1
+
+
+def parse_filter(srch_filter):
+    """Parse a search filter, as logged, into a tree of tuples:
+
+    ('&', [children]), ('|', [children]), ('!', child), ('pres', attr),
+    ('eq' | 'ge' | 'le' | 'approx', attr, value),
+    ('sub', attr, (initial, [any], final)) and ('ext', attr, rule, value).
+    Attribute names are lowercased and stripped of their options.
+
+    :param srch_filter: A search filter
+    :type srch_filter: str
+    :returns: The filter tree
+    :raises: ValueError - if the filter is malformed
+    """
+    text = srch_filter.strip()
+    if not text.startswith('('):
+        text = '(%s)' % text
+    tree, pos = _parse(text, 0)
+    if pos != len(text):
+        raise ValueError('Invalid filter, trailing data at %d: %s' % (pos, srch_filter))
+    return tree
+
+
+def _fingerprint(node):
+    kind = node[0]
+    if kind in ('&', '|'):
+        return '(%s%s)' % (kind, ''.join(sorted(set(_fingerprint(child) for child in node[1]))))
+    if kind == '!':
+        return '(!%s)' % _fingerprint(node[1])
+    attr = node[1]
+    if kind == 'pres':
+        return '(%s=*)' % attr
+    if kind == 'sub':
+        initial, middle, final = node[2]
+        return '(%s=%s*%s%s)' % (attr, '?' if initial else '', '?*' * len(middle), '?' if final else '')
+    if kind == 'ext':
+        return '(%s:%s:=?)' % (attr, node[2])
+    if kind == 'eq' and attr == 'objectclass':
+        # The object class tells what kind of entries are searched
+        return '(objectclass=%s)' % node[2].lower()
+    return '(%s%s?)' % (attr, {'eq': '=', 'ge': '>=', 'le': '<=', 'approx': '~='}[kind])
+
+
+def filter_fingerprint(srch_filter):
+    """Normalize a search filter into its shape: assertion values are
+    replaced by ?, the components of ANDs and ORs are sorted and attribute
+    names lowercased. Presence stays (attr=*), and substrings keep the
+    position of their wildcards, as they need different index types.
+    objectClass values are kept.
+
+    :param srch_filter: A search filter, as logged
+    :type srch_filter: str
+    :returns: The fingerprint, such as (&(mail=?)(objectclass=person))
+    :raises: ValueError - if the filter is malformed
+    """
+    return _fingerprint(parse_filter(srch_filter))
+
+
+def _alternatives(node, indexes):
+    """Return the sets of missing (attr, type) indexes, any one of which
+    would make the filter indexed. [frozenset()] means it is already
+    indexed, and [] that no index can help.
+    """
+    kind = node[0]
+    if kind == '!':
+        # NOT is evaluated against all the entries in scope
+        return []
+    if kind == '&':
+        alternatives = []
+        for child in node[1]:
+            child_alternatives = _alternatives(child, indexes)
+            if frozenset() in child_alternatives:
+                return [frozenset()]
+            alternatives.extend(child_alternatives)
+        return alternatives
+    if kind == '|':
+        # Every branch of an OR must be indexed
+        needed = frozenset()
+        for child in node[1]:
+            child_alternatives = _alternatives(child, indexes)
+            if not child_alternatives:
+                return []
+            needed |= min(child_alternatives, key=_alternative_weight)
+        return [needed]
+    index_type = INDEX_TYPES.get(kind)
+    if index_type is None or node[1] == 'objectclass':
+        # Object classes match too many entries to make a search indexed,
+        # and extensible matches need a matching rule index.
+        return []
+    if index_type in indexes.get(node[1], ()):
+        return [frozenset()]
+    return [frozenset([(node[1], index_type)])]
+
+
+def _alternative_weight(alternative):
+    return (len(alternative), sum(_TYPE_WEIGHTS[index_type] for _, index_type in alternative),
+            sorted(alternative))
+
+
+def missing_indexes(srch_filter, indexes):
+    """Find the smallest set of indexes that would make a filter indexed
+
+    :param srch_filter: A search filter or fingerprint
+    :type srch_filter: str
+    :param indexes: The index types of each attribute, such as {'uid': {'eq'}}
+    :type indexes: dict
+    :returns: A frozenset of (attr, type), empty if the filter is already
+              indexed, or None if no index can help
+    :raises: ValueError - if the filter is malformed
+    """
+    alternatives = _alternatives(parse_filter(srch_filter), indexes)
+    if not alternatives:
+        return None
+    return min(alternatives, key=_alternative_weight)
+
+
+class UnindexedSearchStats(object):
+    """Account for the unindexed searches (notes=A and notes=U) of access
+    log lines, per search base and filter fingerprint. It can be used as the
+    factory of a lib389.logconv.AccessLogAnalyzer.
+
+    :param max_keys: The maximum number of (base, fingerprint) kept
+    :type max_keys: int
+    :param max_pending: The maximum number of searches remembered while
+                        waiting for their result
+    :type max_pending: int
+    """
+
+    def __init__(self, max_keys=DEFAULT_MAX_KEYS, max_pending=DEFAULT_MAX_PENDING):
+        self.max_keys = max_keys
+        self.max_pending = max_pending
+        self.searches = {}
+        self.dropped = 0
+        self.unmatched = 0
+        self._pending = {}
+        self._orphans = []
+
+    def feed(self, line):
+        """Account for an access log line
+
+        :param line: A line from an access log
+        :type line: str
+        """
+        if ' SRCH ' not in line and ' notes=' not in line:
+            return
+        record = parse_access_line(line)
+        if record is not None:
+            self.feed_record(record)
+
+    def feed_record(self, record):
+        """Account for a parsed access log line
+
+        :param record: A parsed access log line
+        :type record: lib389.dirsrv_log.AccessLogRecord
+        """
+        if record.op is None:
+            return
+        key = (record.conn, record.op)
+        if record.action == 'SRCH':
+            base = record.quoted('base')
+            srch_filter = record.quoted('filter')
+            if base is None or srch_filter is None:
+                return
+            if len(self._pending) >= self.max_pending:
+                del self._pending[next(iter(self._pending))]
+            self._pending[key] = (base.lower(), srch_filter)
+            return
+        if record.action != 'RESULT' or record.tag != '101':
+            return
+        request = self._pending.pop(key, None)
+        if record.notes is None or not set(record.notes.split(',')) & {'A', 'U'}:
+            return
+        result = (float(record.etime or 0), int(record.nentries or 0), 'A' in record.notes.split(','))
+        if request is None:
+            # The request may be in the shard before ours
+            if len(self._orphans) < DEFAULT_MAX_ORPHANS:
+                self._orphans.append((key, result))
+            else:
+                self.unmatched += 1
+            return
+        self._account(request, result)
+
+    def _account(self, request, result):
+        base, srch_filter = request
+        try:
+            fingerprint = filter_fingerprint(srch_filter)
+        except ValueError:
+            fingerprint = srch_filter.lower()
+        entry = self.searches.get((base, fingerprint))
+        if entry is None:
+            if len(self.searches) >= self.max_keys:
+                self.dropped += 1
+                return
+            entry = self.searches[(base, fingerprint)] = {'count': 0, 'fully_unindexed': 0,
+                                                          'etime': 0.0, 'nentries': 0}
+        etime, nentries, fully_unindexed = result
+        entry['count'] += 1
+        entry['fully_unindexed'] += int(fully_unindexed)
+        entry['etime'] += etime
+        entry['nentries'] += nentries
+
+    def merge(self, other):
+        """Merge the searches of the log lines following ours
+
+        :param other: The aggregate of the following lines
+        :type other: UnindexedSearchStats
+        :returns: self
+        """
+        for key, result in other._orphans:
+            request = self._pending.pop(key, None)
+            if request is None:
+                self.unmatched += 1
+            else:
+                self._account(request, result)
+        for key, entry in other.searches.items():
+            mine = self.searches.get(key)
+            if mine is None:
+                if len(self.searches) >= self.max_keys:
+                    self.dropped += entry['count']
+                    continue
+                mine = self.searches[key] = dict.fromkeys(entry, 0)
+            for counter, value in entry.items():
+                mine[counter] += value
+        self.dropped += other.dropped
+        self.unmatched += other.unmatched
+        self._pending.update(other._pending)
+        while len(self._pending) > self.max_pending:
+            del self._pending[next(iter(self._pending))]
+        return self
+
+    def to_dict(self):
+        """Summarize the unindexed searches, costliest first. The cost of a
+        fingerprint is count x average etime x average nentries, that is the
+        time spent on it weighted by the size of what it returns.
+
+        :returns: dict
+        """
+        searches = []
+        for (base, fingerprint), entry in self.searches.items():
+            searches.append(dict(base=base, filter=fingerprint, cost=_cost(entry), **entry))
+        searches.sort(key=lambda s: s['cost'], reverse=True)
+        return {
+            'searches': searches,
+            'dropped': self.dropped,
+            'unmatched': self.unmatched + len(self._orphans),
+        }
+
+
+def _cost(entry):
+    count = entry['count']
+    if count == 0:
+        return 0.0
+    return count * (entry['etime'] / count) * max(entry['nentries'] / count, 1)
+
+
+def _backend_of(base, backends):
+    """Return the name of the backend with the longest suffix holding base"""
+    found = None
+    found_len = -1
+    for name, backend in backends.items():
+        suffix = backend['suffix']
+        if (base == suffix or base.endswith(',' + suffix)) and len(suffix) > found_len:
+            found = name
+            found_len = len(suffix)
+    return found
+
+
+class IndexAdvisor(object):
+    """Rank the indexes that would remove the costliest unindexed searches
+
+    :param backends: The backends by name, as {'suffix': suffix, 'indexes':
+                     {attr: set of index types}}, with a lowercased suffix,
+                     attributes and types, such as returned by
+                     IndexAdvisor.get_backends()
+    :type backends: dict
+    """
+
+    def __init__(self, backends):
+        self.backends = backends
+
+    @staticmethod
+    def get_backends(inst):
+        """Read the suffix and the index configuration of the backends of an
+        online instance
+
+        :param inst: A connected instance
+        :type inst: lib389.DirSrv
+        :returns: dict
+        """
+        backends = {}
+        for backend in Backends(inst).list():
+            indexes = {}
+            for index in backend.get_indexes().list():
+                indexes[index.get_attr_val_utf8_l('cn')] = set(index.get_attr_vals_utf8_l('nsIndexType'))
+            backends[backend.get_attr_val_utf8('cn')] = {'suffix': backend.get_suffix(), 'indexes': indexes}
+        return backends
+
+    def advise(self, stats):
+        """Map the unindexed searches onto the index configuration
+
+        :param stats: The unindexed searches
+        :type stats: UnindexedSearchStats
+        :returns: A dict with the ranked 'suggestions', each with its
+                  predicted benefit and plan, and the 'unresolved' searches
+                  no new index would help, with the reason why
+        """
+        suggestions = {}
+        unresolved = []
+        total_etime = sum(entry['etime'] for entry in stats.searches.values())
+        for search in stats.to_dict()['searches']:
+            bename = _backend_of(search['base'], self.backends)
+            if bename is None:
+                unresolved.append(dict(search, reason='No backend holds the search base'))
+                continue
+            indexes = self.backends[bename]['indexes']
+            try:
+                missing = missing_indexes(search['filter'], indexes)
+            except ValueError:
+                unresolved.append(dict(search, reason='The filter could not be parsed'))
+                continue
+            if missing is None:
+                unresolved.append(dict(search, reason='No index can help this filter, only its '
+                                                      'objectclass, NOT or extensible components are searched'))
+                continue
+            if not missing:
+                unresolved.append(dict(search, reason='The filter is indexed, the candidate lists likely '
+                                                      'exceed nsslapd-idlistscanlimit'))
+                continue
+            for attr, index_type in missing:
+                suggestion = suggestions.get((bename, attr))
+                if suggestion is None:
+                    suggestion = suggestions[(bename, attr)] = {
+                        'backend': bename,
+                        'suffix': self.backends[bename]['suffix'],
+                        'attribute': attr,
+                        'types': set(),
+                        'existing': sorted(indexes.get(attr, ())),
+                        'cost': 0.0,
+                        'searches': 0,
+                        'etime': 0.0,
+                        'filters': [],
+                    }
+                suggestion['types'].add(index_type)
+                if search['filter'] not in suggestion['filters']:
+                    suggestion['filters'].append(search['filter'])
+                    suggestion['cost'] += search['cost']
+                    suggestion['searches'] += search['count']
+                    suggestion['etime'] += search['etime']
+
+        ranked = sorted(suggestions.values(), key=lambda s: (s['cost'], s['etime']), reverse=True)
+        for suggestion in ranked:
+            suggestion['types'] = sorted(suggestion['types'], key=_TYPE_WEIGHTS.get)
+            # An indexed search takes a negligible time next to a full scan, so
+            # the unindexed time of the searches is what the index saves.
+            suggestion['benefit'] = {
+                'etime_saved': suggestion['etime'],
+                'percent': (100.0 * suggestion['etime'] / total_etime) if total_etime else 0.0,
+            }
+            suggestion['plan'] = self.plan(suggestion)
+        return {'suggestions': ranked, 'unresolved': unresolved}
+
+    @staticmethod
+    def plan(suggestion):
+        """Describe how to apply a suggestion
+
+        :param suggestion: A suggestion returned by advise()
+        :type suggestion: dict
+        :returns: The lib389 calls applying it, as a str
+        """
+        backend = f"Backends(inst).get('{suggestion['backend']}')"
+        attr = suggestion['attribute']
+        new_types = [t for t in suggestion['types'] if t not in suggestion['existing']]
+        if suggestion['existing']:
+            return (f"{backend}.get_index('{attr}').add('nsIndexType', {new_types}); "
+                    f"{backend}.reindex(attrs=['{attr}'])")
+        return f"{backend}.add_index('{attr}', {new_types}, reindex=True)"
+
+    @staticmethod
+    def apply(inst, suggestion):
+        """Create or extend the index of a suggestion, and reindex the attribute
+
+        :param inst: A connected instance
+        :type inst: lib389.DirSrv
+        :param suggestion: A suggestion returned by advise()
+        :type suggestion: dict
+        """
+        backend = Backends(inst).get(suggestion['backend'])
+        attr = suggestion['attribute']
+        new_types = [t for t in suggestion['types'] if t not in suggestion['existing']]
+        index = backend.get_index(attr)
+        if index is None:
+            backend.add_index(attr, new_types, reindex=True)
+        else:
+            index.add('nsIndexType', new_types)
+            backend.reindex(attrs=[attr])
@@ -0,0 +1,326 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Operation latency (etime) percentiles from the access logs.
+
+Latencies are kept in log-bucketed histograms: the bucket width grows with
+the value, so the relative error of any percentile is bounded by the
+precision while the number of buckets only grows with log(max/min). The
+histograms can be merged, so they work for sharded offline analysis
+(see lib389.logconv.AccessLogAnalyzer) as well as in follow mode.
+"""
+
+import math
+from collections import OrderedDict
+from lib389.dirsrv_log import parse_access_line, parse_log_timestamp
+
+DEFAULT_PERCENTILES = (50, 95, 99, 99.9)
+
+# Relative width of a bucket, and so the worst relative error of a percentile.
+DEFAULT_PRECISION = 0.02
+
+# Latencies below this, in seconds, all fall in the first bucket.
+MIN_LATENCY = 1e-6
+
+DIMENSIONS = ('op', 'base', 'filter', 'ip')
+
+# Keys past this many per dimension are accounted under OTHER_KEY.
+DEFAULT_MAX_KEYS = 1000
+OTHER_KEY = '(other)'
+
+# Bound on the operations waiting for their RESULT, and on the open
+# connections we remember the client address of.
+DEFAULT_MAX_PENDING = 100000
+
+# The RESULT tag tells the operation type when the request wasn't seen.
+RESULT_TAGS = {
+    '97': 'BIND',
+    '101': 'SRCH',
+    '103': 'MOD',
+    '105': 'ADD',
+    '107': 'DEL',
+    '109': 'MODRDN',
+    '111': 'CMP',
+    '120': 'EXT',
+}
+
+def filter_shape(srch_filter):
+    """Strip the assertion values of a search filter, so that searches that
+    only differ by their values share the same shape. This is the filter
+    fingerprint of the index advisor, so that the tools agree on the shapes.
+
+    :param srch_filter: A search filter, as logged
+    :type srch_filter: str
+    :returns: The shape, such as (&(objectclass=person)(uid=?)), or the
+              lowercased filter if it can't be parsed
+    """
+    # index_advisor uses the defaults of this module
+    from lib389.index_advisor import filter_fingerprint
+    try:
+        return filter_fingerprint(srch_filter)
+    except ValueError:
+        return srch_filter.lower()
+
+
+class LatencyHistogram(object):
+    """A bounded memory, mergeable histogram of latencies in seconds
+
+    :param precision: The relative width of a bucket
+    :type precision: float
+    """
+    __slots__ = ('precision', 'buckets', 'count', 'total', 'min', 'max', '_log_growth')
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        self.precision = precision
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._log_growth = math.log1p(precision)
+
+    def _bucket(self, value):
+        if value < MIN_LATENCY:
+            return 0
+        return int(math.log(value / MIN_LATENCY) / self._log_growth) + 1
+
+    def _bucket_value(self, bucket):
+        if bucket == 0:
+            return 0.0
+        # The geometric middle of the bucket
+        return MIN_LATENCY * math.exp((bucket - 0.5) * self._log_growth)
+
+    def add(self, value):
+        """Account for one latency
+
+        :param value: The latency in seconds
+        :type value: float
+        """
+        bucket = self._bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add the content of another histogram of the same precision
+
+        :param other: The histogram to merge
+        :type other: LatencyHistogram
+        :returns: self
+        """
+        if other.precision != self.precision:
+            raise ValueError('Can not merge histograms of different precisions')
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def percentile(self, pct):
+        """Return the latency under which pct percent of the operations fall
+
+        :param pct: The percentile, between 0 and 100
+        :type pct: float
+        :returns: The latency in seconds, or None when empty
+        """
+        if self.count == 0:
+            return None
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(max(self._bucket_value(bucket), self.min), self.max)
+        return self.max
+
+    def to_dict(self, percentiles=DEFAULT_PERCENTILES):
+        """Summarize the histogram
+
+        :param percentiles: The percentiles to report
+        :type percentiles: tuple
+        :returns: dict
+        """
+        result = {
+            'count': self.count,
+            'average': (self.total / self.count) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+        }
+        for pct in percentiles:
+            result['p%s' % pct] = self.percentile(pct)
+        return result
+
+
+class LatencyAggregator(object):
+    """Aggregate operation latencies from access log lines, overall, per
+    dimension (operation type, search base, filter shape and client
+    address), and as a per minute time series.
+
+    Requests are correlated with their RESULT by (conn, op), and clients
+    with their connection, so operations that span two shards of a sharded
+    analysis are only accounted under the dimensions known from the RESULT.
+
+    :param dimensions: The dimensions to break latencies down by
+    :type dimensions: tuple
+    :param max_keys: The maximum number of keys kept per dimension, the
+                     latencies of further keys are accounted under (other)
+    :type max_keys: int
+    :param max_minutes: The number of minutes kept in the time series, all
+                        of them by default. Useful in follow mode.
+    :type max_minutes: int
+    :param max_pending: The maximum number of requests and connections
+                        remembered while waiting for their result or close
+    :type max_pending: int
+    :param precision: The relative width of the histogram buckets
+    :type precision: float
+    """
+
+    def __init__(self, dimensions=DIMENSIONS, max_keys=DEFAULT_MAX_KEYS, max_minutes=None,
+                 max_pending=DEFAULT_MAX_PENDING, precision=DEFAULT_PRECISION):
+        for dim in dimensions:
+            if dim not in DIMENSIONS:
+                raise ValueError('Unknown latency dimension %s, must be one of %s' % (dim, ', '.join(DIMENSIONS)))
+        self.dimensions = tuple(dimensions)
+        self.max_keys = max_keys
+        self.max_minutes = max_minutes
+        self.max_pending = max_pending
+        self.precision = precision
+        self.overall = LatencyHistogram(precision)
+        self.by_dimension = {dim: {} for dim in self.dimensions}
+        self.series = OrderedDict()
+        self._pending = {}
+        self._clients = {}
+
+    @staticmethod
+    def _remember(table, key, value, limit):
+        if len(table) >= limit:
+            # Drop the oldest, dicts keep insertion order
+            del table[next(iter(table))]
+        table[key] = value
+
+    def _histogram(self, table, key):
+        hist = table.get(key)
+        if hist is None:
+            if len(table) >= self.max_keys:
+                key = OTHER_KEY
+                hist = table.get(key)
+            if hist is None:
+                hist = table[key] = LatencyHistogram(self.precision)
+        return hist
+
+    def feed(self, line):
+        """Account for an access log line
+
+        :param line: A line from an access log
+        :type line: str
+        """
+        record = parse_access_line(line)
+        if record is not None:
+            self.feed_record(record)
+
+    def feed_record(self, record):
+        """Account for a parsed access log line, such as those yielded by
+        DirsrvAccessLog.follow()
+
+        :param record: A parsed access log line
+        :type record: lib389.dirsrv_log.AccessLogRecord
+        """
+        action = record.action
+        if action == 'CONNECT':
+            if record.remote is not None:
+                self._remember(self._clients, record.conn, record.remote, self.max_pending)
+            return
+        if action == 'DISCONNECT':
+            self._clients.pop(record.conn, None)
+            return
+        if record.op is None:
+            return
+        if action != 'RESULT':
+            request = (action, None, None)
+            if action == 'SRCH':
+                base = record.quoted('base')
+                srch_filter = record.quoted('filter')
+                request = (action,
+                           base.lower() if base is not None else None,
+                           filter_shape(srch_filter) if srch_filter is not None else None)
+            self._remember(self._pending, (record.conn, record.op), request, self.max_pending)
+            return
+        if record.etime is None:
+            return
+
+        etime = float(record.etime)
+        op_type, base, shape = self._pending.pop((record.conn, record.op), (None, None, None))
+        if op_type is None:
+            op_type = RESULT_TAGS.get(record.tag, 'UNKNOWN')
+        self.overall.add(etime)
+        keys = {'op': op_type, 'base': base, 'filter': shape, 'ip': self._clients.get(record.conn)}
+        for dim in self.dimensions:
+            if keys[dim] is not None:
+                self._histogram(self.by_dimension[dim], keys[dim]).add(etime)
+
+        # dd/Mon/yyyy:hh:mm and the timezone
+        minute = record.timestamp[1:18] + record.timestamp[record.timestamp.find(' '):-1]
+        hist = self.series.get(minute)
+        if hist is None:
+            hist = self.series[minute] = LatencyHistogram(self.precision)
+            if self.max_minutes is not None and len(self.series) > self.max_minutes:
+                self.series.popitem(last=False)
+        hist.add(etime)
+
+    def merge(self, other):
+        """Merge the latencies of the log lines following ours
+
+        :param other: The aggregate of the following lines
+        :type other: LatencyAggregator
+        :returns: self
+        """
+        self.overall.merge(other.overall)
+        for dim in self.dimensions:
+            table = self.by_dimension[dim]
+            for key, hist in other.by_dimension.get(dim, {}).items():
+                self._histogram(table, key).merge(hist)
+        for minute, hist in other.series.items():
+            if minute in self.series:
+                self.series[minute].merge(hist)
+            else:
+                self.series[minute] = hist
+        if self.max_minutes is not None:
+            while len(self.series) > self.max_minutes:
+                self.series.popitem(last=False)
+        return self
+
+    def to_dict(self, percentiles=DEFAULT_PERCENTILES, top=20):
+        """Summarize the latencies
+
+        :param percentiles: The percentiles to report
+        :type percentiles: tuple
+        :param top: Report the top N keys of each dimension, by count
+        :type top: int
+        :returns: dict
+        """
+        result = {
+            'overall': self.overall.to_dict(percentiles),
+            'dimensions': {},
+            'series': [],
+        }
+        for dim in self.dimensions:
+            ranked = sorted(self.by_dimension[dim].items(), key=lambda kv: kv[1].count, reverse=True)
+            result['dimensions'][dim] = [dict(key=key, **hist.to_dict(percentiles)) for key, hist in ranked[:top]]
+        for minute, hist in self.series.items():
+            when = parse_log_timestamp('[%s:00%s]' % (minute[:17], minute[17:]))
+            result['series'].append(dict(minute=when.isoformat(), **hist.to_dict(percentiles)))
+        return result
+
@@ -427,7 +427,10 @@ DSLOGNOTES0001 = {
     'detail': """Found NUMBER fully unindexed searches in the current access log.
 Unindexed searches can cause high CPU and slow down the entire server's performance.\n""",
     'fix': """Examine the searches that are unindexed, and either properly index the attributes
-in the filter, increase the nsslapd-idlistscanlimit, or stop using that filter."""
+in the filter, increase the nsslapd-idlistscanlimit, or stop using that filter.
+To get the indexes that would help the most, ranked by their predicted benefit, run:
+
+    # dsctl YOUR_INSTANCE logs index-advice"""
 }
 
 DSLOGNOTES0002 = {
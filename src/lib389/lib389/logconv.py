@@ -0,0 +1,493 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Access log analytics, a native replacement for logconv.pl
+
+Logs are split into shards (a whole gzip archive, or a byte range of a plain
+log), each shard is reduced to an AccessLogStats in a worker process, and the
+partial aggregates are merged back together in chronological order.
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from lib389.dirsrv_log import open_log, parse_access_line
+
+# Plain logs are split into byte ranges of this size so that a single large
+# access log can still be spread over several workers.
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+
+STARTTLS_OID = '1.3.6.1.4.1.1466.20037'
+
+# Operation names as reported in the logconv summary.
+OP_NAMES = [
+    ('SRCH', 'Searches'),
+    ('MOD', 'Modifications'),
+    ('ADD', 'Adds'),
+    ('DEL', 'Deletes'),
+    ('MODRDN', 'Mod RDNs'),
+    ('CMP', 'Compares'),
+    ('BIND', 'Binds'),
+    ('UNBIND', 'Unbinds'),
+    ('EXT', 'Extended Operations'),
+    ('ABANDON', 'Abandoned Requests'),
+]
+
+
+class AccessLogStats(object):
+    """Mergeable aggregate of the statistics logconv.pl reports.
+
+    Merging is order sensitive: the left hand side must cover the log lines
+    that come before the right hand side, so that the peak concurrent
+    connection count and the start/end of logs remain correct.
+
+    :param root_dn: The Directory Manager DN, to count root binds
+    :type root_dn: str
+    """
+
+    def __init__(self, root_dn='cn=directory manager'):
+        self.root_dn = root_dn.lower()
+        self.lines = 0
+        self.start = None
+        self.end = None
+        self.restarts = 0
+        self.connections = 0
+        self.ldapi_connections = 0
+        self.ldaps_connections = 0
+        self.starttls = 0
+        # Net connection open/close balance, and the peak of its running sum.
+        self.conn_delta = 0
+        self.conn_peak = 0
+        self.fds_taken = 0
+        self.fds_returned = 0
+        self.highest_fd = 0
+        self.results = 0
+        self.ops = Counter()
+        self.errors = Counter()
+        self.conn_codes = Counter()
+        self.etime_count = 0
+        self.etime_total = 0.0
+        self.etime_max = 0.0
+        self.etimes = Counter()
+        self.wtime_count = 0
+        self.wtime_total = 0.0
+        self.optime_count = 0
+        self.optime_total = 0.0
+        self.v2_binds = 0
+        self.v3_binds = 0
+        self.sasl_binds = 0
+        self.autobinds = 0
+        self.root_binds = 0
+        self.anonymous_binds = 0
+        self.bind_dns = Counter()
+        self.clients = Counter()
+        self.bases = Counter()
+        self.filters = Counter()
+        self.unindexed = 0
+        self.unindexed_components = 0
+        self.invalid_filters = 0
+        self.paged = 0
+        self.persistent = 0
+
+    def _open_connection(self):
+        self.conn_delta += 1
+        if self.conn_delta > self.conn_peak:
+            self.conn_peak = self.conn_delta
+
+    def _bind(self, dn):
+        if dn:
+            dn = dn.lower()
+            if dn == self.root_dn:
+                self.root_binds += 1
+            self.bind_dns[dn] += 1
+        else:
+            self.anonymous_binds += 1
+            self.bind_dns['Anonymous Binds'] += 1
+
+    def feed(self, line):
+        """Account for a single access log line
+
+        :param line: A line from an access log
+        :type line: str
+        """
+        self.lines += 1
+        record = parse_access_line(line)
+        if record is None:
+            return
+        timestamp = record.timestamp[1:-1]
+        if self.start is None:
+            self.start = timestamp
+        self.end = timestamp
+
+        action = record.action
+        if action == 'CONNECT':
+            if record.conn == '1':
+                self.restarts += 1
+            if record.fd.isdigit():
+                self.fds_taken += 1
+                self.highest_fd = max(self.highest_fd, int(record.fd))
+            if record.remote is not None:
+                if record.remote == 'local':
+                    self.ldapi_connections += 1
+                elif ' SSL connection from ' in line:
+                    self.ldaps_connections += 1
+                self.connections += 1
+                self.clients[record.remote] += 1
+                self._open_connection()
+        elif action == 'DISCONNECT':
+            self.fds_returned += 1
+            self.conn_delta -= 1
+            self.conn_codes[record.status] += 1
+        elif record.op is not None:
+            self._feed_operation(record)
+
+    def _feed_operation(self, record):
+        action = record.action
+        args = record.rem
+        if action == 'RESULT':
+            self.results += 1
+            if record.err is not None:
+                self.errors[record.err] += 1
+            if record.etime is not None:
+                etime = float(record.etime)
+                self.etime_count += 1
+                self.etime_total += etime
+                self.etime_max = max(self.etime_max, etime)
+                self.etimes['%.3f' % etime] += 1
+            if record.wtime is not None:
+                self.wtime_count += 1
+                self.wtime_total += float(record.wtime)
+            if record.optime is not None:
+                self.optime_count += 1
+                self.optime_total += float(record.optime)
+            notes = record.notes
+            if notes is not None:
+                if 'A' in notes:
+                    self.unindexed += 1
+                if 'U' in notes:
+                    self.unindexed_components += 1
+                if 'F' in notes:
+                    self.invalid_filters += 1
+                if 'P' in notes:
+                    self.paged += 1
+            return
+
+        self.ops[action] += 1
+        if action == 'SRCH':
+            base = record.quoted('base')
+            if base is not None:
+                self.bases[base.lower()] += 1
+            srch_filter = record.quoted('filter')
+            if srch_filter is not None:
+                self.filters[srch_filter] += 1
+            if ' options=persistent' in args:
+                self.persistent += 1
+        elif action == 'BIND':
+            version = record.keyword('version')
+            if version == '2':
+                self.v2_binds += 1
+            elif version == '3':
+                self.v3_binds += 1
+            method = record.keyword('method')
+            if method == 'sasl':
+                self.sasl_binds += 1
+            self._bind(record.quoted('dn'))
+        elif action == 'AUTOBIND':
+            self.ops['BIND'] += 1
+            self.autobinds += 1
+            self._bind(record.quoted('dn'))
+        elif action == 'EXT':
+            if record.quoted('oid') == STARTTLS_OID:
+                self.starttls += 1
+
+    def merge(self, other):
+        """Merge the statistics of a later shard into this one
+
+        :param other: The statistics of the log lines following ours
+        :type other: AccessLogStats
+        :returns: self
+        """
+        for attr, value in vars(other).items():
+            if isinstance(value, Counter):
+                getattr(self, attr).update(value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                if attr in ('conn_delta', 'conn_peak', 'highest_fd', 'etime_max'):
+                    continue
+                setattr(self, attr, getattr(self, attr) + value)
+        self.conn_peak = max(self.conn_peak, self.conn_delta + other.conn_peak)
+        self.conn_delta += other.conn_delta
+        self.highest_fd = max(self.highest_fd, other.highest_fd)
+        self.etime_max = max(self.etime_max, other.etime_max)
+        if self.start is None:
+            self.start = other.start
+        if other.end is not None:
+            self.end = other.end
+        return self
+
+    def to_dict(self, top=20):
+        """Return the report as a dictionary, suitable for JSON output
+
+        :param top: How many entries to keep in the "top N" lists
+        :type top: int
+        :returns: dict
+        """
+        def _avg(total, count):
+            return (total / count) if count else 0.0
+
+        return {
+            'lines': self.lines,
+            'start': self.start,
+            'end': self.end,
+            'restarts': self.restarts,
+            'peak_connections': self.conn_peak,
+            'connections': {
+                'total': self.connections,
+                'ldap': self.connections - self.ldaps_connections - self.ldapi_connections,
+                'ldapi': self.ldapi_connections,
+                'ldaps': self.ldaps_connections,
+                'starttls': self.starttls,
+            },
+            'operations': dict(self.ops),
+            'total_operations': sum(self.ops.values()),
+            'total_results': self.results,
+            'etime': {
+                'average': _avg(self.etime_total, self.etime_count),
+                'max': self.etime_max,
+                'most_frequent': self.etimes.most_common(top),
+                'longest': sorted(self.etimes, key=float, reverse=True)[:top],
+            },
+            'average_wtime': _avg(self.wtime_total, self.wtime_count),
+            'average_optime': _avg(self.optime_total, self.optime_count),
+            'binds': {
+                'total': self.ops['BIND'],
+                'unbinds': self.ops['UNBIND'],
+                'v2': self.v2_binds,
+                'v3': self.v3_binds,
+                'autobind': self.autobinds,
+                'sasl': self.sasl_binds,
+                'root_dn': self.root_binds,
+                'anonymous': self.anonymous_binds,
+                'top_bind_dns': self.bind_dns.most_common(top),
+            },
+            'errors': sorted(self.errors.items(), key=lambda e: e[1], reverse=True),
+            'connection_codes': self.conn_codes.most_common(),
+            'fds_taken': self.fds_taken,
+            'fds_returned': self.fds_returned,
+            'highest_fd': self.highest_fd,
+            'unindexed_searches': self.unindexed,
+            'unindexed_components': self.unindexed_components,
+            'invalid_filters': self.invalid_filters,
+            'paged_searches': self.paged,
+            'persistent_searches': self.persistent,
+            'unique_clients': len(self.clients),
+            'top_clients': self.clients.most_common(top),
+            'top_search_bases': self.bases.most_common(top),
+            'top_search_filters': self.filters.most_common(top),
+        }
+
+    def format_report(self, top=20):
+        """Render the report in the layout used by logconv.pl
+
+        :param top: How many entries to keep in the "top N" lists
+        :type top: int
+        :returns: A list of report lines
+        """
+        report = self.to_dict(top)
+        out = []
+        out.append('Total Log Lines Analysed:      %s' % report['lines'])
+        out.append('')
+        out.append('----------- Access Log Output ------------')
+        out.append('')
+        out.append('Start of Logs:                 %s' % report['start'])
+        out.append('End of Logs:                   %s' % report['end'])
+        out.append('')
+        out.append('Restarts:                      %s' % report['restarts'])
+        out.append('Peak Concurrent Connections:   %s' % report['peak_connections'])
+        out.append('Total Operations:              %s' % report['total_operations'])
+        out.append('Total Results:                 %s' % report['total_results'])
+        out.append('')
+        conns = report['connections']
+        out.append('Total Connections:             %s' % conns['total'])
+        out.append(' - LDAP Connections:           %s' % conns['ldap'])
+        out.append(' - LDAPI Connections:          %s' % conns['ldapi'])
+        out.append(' - LDAPS Connections:          %s' % conns['ldaps'])
+        out.append(' - StartTLS Extended Ops:      %s' % conns['starttls'])
+        out.append('')
+        for op, title in OP_NAMES:
+            out.append('{:<31}{}'.format(title + ':', self.ops[op]))
+        out.append('')
+        out.append('Average wtime (wait time):     %.9f' % report['average_wtime'])
+        out.append('Average optime (op time):      %.9f' % report['average_optime'])
+        out.append('Average etime (elapsed time):  %.9f' % report['etime']['average'])
+        out.append('')
+        out.append('Persistent Searches:           %s' % report['persistent_searches'])
+        out.append('Paged Searches:                %s' % report['paged_searches'])
+        out.append('Unindexed Searches:            %s' % report['unindexed_searches'])
+        out.append('Unindexed Components:          %s' % report['unindexed_components'])
+        out.append('Invalid Attribute Filters:     %s' % report['invalid_filters'])
+        out.append('')
+        out.append('FDs Taken:                     %s' % report['fds_taken'])
+        out.append('FDs Returned:                  %s' % report['fds_returned'])
+        out.append('Highest FD Taken:              %s' % report['highest_fd'])
+        out.append('')
+        binds = report['binds']
+        out.append('Binds:                         %s' % binds['total'])
+        out.append('Unbinds:                       %s' % binds['unbinds'])
+        out.append(' - LDAP v2 Binds:              %s' % binds['v2'])
+        out.append(' - LDAP v3 Binds:              %s' % binds['v3'])
+        out.append(' - AUTOBINDs(LDAPI):           %s' % binds['autobind'])
+        out.append(' - SASL Binds:                 %s' % binds['sasl'])
+        out.append(' - Directory Manager Binds:    %s' % binds['root_dn'])
+        out.append(' - Anonymous Binds:            %s' % binds['anonymous'])
+        out.append('')
+        out.append('----- Errors -----')
+        out.append('')
+        for err, count in report['errors']:
+            out.append('%-8s       %12s' % ('err=%s' % err, count))
+        out.append('')
+        out.append('----- Total Connection Codes -----')
+        out.append('')
+        for code, count in report['connection_codes']:
+            out.append('%-4s %14s' % (code, count))
+        for title, key in [('Clients', 'top_clients'),
+                           ("Bind DN's", None),
+                           ('Search Bases', 'top_search_bases'),
+                           ('Search Filters', 'top_search_filters')]:
+            values = binds['top_bind_dns'] if key is None else report[key]
+            out.append('')
+            out.append('----- Top %s %s -----' % (top, title))
+            out.append('')
+            for value, count in values:
+                out.append('%-10s %s' % (count, value))
+        out.append('')
+        out.append('----- Top %s Most Frequent etimes (elapsed times) -----' % top)
+        out.append('')
+        for etime, count in report['etime']['most_frequent']:
+            out.append('%-8s        etime=%s' % (count, etime))
+        out.append('')
+        out.append('----- Top %s Longest etimes (elapsed times) -----' % top)
+        out.append('')
+        for etime in report['etime']['longest']:
+            out.append('etime=%-12s    %s' % (etime, self.etimes[etime]))
+        return out
+
+
+def _analyze_shard(path, start=0, end=None, factory=AccessLogStats):
+    """Reduce a byte range of a single log file to an aggregate.
+
+    A shard owns every line that *starts* inside [start, end). Compressed
+    logs can't be seeked, so they are always processed as a single shard.
+    The aggregate is created by calling factory, and must provide feed(line)
+    and merge(other).
+    """
+    stats = factory()
+    if path.endswith('.gz'):
+        with open_log(path) as lf:
+            for line in lf:
+                stats.feed(line)
+        return stats
+
+    with open(path, 'rb') as lf:
+        pos = start
+        if start > 0:
+            # Skip the tail of the line owned by the previous shard.
+            lf.seek(start - 1)
+            pos = start - 1 + len(lf.readline())
+        for line in lf:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            stats.feed(line.decode('utf-8', errors='replace'))
+    return stats
+
+
+def _analyze_shard_args(args):
+    return _analyze_shard(*args)
+
+
+class AccessLogAnalyzer(object):
+    """Analyze current and rotated access logs in parallel
+
+    :param access_log: The access log of the instance to analyze
+    :type access_log: lib389.dirsrv_log.DirsrvAccessLog
+    :param jobs: Number of worker processes, defaults to the cpu count
+    :type jobs: int
+    :param shard_size: Size of the byte ranges plain logs are split into
+    :type shard_size: int
+    :param root_dn: The Directory Manager DN, to count root binds
+    :type root_dn: str
+    :param factory: Creates the aggregate each shard is reduced to. It must be
+                    picklable, and its result provide feed(line) and merge(other).
+                    Defaults to AccessLogStats.
+    :type factory: callable
+    """
+
+    def __init__(self, access_log, jobs=None, shard_size=DEFAULT_SHARD_SIZE,
+                 root_dn='cn=directory manager', factory=None):
+        self._access_log = access_log
+        self._jobs = jobs or os.cpu_count() or 1
+        self._shard_size = shard_size
+        if factory is None:
+            factory = partial(AccessLogStats, root_dn)
+        self._factory = factory
+
+    def log_paths(self, archive=True):
+        """Return the logs to analyze, oldest first
+
+        :param archive: Include the rotated logs
+        :type archive: bool
+        :returns: A list of paths
+        """
+        if not archive:
+            return [self._access_log._get_log_path()]
+        return self._access_log._get_all_log_paths_sorted()
+
+    def shards(self, paths):
+        """Split the logs into the units of work handed to the workers
+
+        :param paths: The log files, oldest first
+        :type paths: list
+        :returns: A list of (path, start, end, factory) tuples
+        """
+        shards = []
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            if path.endswith('.gz'):
+                shards.append((path, 0, None, self._factory))
+                continue
+            size = os.path.getsize(path)
+            for start in range(0, size, self._shard_size):
+                end = min(start + self._shard_size, size)
+                shards.append((path, start, end, self._factory))
+        return shards
+
+    def analyze(self, paths=None, archive=True):
+        """Analyze the logs and merge the results
+
+        :param paths: Explicit list of logs, oldest first. Defaults to the
+                      logs of the instance.
+        :type paths: list
+        :param archive: When using the instance logs, include rotated logs
+        :type archive: bool
+        :returns: The merged aggregate, an AccessLogStats by default
+        """
+        if paths is None:
+            paths = self.log_paths(archive)
+        shards = self.shards(paths)
+        stats = self._factory()
+        if self._jobs == 1 or len(shards) <= 1:
+            for partial_stats in map(_analyze_shard_args, shards):
+                stats.merge(partial_stats)
+            return stats
+        with ProcessPoolExecutor(max_workers=self._jobs) as executor:
+            # map() yields in submission order, which keeps the merge chronological.
+            for partial_stats in executor.map(_analyze_shard_args, shards):
+                stats.merge(partial_stats)
+        return stats
@@ -87,6 +87,13 @@ CONFIG_MAP = {
     'version': ('', 'vendorVersion'),
 }
 
+# The attributes of CONFIG_MAP per entry, to read them with one search
+CONFIG_ATTRS = {}
+for (_dn, _attr) in CONFIG_MAP.values():
+    CONFIG_ATTRS.setdefault(_dn, [])
+    if _attr not in CONFIG_ATTRS[_dn]:
+        CONFIG_ATTRS[_dn].append(_attr)
+
 SECTION = 'slapd'
 
 
@@ -117,6 +124,11 @@ class Paths(object):
         self._serverid = serverid
         self._instance = instance
         self._islocal = local
+        # The entries of CONFIG_MAP read from the online instance, by dn.
+        # They are read again after invalidate().
+        self._online = {}
+        # The searches made for them, so tests can check they are cached
+        self.online_searches = 0
 
     def _get_defaults_loc(self, search_paths):
         ## THIS IS HOW WE HANDLE A PREFIX INSTALL
@@ -159,7 +171,7 @@ class Paths(object):
         if name in CONFIG_MAP and self._instance is not None and self._instance.state == DIRSRV_STATE_ONLINE:
             # Get the online value.
             (dn, attr) = CONFIG_MAP[name]
-            ent = self._instance.getEntry(dn, attrlist=[attr,])
+            ent = self._online_entry(dn)
             # If the server doesn't have it, fall back to our configuration.
             if attr is not None:
                 v = ensure_str(ent.getValue(attr))
@@ -175,6 +187,21 @@ class Paths(object):
         else:
             return ensure_str(self._config.get(SECTION, name))
 
+    def _online_entry(self, dn):
+        ent = self._online.get(dn)
+        if ent is None:
+            # Read all the paths of this entry at once, they are all needed
+            # sooner or later.
+            self.online_searches += 1
+            ent = self._instance.getEntry(dn, attrlist=CONFIG_ATTRS[dn])
+            self._online[dn] = ent
+        return ent
+
+    def invalidate(self):
+        """Forget the paths read from the online instance, for when its
+        configuration changed or it was restarted"""
+        self._online = {}
+
     @property
     def asan_enabled(self):
         if self._defaults_cached is False and self._islocal:
@@ -0,0 +1,345 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""A thread-safe pool of DirSrv connections.
+
+A DirSrv wraps a single LDAP connection, which can't be used by several
+threads at once. The pool hands out a connection to each worker instead,
+and keeps them open to be reused, per URI and bind identity:
+
+    pool = ConnectionPool(maxsize=8)
+
+    def work(dn):
+        with pool.connection(inst) as conn:
+            return UserAccount(conn, dn).get_attr_val_utf8('uid')
+
+    with ThreadPoolExecutor(8) as executor:
+        uids = list(executor.map(work, dns))
+    pool.close()
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import ldap
+from lib389 import DirSrv
+from lib389.properties import SER_LDAP_URL, SER_ROOT_DN, SER_ROOT_PW, SER_SERVERID_PROP
+from lib389.exceptions import PoolTimeout
+
+# The maximum number of connections open per URI and bind identity
+DEFAULT_MAXSIZE = 8
+# Idle connections are closed after this many seconds
+DEFAULT_MAX_IDLE = 300
+# A connection idle for longer than this many seconds is checked before
+# it is handed out again
+DEFAULT_CHECK_INTERVAL = 30
+
+log = logging.getLogger(__name__)
+
+
+def connect(uri, binddn=None, bindpw=None, saslmethod=None, certdir=None, starttls=False, reqcert=None,
+            usercert=None, userkey=None, serverid=None, verbose=False, timeout=None):
+    """Open a new connection, see ConnectionPool.acquire() for the arguments
+
+    :param timeout: Seconds to wait for the server to connect, and to answer
+                    each operation, None to wait for ever
+    :type timeout: float
+    :returns: A DirSrv
+    """
+
+    conn = DirSrv(verbose=verbose)
+    args = {SER_LDAP_URL: uri}
+    if binddn is not None:
+        args[SER_ROOT_DN] = binddn
+        args[SER_ROOT_PW] = bindpw
+    if serverid is not None:
+        args[SER_SERVERID_PROP] = serverid
+    conn.allocate(args)
+    conn.open(uri=uri, saslmethod=saslmethod, certdir=certdir, starttls=starttls, connOnly=True,
+              reqcert=reqcert, usercert=usercert, userkey=userkey, timeout=timeout)
+    return conn
+
+
+class _Slot(object):
+    """The connections of one URI and bind identity"""
+
+    __slots__ = ('idle', 'size')
+
+    def __init__(self):
+        # (connection, time it was released), the most recent last
+        self.idle = deque()
+        # The connections open, idle or borrowed
+        self.size = 0
+
+
+class ConnectionPool(object):
+    """A pool of connections keyed by URI and bind identity
+
+    :param maxsize: The maximum number of connections per key
+    :type maxsize: int
+    :param max_idle: Seconds after which an idle connection is closed
+    :type max_idle: float
+    :param check_interval: Seconds of idleness after which a connection is
+                           checked with a root DSE search before reuse
+    :type check_interval: float
+    :param timeout: Seconds to wait for a connection when maxsize are borrowed,
+                    None to wait for ever
+    :type timeout: float
+    :param verbose: Passed to the DirSrv of the connections
+    :type verbose: bool
+    :param ldap_timeout: Seconds the connections wait for their server to
+                         connect, and to answer each operation, None to wait
+                         for ever
+    :type ldap_timeout: float
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, max_idle=DEFAULT_MAX_IDLE,
+                 check_interval=DEFAULT_CHECK_INTERVAL, timeout=None, verbose=False, ldap_timeout=None):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self._maxsize = maxsize
+        self._max_idle = max_idle
+        self._check_interval = check_interval
+        self._timeout = timeout
+        self._ldap_timeout = ldap_timeout
+        self._verbose = verbose
+        self._slots = {}
+        # The key of each borrowed connection
+        self._borrowed = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.evicted = 0
+
+    @staticmethod
+    def instance_params(inst, binddn=None, bindpw=None):
+        """Get the connection parameters of an instance, to pass to
+        acquire(). An instance with LDAPI autobind is connected with SASL
+        EXTERNAL, unless a bind DN is given.
+
+        :param inst: An instance
+        :type inst: lib389.DirSrv
+        :param binddn: Bind as this DN rather than the one of the instance
+        :type binddn: str
+        :param bindpw: The password of binddn
+        :type bindpw: str
+        :returns: A dict of acquire() arguments
+        """
+
+        params = {'uri': inst.toLDAPURL(), 'serverid': inst.serverid}
+        if binddn is None and inst.can_autobind():
+            params['saslmethod'] = 'EXTERNAL'
+        else:
+            params['binddn'] = binddn if binddn is not None else inst.binddn
+            params['bindpw'] = bindpw if bindpw is not None else inst.bindpw
+        return params
+
+    def acquire(self, uri, binddn=None, bindpw=None, saslmethod=None, certdir=None, starttls=False,
+                reqcert=None, usercert=None, userkey=None, serverid=None):
+        """Borrow a connection, open and bound, to give back with release()
+
+        :param uri: The LDAP URI, ldap://, ldaps:// or ldapi://
+        :type uri: str
+        :param binddn: The DN to bind as, with a simple bind
+        :type binddn: str
+        :param bindpw: The password of binddn
+        :type bindpw: str
+        :param saslmethod: EXTERNAL or GSSAPI to bind with SASL instead
+        :type saslmethod: str
+        :param certdir: Certificate directory for TLS
+        :type certdir: str
+        :param starttls: Whether to use StartTLS on ldap://
+        :type starttls: bool
+        :param reqcert: ldap.OPT_X_TLS_REQUIRE_CERT policy
+        :type reqcert: int
+        :param usercert: Client certificate file
+        :type usercert: str
+        :param userkey: Client key file
+        :type userkey: str
+        :param serverid: The local instance behind uri, if any
+        :type serverid: str
+        :returns: A DirSrv
+        :raises: PoolTimeout - if no connection became available in time
+        """
+
+        key = (uri, binddn, bindpw, saslmethod, certdir, starttls, reqcert, usercert, userkey)
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        expired = []
+        with self._cond:
+            slot = self._slots.setdefault(key, _Slot())
+            while True:
+                if self._closed:
+                    raise ValueError('The connection pool is closed')
+                expired += self._evict_idle()
+                if slot.idle:
+                    conn, released = slot.idle.pop()
+                    break
+                if slot.size < self._maxsize:
+                    conn = None
+                    slot.size += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout('No connection to %s available after %ss' % (uri, self._timeout))
+                self._cond.wait(remaining)
+
+        # Connect, check and close outside of the lock
+        for expired_conn in expired:
+            self._close(expired_conn)
+        reused = conn is not None
+        if reused and time.monotonic() - released > self._check_interval and not self._alive(conn):
+            self._close(conn)
+            conn = None
+            reused = False
+            with self._cond:
+                self.discarded += 1
+        if conn is None:
+            try:
+                conn = self._open(uri, binddn, bindpw, saslmethod, certdir, starttls, reqcert, usercert,
+                                  userkey, serverid)
+            except BaseException:
+                with self._cond:
+                    slot.size -= 1
+                    self._cond.notify()
+                raise
+        with self._cond:
+            if reused:
+                self.reused += 1
+            else:
+                self.created += 1
+            self._borrowed[id(conn)] = key
+        return conn
+
+    def release(self, conn, discard=False):
+        """Give back a connection borrowed with acquire()
+
+        :param conn: The connection
+        :type conn: lib389.DirSrv
+        :param discard: Close the connection rather than keep it, when it
+                        may be broken
+        :type discard: bool
+        """
+
+        with self._cond:
+            key = self._borrowed.pop(id(conn))
+            slot = self._slots[key]
+            if discard or self._closed:
+                slot.size -= 1
+                self.discarded += 1
+            else:
+                slot.idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self, inst=None, binddn=None, bindpw=None, **kwargs):
+        """Borrow a connection for a with block. Either give an instance to
+        connect as it does, or the acquire() arguments.
+
+        :param inst: An instance
+        :type inst: lib389.DirSrv
+        :param binddn: The DN to bind as
+        :type binddn: str
+        :param bindpw: The password of binddn
+        :type bindpw: str
+        """
+
+        if inst is not None:
+            kwargs.update(self.instance_params(inst, binddn, bindpw))
+        else:
+            kwargs.update(binddn=binddn, bindpw=bindpw)
+        conn = self.acquire(**kwargs)
+        try:
+            yield conn
+        except (ldap.SERVER_DOWN, ldap.CONNECT_ERROR):
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def evict_idle(self):
+        """Close the connections idle for longer than max_idle"""
+        with self._cond:
+            expired = self._evict_idle()
+        for conn in expired:
+            self._close(conn)
+
+    def _evict_idle(self):
+        # Called with the lock held, returns the connections to close. The
+        # oldest idle connections come first.
+        expired = []
+        limit = time.monotonic() - self._max_idle
+        for slot in self._slots.values():
+            while slot.idle and slot.idle[0][1] < limit:
+                conn, _ = slot.idle.popleft()
+                slot.size -= 1
+                self.evicted += 1
+                expired.append(conn)
+        if expired:
+            self._cond.notify_all()
+        return expired
+
+    def close(self):
+        """Close the idle connections, and the borrowed ones when they are
+        released. The pool can't be used after that."""
+        idle = []
+        with self._cond:
+            self._closed = True
+            for slot in self._slots.values():
+                while slot.idle:
+                    conn, _ = slot.idle.popleft()
+                    slot.size -= 1
+                    idle.append(conn)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Get the pool statistics
+
+        :returns: A dict
+        """
+        with self._cond:
+            return {
+                'open': sum(slot.size for slot in self._slots.values()),
+                'idle': sum(len(slot.idle) for slot in self._slots.values()),
+                'borrowed': len(self._borrowed),
+                'created': self.created,
+                'reused': self.reused,
+                'discarded': self.discarded,
+                'evicted': self.evicted,
+            }
+
+    def _open(self, uri, binddn, bindpw, saslmethod, certdir, starttls, reqcert, usercert, userkey, serverid):
+        log.debug('Opening a pooled connection to %s as %s', uri, binddn or saslmethod)
+        return connect(uri, binddn, bindpw, saslmethod, certdir, starttls, reqcert, usercert, userkey,
+                       serverid, verbose=self._verbose, timeout=self._ldap_timeout)
+
+    @staticmethod
+    def _alive(conn):
+        try:
+            conn.search_ext_s('', ldap.SCOPE_BASE, '(objectClass=*)', attrlist=['1.1'], escapehatch='i am sure')
+            return True
+        except ldap.LDAPError:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except ldap.LDAPError:
+            pass
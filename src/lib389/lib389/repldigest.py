@@ -0,0 +1,349 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+
+"""Digests of the entries of replicas, to find where they differ.
+
+Each side computes a digest of every entry, over its DN and its normalized
+attribute values, and aggregates them in a Merkle tree following the DIT:
+the hash of a subtree covers the digest of its entry, and the hashes of the
+subtrees of its children. Two trees are compared from the suffix down, only
+going into the subtrees whose hashes differ, so the parts of the DIT that
+are in sync are skipped as a whole:
+
+    tree = DigestTree('dc=example,dc=com')
+    for dn, attrs in entries:
+        tree.add(dn, attrs)
+    tree.save('/tmp/master.digest.gz')
+
+    diff = diff_trees(DigestTree.load('/tmp/master.digest.gz'),
+                      DigestTree.load('/tmp/replica.digest.gz'))
+
+The saved digests are much smaller than the entries and their replication
+state, so they can be computed next to each replica, exchanged, and only the
+entries that differ read in full.
+"""
+
+import gzip
+import hashlib
+import json
+import ldap
+from lib389.utils import ensure_bytes
+
+# The bytes of the digests kept of the SHA-256 hashes
+DIGEST_SIZE = 16
+
+# The version of the format of the saved digests
+FORMAT_VERSION = 1
+
+# The attributes that differ between replicas in sync, or that only hold the
+# replication state of the others
+DEFAULT_IGNORE = ('createtimestamp', 'modifytimestamp', 'modifiersname', 'conflictcsn', 'nscpentrywsi',
+                  'entryusn')
+
+# The digest of the subtree root of an entry the tree doesn't have
+_NO_DIGEST = b''
+
+
+def _split_dn(dn):
+    """Get the normalized DN, and the normalized DN of its parent"""
+    rdns = ldap.dn.str2dn(dn.lower())
+    return ldap.dn.dn2str(rdns), ldap.dn.dn2str(rdns[1:])
+
+
+def entry_digest(dn, attrs, ignore=DEFAULT_IGNORE):
+    """Get the digest of an entry, which doesn't depend on the order of its
+    attributes and values, nor on the case of its attribute names and of
+    its object classes
+
+    :param dn: The DN of the entry
+    :type dn: str
+    :param attrs: The attributes of the entry, and their values
+    :type attrs: dict
+    :param ignore: The lowercase attributes left out of the digest
+    :type ignore: frozenset or tuple
+    :returns: The digest, bytes
+    """
+
+    digest = hashlib.sha256(_split_dn(dn)[0].encode())
+    values = {}
+    for attr, vals in attrs.items():
+        attr = attr.lower()
+        if attr in ignore:
+            continue
+        vals = [ensure_bytes(v) for v in vals]
+        if attr == 'objectclass':
+            vals = [v.lower() for v in vals]
+        values.setdefault(attr, []).extend(vals)
+    for attr in sorted(values):
+        digest.update(b'\n' + attr.encode())
+        for val in sorted(values[attr]):
+            # The length keeps values apart, whatever bytes they hold
+            digest.update(b'\n%d:' % len(val) + val)
+    return digest.digest()[:DIGEST_SIZE]
+
+
+class _Node(object):
+    """An entry of the tree, with its subtree"""
+
+    __slots__ = ('dn', 'depth', 'digest', 'children', 'hash')
+
+    def __init__(self, dn, depth):
+        self.dn = dn
+        self.depth = depth
+        # None when only the entries below are in the tree
+        self.digest = None
+        # The normalized DNs of the children
+        self.children = []
+        self.hash = None
+
+
+class DigestTree(object):
+    """The Merkle tree of the digests of the entries of a suffix
+
+    :param suffix: The suffix of the entries
+    :type suffix: str
+    :param ignore: The attributes left out of the digests
+    :type ignore: list of str
+    :param source: What the digests are computed from, only trees of the
+                   same source can be compared
+    :type source: str
+    """
+
+    def __init__(self, suffix, ignore=DEFAULT_IGNORE, source=None):
+        self.suffix = suffix
+        self.ignore = frozenset(attr.lower() for attr in ignore)
+        self.source = source
+        self._root = _split_dn(suffix)[0]
+        self._nodes = {self._root: _Node(suffix, 0)}
+        self._hashed = False
+        self.entries = 0
+        self.tombstones = 0
+
+    def add(self, dn, attrs):
+        """Add an entry. Tombstones are only counted, and the entries outside
+        of the suffix ignored.
+
+        :param dn: The DN of the entry
+        :type dn: str
+        :param attrs: The attributes of the entry, and their values
+        :type attrs: dict
+        :returns: True if the entry was added
+        """
+
+        key = self._key(dn)
+        if key is None:
+            return False
+        self.entries += 1
+        for attr, vals in attrs.items():
+            if attr.lower() == 'objectclass' and b'nstombstone' in (ensure_bytes(v).lower() for v in vals):
+                self.tombstones += 1
+                return False
+        self._add_digest(key, dn, entry_digest(dn, attrs, self.ignore))
+        return True
+
+    def _key(self, dn):
+        # The normalized DN of an entry of the suffix, or None
+        key = _split_dn(dn)[0]
+        if key != self._root and not key.endswith(',' + self._root):
+            return None
+        return key
+
+    def _add_digest(self, key, dn, digest):
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._node(key, dn)
+        node.dn = dn
+        node.digest = digest
+        self._hashed = False
+
+    def _node(self, key, dn):
+        # Create the node of an entry, and of its ancestors up to the suffix
+        # when they are not in the tree yet
+        parent_dn = ldap.dn.dn2str(ldap.dn.str2dn(dn)[1:])
+        parent_key = _split_dn(parent_dn)[0]
+        parent = self._nodes.get(parent_key)
+        if parent is None:
+            parent = self._node(parent_key, parent_dn)
+        node = _Node(dn, parent.depth + 1)
+        self._nodes[key] = node
+        parent.children.append(key)
+        return node
+
+    def _compute_hashes(self):
+        # Hash the subtrees bottom up
+        if self._hashed:
+            return
+        for node in sorted(self._nodes.values(), key=lambda node: node.depth, reverse=True):
+            digest = hashlib.sha256(node.digest or _NO_DIGEST)
+            node.children.sort()
+            for child in node.children:
+                digest.update(self._nodes[child].hash)
+            node.hash = digest.digest()[:DIGEST_SIZE]
+        self._hashed = True
+
+    def _get(self, dn):
+        key = self._key(dn) if dn is not None else self._root
+        if key is None or key not in self._nodes:
+            raise KeyError(dn)
+        return self._nodes[key]
+
+    def digest(self, dn):
+        """Get the digest of an entry
+
+        :param dn: The DN of the entry
+        :type dn: str
+        :returns: The digest, or None if only entries below it are in the tree
+        :raises: KeyError - if neither the entry nor entries below it are in
+                 the tree
+        """
+
+        return self._get(dn).digest
+
+    def hash(self, dn=None):
+        """Get the hash of a subtree
+
+        :param dn: The DN of the root of the subtree, the suffix by default
+        :type dn: str
+        :returns: The hash, bytes
+        :raises: KeyError - if the subtree is not in the tree
+        """
+
+        self._compute_hashes()
+        return self._get(dn).hash
+
+    def children(self, dn=None):
+        """Get the hashes of the subtrees of the children of an entry
+
+        :param dn: The DN of the entry, the suffix by default
+        :type dn: str
+        :returns: A list of (child DN, hash), in normalized DN order
+        :raises: KeyError - if the entry is not in the tree
+        """
+
+        self._compute_hashes()
+        return [(self._nodes[key].dn, self._nodes[key].hash) for key in self._get(dn).children]
+
+    def subtree(self, dn=None):
+        """Get the DNs of the entries of a subtree, parents first
+
+        :param dn: The DN of the root of the subtree, the suffix by default
+        :type dn: str
+        :returns: A generator of DNs
+        """
+
+        self._compute_hashes()
+        stack = [self._get(dn)]
+        while stack:
+            node = stack.pop()
+            if node.digest is not None:
+                yield node.dn
+            stack.extend(self._nodes[key] for key in reversed(node.children))
+
+    def save(self, path):
+        """Save the digests to a file, compressed when its name ends with .gz
+
+        :param path: The file to write
+        :type path: str
+        """
+
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'format': FORMAT_VERSION,
+                'suffix': self.suffix,
+                'ignore': sorted(self.ignore),
+                'source': self.source,
+                'entries': self.entries,
+                'tombstones': self.tombstones,
+            }) + '\n')
+            for dn in self.subtree():
+                f.write(json.dumps([self._nodes[self._key(dn)].digest.hex(), dn]) + '\n')
+
+    @classmethod
+    def load(cls, path):
+        """Load digests saved with save()
+
+        :param path: The file to read
+        :type path: str
+        :returns: A DigestTree
+        :raises: ValueError - if the file is not a digest file
+        """
+
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            try:
+                header = json.loads(f.readline())
+                if not isinstance(header, dict) or header.get('format') != FORMAT_VERSION:
+                    raise ValueError('%s is not a digest file of a supported format' % path)
+                tree = cls(header['suffix'], header['ignore'], header['source'])
+                tree.entries = header['entries']
+                tree.tombstones = header['tombstones']
+                for line in f:
+                    digest, dn = json.loads(line)
+                    key = tree._key(dn)
+                    if key is None:
+                        raise ValueError('%s is outside of the suffix %s' % (dn, tree.suffix))
+                    tree._add_digest(key, dn, bytes.fromhex(digest))
+            except (KeyError, TypeError) as e:
+                raise ValueError('%s is not a valid digest file: %s' % (path, e))
+        return tree
+
+
+def diff_trees(master, replica):
+    """Find the entries that differ between two trees. Only the subtrees
+    with different hashes are compared, down to their entries.
+
+    :param master: The digests of the first replica
+    :type master: DigestTree
+    :param replica: The digests of the second replica
+    :type replica: DigestTree
+    :returns: A dict of the DNs of the entries only on master ('master_only'),
+              only on replica ('replica_only'), and of the entries on both
+              with different digests ('different'), all in DIT order, and of
+              the number of subtree hashes compared ('compared')
+    :raises: ValueError - if the trees can't be compared
+    """
+
+    if master._root != replica._root:
+        raise ValueError('The digests are of different suffixes (%s, %s)' % (master.suffix, replica.suffix))
+    if master.ignore != replica.ignore:
+        raise ValueError('The digests ignore different attributes')
+    if master.source != replica.source:
+        raise ValueError('The digests are computed from different sources (%s, %s)' %
+                         (master.source, replica.source))
+
+    result = {'master_only': [], 'replica_only': [], 'different': [], 'compared': 0}
+    stack = [(master.suffix, replica.suffix)]
+    while stack:
+        mdn, rdn = stack.pop()
+        if mdn is None:
+            result['replica_only'] += replica.subtree(rdn)
+            continue
+        if rdn is None:
+            result['master_only'] += master.subtree(mdn)
+            continue
+        result['compared'] += 1
+        if master.hash(mdn) == replica.hash(rdn):
+            continue
+
+        mdigest = master.digest(mdn)
+        rdigest = replica.digest(rdn)
+        if mdigest != rdigest:
+            if rdigest is None:
+                result['master_only'].append(mdn)
+            elif mdigest is None:
+                result['replica_only'].append(rdn)
+            else:
+                result['different'].append(mdn)
+
+        # Go through the children of both sides in normalized DN order
+        mchildren = {master._key(dn): dn for dn, _ in master.children(mdn)}
+        rchildren = {replica._key(dn): dn for dn, _ in replica.children(rdn)}
+        for key in sorted(set(mchildren) | set(rchildren), reverse=True):
+            stack.append((mchildren.get(key), rchildren.get(key)))
+    return result
@@ -18,6 +18,7 @@ import json
 import copy
 from operator import itemgetter
 from itertools import permutations
+from concurrent.futures import ThreadPoolExecutor
 from lib389._constants import *
 from lib389.properties import *
 from lib389.utils import (normalizeDN, escapeDNValue, ensure_bytes, ensure_str,
@@ -27,7 +28,8 @@ from lib389 import DirSrv, Entry, NoSuchEntryError, InvalidArgumentError
 from lib389._mapped_object import DSLdapObjects, DSLdapObject
 from lib389.passwd import password_generate
 from lib389.mappingTree import MappingTrees
-from lib389.agreement import Agreements
+from lib389.agreement import Agreements, ConsumerRUVCache
+from lib389.pool import ConnectionPool
 from lib389.tombstone import Tombstones
 from lib389.tasks import CleanAllRUVTask
 from lib389.idm.domain import Domain
@@ -2542,6 +2544,10 @@ class ReplicationManager(object):
         return replica.get_rid()
 
 
+# The instances of the topology the replication monitor reads at the same time
+DEFAULT_MONITOR_WORKERS = 8
+
+
 class ReplicationMonitor(object):
     """The lib389 replication monitor. This is used to check the status
     of many instances at once.
@@ -2552,22 +2558,41 @@ class ReplicationMonitor(object):
     :type instance: list of DirSrv objects
     :param logger: A logging interface
     :type logger: python logging
+    :param workers: The number of instances read at the same time
+    :type workers: int
+    :param timeout: Seconds to wait for each instance of the topology to
+                    connect, and to answer each operation, None to wait
+                    for ever
+    :type timeout: float
     """
 
-    def __init__(self, instance, logger=None):
+    def __init__(self, instance, logger=None, workers=DEFAULT_MONITOR_WORKERS, timeout=None):
         self._instance = instance
         if logger is not None:
             self._log = logger
         else:
             self._log = logging.getLogger(__name__)
+        self._workers = workers
+        self._timeout = timeout
+        # The seconds the last report took to generate
+        self.duration = None
+
+    @staticmethod
+    def _unavailable(e):
+        """The status of an instance that failed with an LDAPError"""
+        if e.args and isinstance(e.args[0], dict) and 'desc' in e.args[0]:
+            return [{"replica_status": f"Unavailable - {e.args[0]['desc']}"}]
+        return [{"replica_status": f"Unavailable - {e}"}]
 
-    def _get_replica_status(self, instance, report_data, use_json, get_credentials=None):
+    def _get_replica_status(self, instance, use_json, get_credentials=None, pool=None, ruvs=None):
         """Load all of the status data to report
-        and add new hostname:port pairs for future processing
         :type get_credentials: function
+        :returns: The status of the replicas, and the hostname:port:protocol
+                  of the consumers of their agreements
         """
 
         replicas_status = []
+        consumers = []
         replicas = Replicas(instance)
         for replica in replicas.list():
             replica_id = replica.get_rid()
@@ -2588,85 +2613,120 @@ class ReplicationMonitor(object):
                 protocol = agmt.get_attr_val_utf8_l('nsds5replicatransportinfo')
                 # Supply protocol here because we need it only for connection
                 # and agreement status is already preformatted for the user output
-                consumer = f"{host}:{port}"
-                if consumer not in report_data:
-                    report_data[f"{consumer}:{protocol}"] = None
+                consumers.append(f"{host}:{port}:{protocol}")
                 if use_json:
-                    agmts_status.append(json.loads(agmt.status(use_json=True, binddn=binddn, bindpw=bindpw)))
+                    agmts_status.append(json.loads(agmt.status(use_json=True, binddn=binddn, bindpw=bindpw,
+                                                               pool=pool, ruvs=ruvs)))
                 else:
-                    agmts_status.append(agmt.status(binddn=binddn, bindpw=bindpw))
+                    agmts_status.append(agmt.status(binddn=binddn, bindpw=bindpw, pool=pool, ruvs=ruvs))
             replicas_status.append({"replica_id": replica_id,
                                     "replica_root": replica_root,
                                     "replica_status": "Available",
                                     "maxcsn": replica_maxcsn,
                                     "agmts_status": agmts_status})
-        return replicas_status
+        return replicas_status, consumers
+
+    def _get_supplier_status(self, supplier, credentials, use_json, pool, ruvs):
+        """Connect to an instance found through the agreements, and load its
+        status data. This runs in the worker threads.
+        :returns: The status of the replicas, and the hostname:port:protocol
+                  of the consumers of their agreements, None if the instance
+                  is unavailable
+        """
+
+        supplier_hostname, supplier_port, supplier_protocol = supplier.split(":")
+        if supplier_protocol == "ssl" or supplier_protocol == "ldaps":
+            uri = f"ldaps://{supplier_hostname}:{supplier_port}/"
+        else:
+            uri = f"ldap://{supplier_hostname}:{supplier_port}/"
+        try:
+            supplier_inst = pool.acquire(uri, binddn=credentials["binddn"], bindpw=credentials["bindpw"])
+        except ldap.LDAPError as e:
+            self._log.debug(f"Connection to consumer ({supplier_hostname}:{supplier_port}) failed, error: {e}")
+            return self._unavailable(e), None
+
+        discard = False
+        try:
+            return self._get_replica_status(supplier_inst, use_json, pool=pool, ruvs=ruvs)
+        except ldap.LDAPError as e:
+            # A timeout, or the instance went away
+            discard = True
+            self._log.debug(f"Getting the status of ({supplier_hostname}:{supplier_port}) failed, error: {e}")
+            return self._unavailable(e), None
+        finally:
+            pool.release(supplier_inst, discard=discard)
 
     def generate_report(self, get_credentials, use_json=False):
         """Generate a replication report for each supplier or hub and the instances
         that are connected with it by agreements.
 
+        The instances are read by a pool of workers, with a connection to
+        each of them shared by the agreements to it, and the RUV of each
+        consumer read once. The time it took is kept in duration.
+
         :param get_credentials: A user-defined callback function with parameters (host, port) which returns
                                 a dictionary with binddn and bindpw keys -
                                 example values "cn=Directory Manager" and "password"
         :type get_credentials: function
         :returns: dict
         """
+        start = time.monotonic()
         report_data = {}
+        pool = ConnectionPool(maxsize=self._workers, ldap_timeout=self._timeout, verbose=self._instance.verbose)
+        ruvs = ConsumerRUVCache()
 
         initial_inst_key = f"{self._instance.config.get_attr_val_utf8_l('nsslapd-localhost')}:{self._instance.config.get_attr_val_utf8_l('nsslapd-port')}"
         # Do this on an initial instance to get the agreements to other instances
         try:
-            report_data[initial_inst_key] = self._get_replica_status(self._instance, report_data, use_json, get_credentials)
+            report_data[initial_inst_key], consumers = self._get_replica_status(self._instance, use_json,
+                                                                                get_credentials, pool, ruvs)
         except ldap.LDAPError as e:
-            self._log.debug(f"Connection to consumer ({supplier_hostname}:{supplier_port}) failed, error: {e}")
-            report_data[initial_inst_key] = [{"replica_status": f"Unavailable - {e.args[0]['desc']}"}]
+            self._log.debug(f"Connection to consumer ({initial_inst_key}) failed, error: {e}")
+            report_data[initial_inst_key] = self._unavailable(e)
+            consumers = []
 
         # Check if at least some replica report on other instances was generated
         repl_exists = False
 
-        # While we have unprocessed instances - continue
-        while True:
-            try:
-                supplier = [host_port for host_port, processed_data in report_data.items() if processed_data is None][0]
-            except IndexError:
-                break
-
-            del report_data[supplier]
-            s_splitted = supplier.split(":")
-            supplier_hostname = s_splitted[0]
-            supplier_port = s_splitted[1]
-            supplier_protocol = s_splitted[2]
-            supplier_hostport_only = ":".join(s_splitted[:2])
-
-            # The function should be defined outside and
-            # it should have all the logic for figuring out the credentials.
-            # It is done for flexibility purpuses between CLI, WebUI and lib389 API applications
-            credentials = get_credentials(supplier_hostname, supplier_port)
-            if not credentials["binddn"]:
-                report_data[supplier_hostport_only] = [{"replica_status": "Unavailable - Bind DN was not specified"}]
-                continue
-
-            # Open a connection to the consumer
-            supplier_inst = DirSrv(verbose=self._instance.verbose)
-            args_instance[SER_HOST] = supplier_hostname
-            if supplier_protocol == "ssl" or supplier_protocol == "ldaps":
-                args_instance[SER_SECURE_PORT] = int(supplier_port)
-            else:
-                args_instance[SER_PORT] = int(supplier_port)
-            args_instance[SER_ROOT_DN] = credentials["binddn"]
-            args_instance[SER_ROOT_PW] = credentials["bindpw"]
-            args_standalone = args_instance.copy()
-            supplier_inst.allocate(args_standalone)
-            try:
-                supplier_inst.open()
-            except ldap.LDAPError as e:
-                self._log.debug(f"Connection to consumer ({supplier_hostname}:{supplier_port}) failed, error: {e}")
-                report_data[supplier_hostport_only] = [{"replica_status": f"Unavailable - {e.args[0]['desc']}"}]
-                continue
-
-            report_data[supplier_hostport_only] = self._get_replica_status(supplier_inst, report_data, use_json)
-            repl_exists = True
+        # Read the topology a level at a time: the instances found through the
+        # agreements of the previous level are read at the same time, and are
+        # reported in the order they were found
+        seen = {initial_inst_key}
+        try:
+            with ThreadPoolExecutor(max_workers=self._workers) as executor:
+                while consumers:
+                    level = []
+                    for supplier in consumers:
+                        supplier_hostname, supplier_port = supplier.split(":")[:2]
+                        supplier_hostport_only = f"{supplier_hostname}:{supplier_port}"
+                        if supplier_hostport_only in seen:
+                            continue
+                        seen.add(supplier_hostport_only)
+
+                        # The function should be defined outside and
+                        # it should have all the logic for figuring out the credentials.
+                        # It is done for flexibility purpuses between CLI, WebUI and lib389 API applications.
+                        # It may prompt, so it is only called from this thread.
+                        credentials = get_credentials(supplier_hostname, supplier_port)
+                        if not credentials["binddn"]:
+                            level.append((supplier_hostport_only, None))
+                        else:
+                            level.append((supplier_hostport_only,
+                                          executor.submit(self._get_supplier_status, supplier, credentials,
+                                                          use_json, pool, ruvs)))
+
+                    consumers = []
+                    for supplier_hostport_only, future in level:
+                        if future is None:
+                            report_data[supplier_hostport_only] = [
+                                {"replica_status": "Unavailable - Bind DN was not specified"}]
+                            continue
+                        report_data[supplier_hostport_only], found = future.result()
+                        if found is not None:
+                            consumers += found
+                            repl_exists = True
+        finally:
+            pool.close()
 
         # Get rid of the repeated items
         report_data_parsed = {}
@@ -2688,4 +2748,7 @@ class ReplicationMonitor(object):
 
                 report_data_final[key] = value
 
+        self.duration = time.monotonic() - start
+        self._log.debug(f"Generated the replication report of {len(report_data)} instances "
+                        f"in {self.duration:.2f} seconds")
         return report_data_final
@@ -67,9 +67,14 @@ def _getCSNandTime(inst, line):
         op = vals['op']
         conn = vals['conn']
 
-        # Now find the result line and CSN
-        result_line = inst.ds_access_log.match_archive(
-            '.*conn=%s op=%s RESULT.*' % (conn, op))
+        # Now find the result line and CSN, the index avoids rescanning the
+        # current log. It may have been rotated since, so fall back to the archive.
+        result_line = inst.ds_access_log.get_result(conn, op)
+        if result_line is not None:
+            result_line = [result_line]
+        else:
+            result_line = inst.ds_access_log.match_archive(
+                '.*conn=%s op=%s RESULT.*' % (conn, op))
 
         if result_line:
             vals = inst.ds_access_log.parse_line(result_line[0])
@@ -9,10 +9,12 @@
 import ldap
 import time
 import os
+import threading
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 
 from lib389 import NoSuchEntryError
-from lib389.agreement import Agreement
+from lib389.agreement import Agreement, ConsumerRUVCache
 from lib389._constants import *
 from lib389.properties import *
 from lib389 import DirSrv, Entry
@@ -357,6 +359,36 @@ def test_changes(topology):
     assert (value + 1) == newvalue
 
 
+def test_consumer_ruv_cache():
+    """Check the RUV of a consumer is read once, even by several threads at
+    the same time, and that its errors are shared too"""
+
+    ruvs = ConsumerRUVCache()
+    reads = []
+    started = threading.Event()
+
+    def read():
+        reads.append(1)
+        started.wait(5)
+        return ['{replica 1 ldap://host:389} 5f000000000000010000 5f000001000000010000']
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(ruvs.get, ('host', '389', 'dc=example,dc=com'), read) for _ in range(8)]
+        started.set()
+        results = [future.result() for future in futures]
+    assert len(reads) == 1
+    assert all(result == results[0] for result in results)
+
+    def fail():
+        reads.append(1)
+        raise ldap.INVALID_CREDENTIALS()
+
+    for _ in range(2):
+        with pytest.raises(ldap.INVALID_CREDENTIALS):
+            ruvs.get(('other', '389', 'dc=example,dc=com'), fail)
+    assert len(reads) == 2
+
+
 if __name__ == "__main__":
     CURRENT_FILE = os.path.realpath(__file__)
     pytest.main("-s -v %s" % CURRENT_FILE)
@@ -0,0 +1,48 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+#
+import asyncio
+import ldap
+import pytest
+from lib389.topologies import topology_st
+from lib389.aio import AsyncConnection
+from lib389.idm.group import Group, Groups
+from lib389._constants import DEFAULT_SUFFIX
+
+
+def test_aio(topology_st):
+    """Check concurrent creates, reads, modifies and deletes on one connection"""
+
+    async def scenario():
+        async with await AsyncConnection.connect(topology_st.standalone, max_inflight=16) as conn:
+            groups = conn.objects(Groups, DEFAULT_SUFFIX)
+            created = await asyncio.gather(*[groups.create(properties={'cn': 'MyAioGroup%d' % i})
+                                             for i in range(50)])
+            assert len(await groups.filter('(cn=MyAioGroup*)')) == 50
+
+            await asyncio.gather(*[g.replace('description', 'aio') for g in created])
+            group = await groups.get('MyAioGroup7')
+            assert await group.get_attr_val_utf8('description') == 'aio'
+            assert await group.present('cn', 'myaiogroup7')
+            assert not await group.present('cn', 'other')
+
+            missing = conn.object(Group, dn='cn=missing,ou=groups,' + DEFAULT_SUFFIX)
+            assert not await missing.exists()
+            with pytest.raises(ldap.NO_SUCH_OBJECT):
+                await missing.get_attr_val_utf8('cn')
+
+            # The suffix exists, but it is not a group
+            suffix = conn.object(Group, dn=DEFAULT_SUFFIX)
+            assert not await suffix.exists()
+            with pytest.raises(ldap.NO_SUCH_OBJECT):
+                await suffix.get_attr_val_utf8('cn')
+
+            await asyncio.gather(*[g.delete() for g in created])
+            assert await groups.filter('(cn=MyAioGroup*)') == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,80 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+#
+import os
+import subprocess
+import sys
+import pytest
+from lib389 import DirSrv
+
+CLI_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'cli')
+
+
+def _imported_modules(args):
+    """Run python -X importtime with args, and return the imported modules
+    with their cumulative import time in microseconds"""
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        # Skip the header, and any output of the command
+        if line.startswith('import time:') and len(fields) == 3 and fields[1].strip().isdigit():
+            modules[fields[2].strip()] = int(fields[1])
+    return modules
+
+
+def test_import_lib389():
+    """Check importing lib389 doesn't import the managers, nor
+    pkg_resources"""
+
+    modules = _imported_modules(['-c', 'import lib389'])
+    assert 'lib389' in modules
+    for module in ('pkg_resources', 'lib389.agreement', 'lib389.config', 'lib389.monitor', 'lib389.replica'):
+        assert module not in modules
+
+
+@pytest.mark.parametrize('tool, args, module, others', [
+    ('dsconf', ['localhost', 'backend', '--help'], 'lib389.cli_conf.backend',
+     ['lib389.cli_conf.plugin', 'lib389.cli_conf.replication', 'lib389.cli_conf.security']),
+    ('dsidm', ['localhost', 'user', '--help'], 'lib389.cli_idm.user',
+     ['lib389.cli_idm.account', 'lib389.cli_idm.group', 'lib389.cli_idm.role']),
+    ('dsctl', ['localhost', 'status', '--help'], 'lib389.cli_ctl.instance',
+     ['lib389.cli_ctl.dbgen', 'lib389.cli_ctl.health', 'lib389.cli_ctl.logs']),
+])
+def test_cli_startup(tool, args, module, others):
+    """Check a tool only imports the CLI module of its subcommand"""
+
+    path = os.path.join(CLI_DIR, tool)
+    if not os.path.exists(path):
+        pytest.skip('%s is not in the source tree' % tool)
+    modules = _imported_modules([path] + args)
+    assert module in modules
+    for other in others + ['pkg_resources']:
+        assert other not in modules
+
+
+def test_cli_help():
+    """Check the help of a tool still lists all its subcommands"""
+
+    path = os.path.join(CLI_DIR, 'dsconf')
+    if not os.path.exists(path):
+        pytest.skip('dsconf is not in the source tree')
+    output = subprocess.run([sys.executable, path, 'localhost', '--help'], stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    for command in ('backend', 'plugin', 'replication', 'repl-agmt', 'security'):
+        assert command in output
+
+
+def test_brokers():
+    """Check the managers of an instance only exist once it's open"""
+
+    inst = DirSrv()
+    with pytest.raises(AttributeError):
+        inst.config
+    assert not hasattr(inst, 'backends')
@@ -9,7 +9,12 @@
 from lib389._constants import *
 from lib389.utils import ensure_bytes, ensure_str
 from lib389 import DirSrv, Entry
+from lib389.cli_ctl.logs import _parse_time
+from lib389.dirsrv_log import (AccessLogIndex, DirsrvAccessLog, parse_access_line, parse_log_timestamp,
+                               seek_log, seek_log_time)
 import pytest
+import gzip
+import random
 import time
 import shutil
 import datetime
@@ -74,7 +79,7 @@ def test_access_log(topology):
         topology.standalone.ds_access_log.parse_line('[27/Apr/2016:12:49:49.726093186 +1000] conn=1 fd=64 slot=64 connection from ::1 to ::1') ==
         {
             'slot': '64', 'remote': '::1', 'action': 'CONNECT', 'timestamp': '[27/Apr/2016:12:49:49.726093186 +1000]', 'fd': '64', 'conn': '1', 'local': '::1',
-            'datetime': datetime.datetime(2016, 4, 27, 12, 0, 0, 726093, tzinfo=tzoffset(None, 36000))
+            'datetime': datetime.datetime(2016, 4, 27, 12, 49, 49, 726093, tzinfo=tzoffset(None, 36000))
         }
     )
     assert(
@@ -82,21 +87,21 @@ def test_access_log(topology):
         {
             'rem': 'base="cn=config" scope=0 filter="(objectClass=*)" attrs="nsslapd-instancedir nsslapd-errorlog nsslapd-accesslog nsslapd-auditlog nsslapd-certdir nsslapd-schemadir nsslapd-bakdir nsslapd-ldifdir"',  # noqa
             'action': 'SRCH', 'timestamp': '[27/Apr/2016:12:49:49.727235997 +1000]', 'conn': '1', 'op': '2',
-            'datetime': datetime.datetime(2016, 4, 27, 12, 0, 0, 727235, tzinfo=tzoffset(None, 36000))
+            'datetime': datetime.datetime(2016, 4, 27, 12, 49, 49, 727235, tzinfo=tzoffset(None, 36000))
         }
     )
     assert(
         topology.standalone.ds_access_log.parse_line('[27/Apr/2016:12:49:49.736297002 +1000] conn=1 op=4 fd=64 closed - U1') ==
         {
             'status': 'U1', 'fd': '64', 'action': 'DISCONNECT', 'timestamp': '[27/Apr/2016:12:49:49.736297002 +1000]', 'conn': '1', 'op': '4',
-            'datetime': datetime.datetime(2016, 4, 27, 12, 0, 0, 736297, tzinfo=tzoffset(None, 36000))
+            'datetime': datetime.datetime(2016, 4, 27, 12, 49, 49, 736297, tzinfo=tzoffset(None, 36000))
         }
     )
     assert(
         topology.standalone.ds_access_log.parse_line('[27/Apr/2016:12:49:49.736297002 -1000] conn=1 op=4 fd=64 closed - U1') ==
         {
             'status': 'U1', 'fd': '64', 'action': 'DISCONNECT', 'timestamp': '[27/Apr/2016:12:49:49.736297002 -1000]', 'conn': '1', 'op': '4',
-            'datetime': datetime.datetime(2016, 4, 27, 12, 0, 0, 736297, tzinfo=tzoffset(None, -36000))
+            'datetime': datetime.datetime(2016, 4, 27, 12, 49, 49, 736297, tzinfo=tzoffset(None, -36000))
         }
     )
 
@@ -113,11 +118,215 @@ def test_error_log(topology):
         topology.standalone.ds_error_log.parse_line('[27/Apr/2016:13:46:35.775670167 +1000] slapd started.  Listening on All Interfaces port 54321 for LDAP requests') ==  # noqa
         {
             'timestamp': '[27/Apr/2016:13:46:35.775670167 +1000]', 'message': 'slapd started.  Listening on All Interfaces port 54321 for LDAP requests',
-            'datetime': datetime.datetime(2016, 4, 27, 13, 0, 0, 775670, tzinfo=tzoffset(None, 36000))
+            'datetime': datetime.datetime(2016, 4, 27, 13, 46, 35, 775670, tzinfo=tzoffset(None, 36000))
         }
     )
 
 
+def test_parse_log_timestamp():
+    """Check timestamps are decoded without a running instance"""
+    assert(parse_log_timestamp('[10/Sep/2020:08:01:02.000123456 +0000]') ==
+           datetime.datetime(2020, 9, 10, 8, 1, 2, 123, tzinfo=tzoffset(None, 0)))
+    assert(parse_log_timestamp('[10/Oct/2020:08:01:02 -0130]') ==
+           datetime.datetime(2020, 10, 10, 8, 1, 2, tzinfo=tzoffset(None, -5400)))
+
+
+def test_parse_time():
+    """Check the times of the logs commands, a timestamp without a timezone
+    is local time
+    """
+    assert(_parse_time(None) is None)
+    assert(_parse_time('27/Apr/2016:10:02:00') == datetime.datetime(2016, 4, 27, 10, 2, 0).astimezone())
+    assert(_parse_time('[27/Apr/2016:10:02:00 +1000]') ==
+           datetime.datetime(2016, 4, 27, 10, 2, 0, tzinfo=tzoffset(None, 36000)))
+    assert(_parse_time('2016-04-27T10:02:00') == datetime.datetime(2016, 4, 27, 10, 2, 0))
+    with pytest.raises(ValueError):
+        _parse_time('not a time')
+
+
+def test_parse_access_line():
+    """Check the single pass tokenizer"""
+    record = parse_access_line('[27/Apr/2016:12:49:49.727235997 +1000] conn=1 op=2 RESULT err=0 tag=101 nentries=1 wtime=0.000090 optime=0.000106 etime=0.000195 notes=U,P\n')
+    assert(record.action == 'RESULT')
+    assert((record.conn, record.op, record.err, record.tag) == ('1', '2', '0', '101'))
+    assert((record.nentries, record.etime, record.notes) == ('1', '0.000195', 'U,P'))
+    assert(record.csn is None)
+    record = parse_access_line('[27/Apr/2016:12:49:49.727235997 +1000] conn=5 op=3 UNBIND\n')
+    assert((record.action, record.rem) == ('UNBIND', ''))
+    record = parse_access_line('[27/Apr/2016:12:49:49.726093186 +1000] conn=1 fd=64 slot=64 SSL connection from 10.0.0.1 to 10.0.0.2')
+    assert((record.action, record.remote, record.local) == ('CONNECT', '10.0.0.1', '10.0.0.2'))
+    assert(parse_access_line('[27/Apr/2016:12:49:49.726093186 +1000] not a connection line') is None)
+
+
+def test_access_log_index(tmpdir):
+    """Check the (conn, op) index is persisted and extended as the log grows"""
+    lpath = str(tmpdir.join('access'))
+    lines = [
+        '[27/Apr/2016:12:49:49.727235997 +1000] conn=1 op=2 SRCH base="cn=config" scope=0 filter="(cn=a)" attrs=ALL\n',
+        '[27/Apr/2016:12:49:49.728235997 +1000] conn=1 op=2 RESULT err=0 tag=101 nentries=1 etime=0.1 notes=A\n',
+        '[27/Apr/2016:12:49:49.736297002 +1000] conn=1 op=3 fd=64 closed - U1\n',
+        '[27/Apr/2016:12:59:49.727235997 +1000] conn=1 op=2 SRCH base="cn=config" scope=0 filter="(cn=b)" attrs=ALL\n',
+        '[27/Apr/2016:12:59:49.728235997 +1000] conn=1 op=2 RESULT err=0 tag=101 nentries=1 etime=0.1\n',
+    ]
+    with open(lpath, 'w') as f:
+        f.writelines(lines[:3])
+    index = AccessLogIndex(lpath).build()
+    assert(os.path.exists(str(tmpdir.join('.access.idx'))))
+    assert(index.get_request(1, 2) == lines[0])
+    assert(index.get_result(1, 2) == lines[1])
+    assert(index.get_request(1, 3) is None)
+
+    with open(lpath, 'a') as f:
+        f.writelines(lines[3:])
+    # A fresh object reuses the persisted index and only scans the new lines
+    index = AccessLogIndex(lpath).build()
+    assert(index.get_request(1, 2) == lines[3])
+    second_result = index.result_offset(1, 2, after=index.request_offset(1, 2))
+    assert(index.read_line(second_result) == lines[4])
+    assert(index.get_request(1, 2, before=index.result_offset(1, 2)) == lines[0])
+
+
+def test_access_log_index_sort_vlv(tmpdir):
+    """Check the SORT and VLV lines of a search do not hide its SRCH line"""
+    lpath = str(tmpdir.join('access'))
+    lines = [
+        '[27/Apr/2016:12:49:49.727235997 +1000] conn=1 op=1 SRCH base="dc=example,dc=com" scope=2 filter="(uid=*)" attrs=ALL\n',
+        '[27/Apr/2016:12:49:49.727335997 +1000] conn=1 op=1 SORT uid (10)\n',
+        '[27/Apr/2016:12:49:49.727435997 +1000] conn=1 op=1 VLV 0:5:0:0 1:10 (0)\n',
+        '[27/Apr/2016:12:49:49.728235997 +1000] conn=1 op=1 RESULT err=0 tag=101 nentries=6 etime=0.1 notes=A\n',
+    ]
+    with open(lpath, 'w') as f:
+        f.writelines(lines)
+    index = AccessLogIndex(lpath).build()
+    assert(index.get_request('1', '1', before=index.result_offset('1', '1')) == lines[0])
+    assert(index.get_result('1', '1') == lines[3])
+
+
+@pytest.fixture
+def offline_access_log(tmpdir):
+    """A DirsrvAccessLog reading logs from tmpdir, without an instance"""
+    class FakePaths(object):
+        access_log = str(tmpdir.join('access'))
+
+    class FakeDirSrv(object):
+        verbose = False
+        log = None
+        ds_paths = FakePaths()
+
+    return DirsrvAccessLog(FakeDirSrv())
+
+
+def test_access_log_follow(tmpdir, offline_access_log):
+    """Check the incremental reader only returns new records, and survives rotation"""
+    line = '[27/Apr/2016:12:49:49.727235997 +1000] conn={} op=1 UNBIND\n'
+    lpath = offline_access_log._get_log_path()
+    checkpoint = str(tmpdir.join('checkpoint'))
+    access_log = offline_access_log
+    with open(lpath, 'w') as f:
+        f.write(line.format(1))
+    assert([r.conn for r in access_log.follow(checkpoint, from_start=True).read()] == ['1'])
+
+    # A partially written line is held back until it is complete
+    with open(lpath, 'a') as f:
+        f.write(line.format(2) + line.format(3)[:20])
+    assert([r.conn for r in access_log.follow(checkpoint).read()] == ['2'])
+
+    with open(lpath, 'a') as f:
+        f.write(line.format(3)[20:])
+    shutil.move(lpath, lpath + '.20160427-125000')
+    with open(lpath, 'w') as f:
+        f.write(line.format(4))
+    assert([r.conn for r in access_log.follow(checkpoint).read()] == ['3', '4'])
+    assert([r.conn for r in access_log.follow(checkpoint).read()] == [])
+
+
+def test_access_log_search_archive(offline_access_log):
+    """Check compressed archives are searched, in order, and pruned by time"""
+    line = '[27/Apr/2016:{:02d}:00:00.000000000 +0000] conn={} op=1 UNBIND\n'
+    lpath = offline_access_log._get_log_path()
+    with gzip.open(lpath + '.20160427-100000.gz', 'wt') as f:
+        f.write(line.format(10, 1) + line.format(10, 2))
+    with open(lpath + '.20160427-110000', 'w') as f:
+        f.write(line.format(11, 3) + line.format(11, 4))
+    with open(lpath, 'w') as f:
+        f.write(line.format(12, 5))
+
+    assert(len(offline_access_log.readlines_archive()) == 5)
+    assert(offline_access_log.match_archive('.*conn=[24] ') == [line.format(10, 2), line.format(11, 4)])
+    assert(offline_access_log.search_archive('.*UNBIND', jobs=2) ==
+           [line.format(10, 1), line.format(10, 2), line.format(11, 3), line.format(11, 4), line.format(12, 5)])
+    start = datetime.datetime(2016, 4, 27, 11, 0, 0, tzinfo=tzoffset(None, 0))
+    end = datetime.datetime(2016, 4, 27, 11, 30, 0, tzinfo=tzoffset(None, 0))
+    paths = offline_access_log._prune_log_paths(offline_access_log._get_all_log_paths_sorted(), start, end)
+    assert(paths == [lpath + '.20160427-100000.gz', lpath + '.20160427-110000'])
+    assert(offline_access_log.search_archive('.*', start=start, end=end, jobs=2) == [line.format(11, 3), line.format(11, 4)])
+    # Naive datetimes are local time
+    assert(offline_access_log.search_archive('.*', start=start.astimezone().replace(tzinfo=None),
+                                             end=end.astimezone().replace(tzinfo=None)) ==
+           [line.format(11, 3), line.format(11, 4)])
+
+
+def test_seek_log(tmpdir):
+    """Check the binary search finds the same window as a linear scan"""
+    path = str(tmpdir.join('errors'))
+    base = datetime.datetime(2016, 4, 27, 10, 0, 0, tzinfo=tzoffset(None, 36000))
+    rand = random.Random(389)
+    lines = []
+    for i in range(2000):
+        # Several lines per second, and multi line messages
+        when = base + datetime.timedelta(seconds=i // 3)
+        lines.append('[{}.{:09d} +1000] - ERR - plugin - message {}\n'.format(
+                     when.strftime('%d/%b/%Y:%H:%M:%S'), i, i))
+        if rand.random() < 0.1:
+            lines.append('    continued {}\n'.format(i))
+    with open(path, 'w') as f:
+        f.writelines(lines)
+    with gzip.open(path + '.gz', 'wt') as f:
+        f.writelines(lines)
+
+    def linear(start, end):
+        found = []
+        inside = False
+        for line in lines:
+            if line.startswith('['):
+                dt = parse_log_timestamp(line[:line.find(']') + 1])
+                inside = start <= dt <= end
+            if inside:
+                found.append(line)
+        return found
+
+    for _ in range(50):
+        start = base + datetime.timedelta(seconds=rand.randint(-10, 700))
+        end = start + datetime.timedelta(seconds=rand.randint(0, 60))
+        expected = linear(start, end)
+        assert(list(seek_log(path, start, end)) == expected)
+        assert(list(seek_log(path + '.gz', start, end)) == expected)
+
+    with open(path, 'rb') as lf:
+        assert(seek_log_time(lf, base - datetime.timedelta(days=1)) == 0)
+        assert(seek_log_time(lf, base + datetime.timedelta(days=1)) == os.path.getsize(path))
+    assert(list(seek_log(path)) == lines)
+
+
+def test_access_log_seek(offline_access_log):
+    """Check a time window is read across rotated logs"""
+    line = '[27/Apr/2016:{:02d}:{:02d}:00.000000000 +0000] conn={} op=1 UNBIND\n'
+    lpath = offline_access_log._get_log_path()
+    with gzip.open(lpath + '.20160427-100000.gz', 'wt') as f:
+        f.write(line.format(10, 0, 1) + line.format(10, 50, 2))
+    with open(lpath + '.20160427-110000', 'w') as f:
+        f.write(line.format(11, 0, 3) + line.format(11, 10, 4) + line.format(11, 20, 5))
+    with open(lpath, 'w') as f:
+        f.write(line.format(12, 0, 6))
+
+    start = datetime.datetime(2016, 4, 27, 10, 30, 0, tzinfo=tzoffset(None, 0))
+    end = datetime.datetime(2016, 4, 27, 11, 15, 0, tzinfo=tzoffset(None, 0))
+    assert(list(offline_access_log.seek(start, end, archive=True)) ==
+           [line.format(10, 50, 2), line.format(11, 0, 3), line.format(11, 10, 4)])
+    assert(list(offline_access_log.seek(start, end)) == [])
+    assert(list(offline_access_log.seek(end)) == [line.format(12, 0, 6)])
+
+
 if __name__ == "__main__":
     CURRENT_FILE = os.path.realpath(__file__)
     pytest.main("-s -vv %s" % CURRENT_FILE)
@@ -12,7 +12,8 @@ import logging
 import pytest
 from lib389._constants import *
 from lib389.properties import *
-from lib389 import DirSrv, Entry
+import warnings
+from lib389 import DirSrv, Entry, wrapper
 
 logging.getLogger(__name__).setLevel(logging.DEBUG)
 log = logging.getLogger(__name__)
@@ -209,6 +210,37 @@ def test_delete(topology):
     with pytest.raises(Exception):
         _add_user(topology)
 
+def test_method_dispatch():
+    """Test the wrapping of the SimpleLDAPObject methods
+    Check the per operation methods only drop escapehatch
+    Check an Entry is converted, keeping the controls
+    Check the deprecated methods warn without escapehatch
+    """
+
+    instance = DirSrv(verbose=False)
+    for name in ('search_ext', 'search_ext_s', 'result3', 'result4', 'set_option'):
+        assert name in vars(instance)
+
+    def f(*args, **kwargs):
+        return args, kwargs
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert wrapper(f, 'search_ext')(TEST_DN, serverctrls=['ctrl'], escapehatch='i am sure') == \
+            ((TEST_DN,), {'serverctrls': ['ctrl']})
+        assert wrapper(f, 'result4')(1) == ((1,), {})
+
+    ent = Entry((TEST_DN, {'uid': [b'test']}))
+    args, kwargs = wrapper(f, 'add_ext_s')(ent, ['ctrl'], clientctrls=['cctrl'], escapehatch='i am sure')
+    assert args == (TEST_DN, ent.toTupleList(), ['ctrl'])
+    assert kwargs == {'clientctrls': ['cctrl']}
+
+    with pytest.warns(DeprecationWarning):
+        wrapper(f, 'search_s')(TEST_DN)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert wrapper(f, 'search_s')(TEST_DN, escapehatch='i am sure') == ((TEST_DN,), {})
+
 
 if __name__ == "__main__":
     CURRENT_FILE = os.path.realpath(__file__)
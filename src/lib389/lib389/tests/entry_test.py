@@ -8,6 +8,7 @@
 #
 import os
 from lib389 import Entry
+from lib389._entry import CompactEntry
 import lib389
 import pytest
 
@@ -93,6 +94,48 @@ class TestEntry(object):
             uentry, entry)
 
 
+class TestCompactEntry(object):
+    """A CompactEntry reads like the Entry of the same result"""
+
+    raw = ('uid=pippo,dc=example,dc=com', {
+        'objectClass': [b'top', b'person'],
+        'uid': [b'pippo'],
+        'CN': [b'Pippo', b'Goofy'],
+    })
+
+    def test_read(self):
+        e = CompactEntry(self.raw)
+        assert e.dn == 'uid=pippo,dc=example,dc=com'
+        assert e.getValue('cn') == b'Pippo'
+        assert e.getValues('Cn') == [b'Pippo', b'Goofy']
+        assert e.getValueUtf8('UID') == 'pippo'
+        assert e.getValuesUtf8('objectclass') == ['top', 'person']
+        assert e.getValue('sn') is None
+        assert e.getValues('sn') == []
+        assert e.hasAttr('OBJECTCLASS')
+        assert not e.hasAttr('sn')
+        assert e.hasValue('uid', 'pippo')
+        assert e.hasValueCase('cn', b'goofy')
+        assert e.uid == b'pippo'
+        assert e['cn'] == b'Pippo'
+        assert sorted(e.getAttrs()) == ['CN', 'objectClass', 'uid']
+        assert e.getValuesSet(['uid', 'sn']) == {'uid': [b'pippo'], 'sn': []}
+
+    def test_like_entry(self):
+        e = CompactEntry(self.raw)
+        entry = Entry(self.raw)
+        assert e == entry
+        assert e.to_entry() == entry
+        assert str(e) == str(entry)
+        assert dict(e.data) == dict(entry.data)
+
+    def test_reference(self):
+        e = CompactEntry((None, ['ldap://other/dc=example,dc=com']))
+        assert e.dn is None
+        assert not e
+        assert e.getref() == ['ldap://other/dc=example,dc=com']
+
+
 if __name__ == "__main__":
     CURRENT_FILE = os.path.realpath(__file__)
     pytest.main("-s -v %s" % CURRENT_FILE)
@@ -79,6 +79,19 @@ def test_users_and_groups(topology):
     # check they are not a member
     assert(not group.is_member(testuser.dn))
 
+    # check many members at once, with one search and the compares of the
+    # matching batch in flight together. DNs in another form still match
+    others = ['uid=other%d,ou=people,%s' % (i, DEFAULT_SUFFIX) for i in range(3)]
+    group.ensure_members([testuser.dn] + others[:2])
+    round_trips = group.round_trips
+    assert(group.members_present([testuser.dn.upper()] + others) ==
+           {testuser.dn.upper(): True, others[0]: True, others[1]: True, others[2]: False})
+    assert(group.round_trips == round_trips + 2)
+    round_trips = group.round_trips
+    assert(all(group.members_present([testuser.dn] + others[:2]).values()))
+    assert(group.round_trips - round_trips < 3)
+    assert(group.present('member', others[1].replace(',', ', ')))
+
     group.delete()
     testuser.delete()
 
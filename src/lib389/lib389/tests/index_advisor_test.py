@@ -0,0 +1,153 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+#
+import os
+import pytest
+from lib389.dseldif import DSEldif
+from lib389.index_advisor import (IndexAdvisor, UnindexedSearchStats, filter_fingerprint,
+                                  missing_indexes, parse_filter)
+from lib389.logconv import AccessLogAnalyzer
+
+LOG_LINES = [
+    '[27/Apr/2016:12:49:49.100000000 +1000] conn=1 op=1 SRCH base="ou=People,dc=example,dc=com" scope=2 '
+    'filter="(&(objectClass=person)(mail=alice@example.com))" attrs=ALL\n',
+    '[27/Apr/2016:12:49:49.200000000 +1000] conn=1 op=1 RESULT err=0 tag=101 nentries=1 etime=2.000000 notes=A\n',
+    '[27/Apr/2016:12:49:50.100000000 +1000] conn=1 op=2 SRCH base="ou=people,dc=example,dc=com" scope=2 '
+    'filter="(&(mail=bob@example.com)(objectclass=Person))" attrs=ALL\n',
+    '[27/Apr/2016:12:49:50.200000000 +1000] conn=1 op=2 RESULT err=0 tag=101 nentries=1 etime=1.000000 notes=A\n',
+    '[27/Apr/2016:12:49:51.100000000 +1000] conn=2 op=1 SRCH base="dc=example,dc=com" scope=2 '
+    'filter="(|(cn=*bob*)(uid=bob))" attrs=ALL\n',
+    '[27/Apr/2016:12:49:51.200000000 +1000] conn=2 op=1 RESULT err=0 tag=101 nentries=4 etime=0.500000 notes=U\n',
+    '[27/Apr/2016:12:49:52.100000000 +1000] conn=2 op=2 SRCH base="dc=example,dc=com" scope=2 '
+    'filter="(uid=carol)" attrs=ALL\n',
+    '[27/Apr/2016:12:49:52.200000000 +1000] conn=2 op=2 RESULT err=0 tag=101 nentries=1 etime=0.000100\n',
+    '[27/Apr/2016:12:49:53.100000000 +1000] conn=2 op=3 SRCH base="o=other" scope=2 '
+    'filter="(!(uid=carol))" attrs=ALL\n',
+    '[27/Apr/2016:12:49:53.200000000 +1000] conn=2 op=3 RESULT err=0 tag=101 nentries=9 etime=0.300000 notes=A\n',
+]
+
+BACKENDS = {
+    'userroot': {'suffix': 'dc=example,dc=com', 'indexes': {'objectclass': {'eq'}, 'uid': {'eq'}, 'cn': {'eq', 'pres'}}},
+    'other': {'suffix': 'o=other', 'indexes': {'objectclass': {'eq'}}},
+}
+
+
+def test_filter_fingerprint():
+    """Check values are stripped and AND/OR components sorted"""
+    assert filter_fingerprint('(&(objectClass=inetOrgPerson)(|(uid=bob)(mail=b*@example.com))(!(cn>=a)))') == \
+        '(&(!(cn>=?))(objectclass=inetorgperson)(|(mail=?*?)(uid=?)))'
+    assert filter_fingerprint('(&(MAIL=x)(objectclass=Person))') == filter_fingerprint('(&(objectClass=person)(mail=y))')
+    assert filter_fingerprint('(cn=*)') == '(cn=*)'
+    assert filter_fingerprint('(cn=*a*b)') == '(cn=*?*?)'
+    assert filter_fingerprint('(cn;lang-fr~=x)') == '(cn~=?)'
+    assert filter_fingerprint('(cn:caseExactMatch:=x)') == '(cn:caseexactmatch:=?)'
+    assert filter_fingerprint('uid=a=b') == '(uid=?)'
+    for broken in ('(uid=a', '(&(uid=a)', '(uid=a))', '(=a)', '(!(a=b)(c=d))'):
+        with pytest.raises(ValueError):
+            parse_filter(broken)
+
+
+def test_missing_indexes():
+    indexes = BACKENDS['userroot']['indexes']
+    # Any indexed component of an AND makes it indexed, but not objectclass
+    assert missing_indexes('(&(objectclass=person)(uid=*))', indexes) == {('uid', 'pres')}
+    assert missing_indexes('(&(cn=x)(mail=y))', indexes) == frozenset()
+    # Equality is preferred to substring when there is a choice
+    assert missing_indexes('(&(cn=*x*)(mail=y))', indexes) == {('mail', 'eq')}
+    # Every branch of an OR must be indexed
+    assert missing_indexes('(|(cn=*x*)(mail=y)(uid=z))', indexes) == {('cn', 'sub'), ('mail', 'eq')}
+    assert missing_indexes('(|(mail=y)(!(uid=z)))', indexes) is None
+    assert missing_indexes('(objectclass=person)', indexes) is None
+
+
+def test_unindexed_search_stats():
+    stats = UnindexedSearchStats()
+    for line in LOG_LINES:
+        stats.feed(line)
+    report = stats.to_dict()
+    assert [(s['base'], s['filter'], s['count']) for s in report['searches']] == [
+        ('ou=people,dc=example,dc=com', '(&(mail=?)(objectclass=person))', 2),
+        ('o=other', '(!(uid=?))', 1),
+        ('dc=example,dc=com', '(|(cn=*?*)(uid=?))', 1),
+    ]
+    assert report['searches'][0]['etime'] == 3.0
+    assert report['searches'][0]['fully_unindexed'] == 2
+    # count x etime x nentries
+    assert report['searches'][1]['cost'] == pytest.approx(2.7)
+
+
+@pytest.mark.parametrize('jobs, shard_size', [(1, 1024 * 1024), (2, 1)])
+def test_unindexed_search_stats_shards(tmpdir, jobs, shard_size):
+    """Check a search and its result in different shards are still matched"""
+    path = os.path.join(str(tmpdir), 'access')
+    with open(path, 'w') as f:
+        f.writelines(LOG_LINES)
+    expected = UnindexedSearchStats()
+    for line in LOG_LINES:
+        expected.feed(line)
+    analyzer = AccessLogAnalyzer(None, jobs=jobs, shard_size=shard_size, factory=UnindexedSearchStats)
+    assert analyzer.analyze(paths=[path]).to_dict() == expected.to_dict()
+
+
+def test_index_advisor():
+    stats = UnindexedSearchStats()
+    for line in LOG_LINES:
+        stats.feed(line)
+    advice = IndexAdvisor(BACKENDS).advise(stats)
+    suggestions = [(s['backend'], s['attribute'], s['types'], s['existing']) for s in advice['suggestions']]
+    assert suggestions == [
+        ('userroot', 'mail', ['eq'], []),
+        ('userroot', 'cn', ['sub'], ['eq', 'pres']),
+    ]
+    mail = advice['suggestions'][0]
+    assert mail['searches'] == 2
+    assert mail['benefit']['etime_saved'] == 3.0
+    assert mail['benefit']['percent'] == pytest.approx(3.0 / 3.8 * 100)
+    assert mail['plan'] == "Backends(inst).get('userroot').add_index('mail', ['eq'], reindex=True)"
+    assert advice['suggestions'][1]['plan'].startswith(
+        "Backends(inst).get('userroot').get_index('cn').add('nsIndexType', ['sub'])")
+    assert [s['filter'] for s in advice['unresolved']] == ['(!(uid=?))']
+
+
+DSE_LDIF = """dn: cn=userRoot,cn=ldbm database,cn=plugins,cn=config
+objectClass: nsBackendInstance
+cn: userRoot
+nsslapd-suffix: dc=Example,dc=COM
+
+dn: cn=givenName,cn=index,cn=userRoot,cn=ldbm database,cn=plugins,cn=config
+cn: givenName
+nsIndexType: eq
+nsIndexType: pres
+nsIndexType: sub
+
+dn: cn=
+ telephoneNumber,cn=index,cn=UserRoot,cn=ldbm database,cn=plugins,cn=config
+cn: telephoneNumber
+nsIndexType: eq
+
+"""
+
+
+def test_index_advisor_dse_ldif(tmpdir, monkeypatch):
+    """Check the index and backend names of dse.ldif are matched whatever
+    their case
+    """
+    config_dir = tmpdir.mkdir('etc').mkdir('dirsrv').mkdir('slapd-standalone1')
+    config_dir.join('dse.ldif').write(DSE_LDIF)
+    monkeypatch.setenv('PREFIX', str(tmpdir))
+    backends = DSEldif(None, serverid='standalone1').get_backend_indexes()
+    assert backends == {'userroot': {'suffix': 'dc=example,dc=com',
+                                     'indexes': {'givenname': {'eq', 'pres', 'sub'}, 'telephonenumber': {'eq'}}}}
+
+    stats = UnindexedSearchStats()
+    stats.feed('[27/Apr/2016:12:49:49.100000000 +1000] conn=1 op=1 SRCH base="dc=example,dc=com" scope=2 '
+               'filter="(|(givenName=bob)(telephoneNumber=1234)(mail=bob@example.com))" attrs=ALL\n')
+    stats.feed('[27/Apr/2016:12:49:49.200000000 +1000] conn=1 op=1 RESULT err=0 tag=101 nentries=1 '
+               'etime=2.000000 notes=A\n')
+    advice = IndexAdvisor(backends).advise(stats)
+    assert [(s['backend'], s['attribute'], s['types']) for s in advice['suggestions']] == [('userroot', 'mail', ['eq'])]
@@ -0,0 +1,76 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+#
+import random
+import pytest
+from lib389.latency import LatencyAggregator, LatencyHistogram, filter_shape
+
+LOG_LINES = [
+    '[27/Apr/2016:12:49:49.000000000 +1000] conn=1 fd=64 slot=64 connection from 10.0.0.1 to 10.0.0.2\n',
+    '[27/Apr/2016:12:49:49.100000000 +1000] conn=1 op=1 SRCH base="dc=example,dc=com" scope=2 filter="(uid=alice)" attrs=ALL\n',
+    '[27/Apr/2016:12:49:49.200000000 +1000] conn=1 op=1 RESULT err=0 tag=101 nentries=1 etime=0.010000\n',
+    '[27/Apr/2016:12:49:59.100000000 +1000] conn=1 op=2 SRCH base="DC=example,dc=com" scope=2 filter="(uid=bob)" attrs=ALL\n',
+    '[27/Apr/2016:12:49:59.200000000 +1000] conn=1 op=2 RESULT err=0 tag=101 nentries=1 etime=0.030000\n',
+    '[27/Apr/2016:12:50:01.100000000 +1000] conn=1 op=3 MOD dn="uid=bob,dc=example,dc=com"\n',
+    '[27/Apr/2016:12:50:01.200000000 +1000] conn=1 op=3 RESULT err=0 tag=103 nentries=0 etime=0.500000\n',
+    '[27/Apr/2016:12:50:02.000000000 +1000] conn=1 op=4 fd=64 closed - U1\n',
+    '[27/Apr/2016:12:50:03.000000000 +1000] conn=9 op=7 RESULT err=0 tag=107 nentries=0 etime=0.200000\n',
+]
+
+
+def test_filter_shape():
+    assert filter_shape('(&(objectClass=inetOrgPerson)(|(uid=bob)(mail=b*@example.com))(!(cn>=a)))') == \
+        '(&(!(cn>=?))(objectclass=inetorgperson)(|(mail=?*?)(uid=?)))'
+    # Presence and substring searches need different indexes
+    assert filter_shape('(cn=*)') != filter_shape('(cn=*bob*)')
+    assert filter_shape('(cn=bob') == '(cn=bob'
+
+
+def test_histogram_percentiles():
+    """Check percentiles stay within the precision, and merging matches a single pass"""
+    rand = random.Random(389)
+    values = [rand.expovariate(100) for _ in range(20000)]
+    whole = LatencyHistogram()
+    left = LatencyHistogram()
+    right = LatencyHistogram()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+    left.merge(right)
+    values.sort()
+    for pct in (50, 95, 99, 99.9):
+        exact = values[int(pct / 100.0 * len(values)) - 1]
+        assert whole.percentile(pct) == pytest.approx(exact, rel=0.03)
+        assert left.percentile(pct) == whole.percentile(pct)
+    assert whole.count == left.count == len(values)
+    # Memory is bounded by the range of the values, not their number
+    assert len(whole.buckets) < 1000
+
+
+def test_latency_aggregator():
+    aggregator = LatencyAggregator()
+    for line in LOG_LINES:
+        aggregator.feed(line)
+    report = aggregator.to_dict(top=5)
+    assert report['overall']['count'] == 4
+    ops = {d['key']: d['count'] for d in report['dimensions']['op']}
+    # The DEL request was not seen, its type comes from the RESULT tag
+    assert ops == {'SRCH': 2, 'MOD': 1, 'DEL': 1}
+    assert [(d['key'], d['count']) for d in report['dimensions']['base']] == [('dc=example,dc=com', 2)]
+    assert [(d['key'], d['count']) for d in report['dimensions']['filter']] == [('(uid=?)', 2)]
+    assert [(d['key'], d['count']) for d in report['dimensions']['ip']] == [('10.0.0.1', 3)]
+    assert [(s['minute'], s['count']) for s in report['series']] == \
+        [('2016-04-27T12:49:00+10:00', 2), ('2016-04-27T12:50:00+10:00', 2)]
+
+
+def test_latency_aggregator_bounds():
+    aggregator = LatencyAggregator(max_keys=2, max_minutes=1)
+    for line in LOG_LINES:
+        aggregator.feed(line)
+    assert set(aggregator.by_dimension['op']) == {'SRCH', 'MOD', '(other)'}
+    assert len(aggregator.series) == 1
@@ -0,0 +1,71 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+#
+import gzip
+import os
+import pytest
+from lib389.logconv import AccessLogAnalyzer, AccessLogStats
+
+ACCESS_LINES = [
+    '[27/Apr/2016:12:49:49.726093186 +1000] conn=1 fd=64 slot=64 connection from ::1 to ::1\n',
+    '[27/Apr/2016:12:49:49.726300000 +1000] conn=1 op=0 BIND dn="cn=Directory Manager" method=128 version=3\n',
+    '[27/Apr/2016:12:49:49.726400000 +1000] conn=1 op=0 RESULT err=0 tag=97 nentries=0 etime=0.000100\n',
+    '[27/Apr/2016:12:49:49.727000000 +1000] conn=2 fd=65 slot=65 connection from local to /run/slapd.socket\n',
+    '[27/Apr/2016:12:49:49.727235997 +1000] conn=1 op=1 SRCH base="dc=example,dc=com" scope=2 filter="(uid=*)" attrs=ALL\n',
+    '[27/Apr/2016:12:49:49.728000000 +1000] conn=1 op=1 RESULT err=0 tag=101 nentries=10 etime=1.500000 notes=A\n',
+    '[27/Apr/2016:12:49:49.729000000 +1000] conn=2 op=0 BIND dn="" method=128 version=3\n',
+    '[27/Apr/2016:12:49:49.729100000 +1000] conn=2 op=0 RESULT err=49 tag=97 nentries=0 etime=0.000200\n',
+    '[27/Apr/2016:12:49:49.736297002 +1000] conn=1 op=2 UNBIND\n',
+    '[27/Apr/2016:12:49:49.736297002 +1000] conn=1 op=2 fd=64 closed - U1\n',
+    '[27/Apr/2016:12:49:49.737000000 +1000] conn=2 op=1 fd=65 closed - B1\n',
+    '[27/Apr/2016:12:49:50.000000000 +1000] conn=3 fd=64 slot=64 SSL connection from 10.0.0.1 to 10.0.0.2\n',
+]
+
+
+@pytest.fixture
+def access_logs(tmpdir):
+    rotated = os.path.join(str(tmpdir), 'access.20160427-124949.gz')
+    with gzip.open(rotated, 'wt') as f:
+        f.writelines(ACCESS_LINES[:6])
+    current = os.path.join(str(tmpdir), 'access')
+    with open(current, 'w') as f:
+        f.writelines(ACCESS_LINES[6:])
+    return [rotated, current]
+
+
+def test_access_log_stats():
+    """Check the counters of a single pass over a log"""
+    stats = AccessLogStats()
+    for line in ACCESS_LINES:
+        stats.feed(line)
+    report = stats.to_dict()
+    assert report['lines'] == len(ACCESS_LINES)
+    assert report['start'] == '27/Apr/2016:12:49:49.726093186 +1000'
+    assert report['end'] == '27/Apr/2016:12:49:50.000000000 +1000'
+    assert report['connections'] == {'total': 3, 'ldap': 1, 'ldapi': 1, 'ldaps': 1, 'starttls': 0}
+    assert report['peak_connections'] == 2
+    assert report['operations'] == {'BIND': 2, 'SRCH': 1, 'UNBIND': 1}
+    assert report['total_results'] == 3
+    assert dict(report['errors']) == {'0': 2, '49': 1}
+    assert report['binds']['root_dn'] == 1
+    assert report['binds']['anonymous'] == 1
+    assert report['unindexed_searches'] == 1
+    assert report['etime']['max'] == 1.5
+    assert dict(report['connection_codes']) == {'U1': 1, 'B1': 1}
+
+
+@pytest.mark.parametrize('jobs, shard_size', [(1, 1024 * 1024), (2, 1024 * 1024), (3, 64), (4, 1)])
+def test_access_log_analyzer_shards(access_logs, jobs, shard_size):
+    """Check sharded and parallel analysis matches a single pass"""
+    expected = AccessLogStats()
+    for line in ACCESS_LINES:
+        expected.feed(line)
+
+    analyzer = AccessLogAnalyzer(None, jobs=jobs, shard_size=shard_size)
+    stats = analyzer.analyze(paths=access_logs)
+    assert stats.to_dict() == expected.to_dict()
@@ -7,9 +7,11 @@
 # --- END COPYRIGHT BLOCK ---
 #
 
+import ldap
 from lib389.topologies import topology_st
 from lib389._mapped_object import DSLdapObject
-from lib389.idm.group import Group
+from lib389.idm.group import Group, Groups
+from lib389.idm.user import UserAccounts
 from lib389._constants import DEFAULT_SUFFIX
 
 
@@ -21,3 +23,119 @@ def test_exists(topology_st):
     assert not group.exists()
     group.create(properties={'cn': 'MyTestGroup', 'ou': 'groups'})
     assert group.exists()
+
+
+def test_snapshot(topology_st):
+    """
+    Assert that reads in a snapshot are served by a single search, and that
+    changes made through the object invalidate it.
+    """
+    group = Group(topology_st.standalone, dn="cn=MySnapshotGroup,ou=Groups," + DEFAULT_SUFFIX)
+    group.create(properties={'cn': 'MySnapshotGroup', 'ou': 'groups'})
+
+    with group.snapshot():
+        round_trips = group.round_trips
+        assert group.get_attr_val_utf8('cn') == 'MySnapshotGroup'
+        assert group.present('ou', 'groups')
+        assert not group.present('description')
+        assert 'nsUniqueId' in group.get_all_attrs()
+        assert group.round_trips == round_trips
+        assert group.cache_hits == 4
+
+        group.replace('description', 'changed')
+        assert group.get_attr_val_utf8('description') == 'changed'
+        assert group.round_trips == round_trips + 2
+
+    # Only the fetched attributes are served from a partial snapshot
+    group.fetch(['cn'])
+    round_trips = group.round_trips
+    group.get_attr_val_utf8('cn')
+    assert group.round_trips == round_trips
+    group.get_attr_val_utf8('description')
+    assert group.round_trips == round_trips + 1
+    group.invalidate()
+
+
+def test_iter(topology_st):
+    """
+    Assert that iter and ifilter page through the same entries as list and
+    filter, and prime the attributes asked for.
+    """
+    groups = Groups(topology_st.standalone, DEFAULT_SUFFIX)
+    for i in range(7):
+        groups.create(properties={'cn': 'MyIterGroup%d' % i, 'description': 'iter'})
+
+    expected = sorted(g.dn for g in groups.list())
+    assert sorted(g.dn for g in groups.iter(page_size=2)) == expected
+    assert sorted(g.dn for g in groups.list(paged_search=3)) == expected
+
+    found = list(groups.ifilter('(description=iter)', page_size=2, attrs=['cn']))
+    assert len(found) == 7
+    round_trips = found[0].round_trips
+    assert found[0].get_attr_val_utf8('cn').startswith('MyIterGroup')
+    assert found[0].round_trips == round_trips
+
+    # Stopping early releases the paged search on the server
+    for g in groups.iter(page_size=2):
+        break
+    assert len(groups.filter('(description=iter)')) == 7
+
+    for g in found:
+        g.delete()
+
+
+def test_bulk(topology_st):
+    """
+    Assert that create_many, modify_many and delete_many report the outcome
+    of each item, in order.
+    """
+    groups = Groups(topology_st.standalone, DEFAULT_SUFFIX)
+    items = [{'cn': 'MyBulkGroup%d' % i} for i in range(10)]
+    # The second add of MyBulkGroup0 fails, and so does the invalid one
+    results = groups.create_many(items + [{'cn': 'MyBulkGroup0'}, {'description': 'no cn'}], window=4)
+    assert [r.ok for r in results] == [True] * 10 + [False, False]
+    assert isinstance(results[10].error, ldap.ALREADY_EXISTS)
+    assert results[3].obj.get_attr_val_utf8('cn') == 'MyBulkGroup3'
+
+    created = [r.obj for r in results if r.ok]
+    results = groups.modify_many(((g, [(ldap.MOD_REPLACE, 'description', 'bulk')]) for g in created), window=3)
+    assert all(r.ok for r in results)
+    assert len(groups.filter('(description=bulk)')) == 10
+
+    results = groups.delete_many(created + [created[0]])
+    assert [r.ok for r in results] == [True] * 10 + [False]
+    assert isinstance(results[10].error, ldap.NO_SUCH_OBJECT)
+
+
+class DescribedGroup(Group):
+    def create(self, rdn=None, properties=None, basedn=None):
+        properties = dict(properties)
+        properties.setdefault('description', 'default')
+        return super(DescribedGroup, self).create(rdn, properties, basedn)
+
+
+class DescribedGroups(Groups):
+    def __init__(self, instance, basedn):
+        super(DescribedGroups, self).__init__(instance, basedn)
+        self._childobject = DescribedGroup
+
+
+def test_bulk_create_types(topology_st):
+    """
+    Assert that create_many validates each item with its type, and creates
+    the types that override create() with it.
+    """
+    inst = topology_st.standalone
+    users = UserAccounts(inst, DEFAULT_SUFFIX)
+    props = {'uid': 'bulk_nt', 'cn': 'bulk_nt', 'sn': 'bulk_nt', 'uidNumber': '5000', 'gidNumber': '5000',
+             'homeDirectory': '/home/bulk_nt', 'ntUserDomainId': 'bulk_nt'}
+    results = users.create_many([props])
+    assert results[0].ok
+    assert results[0].obj.present('objectclass', 'ntUser')
+    results[0].obj.delete()
+
+    groups = DescribedGroups(inst, DEFAULT_SUFFIX)
+    results = groups.create_many([{'cn': 'MyDescribedGroup'}, {'description': 'no cn'}])
+    assert [r.ok for r in results] == [True, False]
+    assert results[0].obj.get_attr_val_utf8('description') == 'default'
+    results[0].obj.delete()
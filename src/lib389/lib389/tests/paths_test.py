@@ -7,7 +7,9 @@
 # --- END COPYRIGHT BLOCK ---
 #
 
+from lib389.config import LDBMConfig
 from lib389.paths import Paths
+from lib389.topologies import topology_st
 
 # Test that we can retrieve the settings from the paths object
 def test_paths():
@@ -34,3 +36,33 @@ def test_path_exception():
     except IOError:
         assert(True)
 
+
+# Test that the paths of an online instance are read once, until its
+# configuration changes or it restarts
+def test_paths_online(topology_st):
+    inst = topology_st.standalone
+    p = inst.ds_paths
+    p.invalidate()
+    searches = p.online_searches
+    for _ in range(3):
+        ldif_dir = p.ldif_dir
+        p.error_log
+        p.access_log
+        p.backup_dir
+    assert p.online_searches == searches + 1
+
+    inst.config.set('nsslapd-ldifdir', ldif_dir)
+    assert p.ldif_dir == ldif_dir
+    assert p.online_searches == searches + 2
+
+    db_dir = p.db_dir
+    searches = p.online_searches
+    LDBMConfig(inst).set('nsslapd-directory', db_dir)
+    assert p.db_dir == db_dir
+    assert p.online_searches == searches + 1
+
+    inst.restart()
+    searches = p.online_searches
+    p.ldif_dir
+    p.ldif_dir
+    assert p.online_searches == searches + 1
@@ -0,0 +1,57 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+#
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from lib389.topologies import topology_st
+from lib389.idm.group import Groups
+from lib389.pool import ConnectionPool
+from lib389.exceptions import PoolTimeout
+from lib389._constants import DEFAULT_SUFFIX
+
+
+def test_pool_threads(topology_st):
+    """Check workers of a thread pool each get their own connection, and
+    that connections are reused"""
+    inst = topology_st.standalone
+    groups = Groups(inst, DEFAULT_SUFFIX)
+    for i in range(20):
+        groups.create(properties={'cn': 'MyPoolGroup%d' % i})
+    pool = ConnectionPool(maxsize=4)
+
+    def work(i):
+        with pool.connection(inst) as conn:
+            return Groups(conn, DEFAULT_SUFFIX).get('MyPoolGroup%d' % i).get_attr_val_utf8('cn')
+
+    with ThreadPoolExecutor(8) as executor:
+        cns = list(executor.map(work, range(20)))
+    assert cns == ['MyPoolGroup%d' % i for i in range(20)]
+    stats = pool.stats()
+    assert stats['created'] <= 4
+    assert stats['created'] + stats['reused'] == 20
+    assert stats['borrowed'] == 0
+    pool.close()
+    assert pool.stats()['open'] == 0
+
+    for group in groups.list():
+        if group.get_attr_val_utf8('cn').startswith('MyPoolGroup'):
+            group.delete()
+
+
+def test_pool_limits(topology_st):
+    """Check maxsize and idle eviction"""
+    inst = topology_st.standalone
+    pool = ConnectionPool(maxsize=1, timeout=0.5, max_idle=0)
+    conn = pool.acquire(**pool.instance_params(inst))
+    with pytest.raises(PoolTimeout):
+        pool.acquire(**pool.instance_params(inst))
+    pool.release(conn)
+    pool.evict_idle()
+    assert pool.stats()['evicted'] == 1
+    assert pool.stats()['open'] == 0
+    pool.close()
@@ -0,0 +1,152 @@
+# --- BEGIN COPYRIGHT BLOCK ---
+# Copyright (C) 2020 Red Hat, Inc.
+# All rights reserved.
+#
+# License: GPL (version 3 or any later version).
+# See LICENSE for details.
+# --- END COPYRIGHT BLOCK ---
+#
+import os
+import pytest
+from lib389.repldigest import DigestTree, diff_trees, entry_digest
+
+SUFFIX = 'dc=example,dc=com'
+
+
+def _entries():
+    entries = [(SUFFIX, {'objectClass': [b'top', b'domain'], 'dc': [b'example']})]
+    for ou in ('People', 'Groups'):
+        entries.append(('ou=%s,%s' % (ou, SUFFIX), {'objectClass': [b'top', b'organizationalUnit'],
+                                                     'ou': [ou.encode()]}))
+        for i in range(20):
+            entries.append(('cn=%s%d,ou=%s,%s' % (ou, i, ou, SUFFIX), {
+                'objectClass': [b'top', b'person'],
+                'cn': [b'%s%d' % (ou.encode(), i)],
+                'sn': [b'%d' % i],
+                'modifyTimestamp': [b'20200101000000Z'],
+            }))
+    return entries
+
+
+def _tree(entries, suffix=SUFFIX, **kwargs):
+    tree = DigestTree(suffix, **kwargs)
+    for dn, attrs in entries:
+        tree.add(dn, attrs)
+    return tree
+
+
+def test_entry_digest():
+    """Check the digest ignores the order and case that don't matter"""
+
+    attrs = {'objectClass': [b'top', b'person'], 'cn': [b'a', b'b'], 'sn': ['x']}
+    digest = entry_digest('cn=a,' + SUFFIX, attrs)
+    assert digest == entry_digest('CN=a,DC=example,DC=com', {'sn': [b'x'], 'cn': [b'b', b'a'],
+                                                             'objectclass': [b'Person', b'TOP']})
+    assert digest == entry_digest('cn=a,' + SUFFIX, dict(attrs, modifyTimestamp=[b'20200101000000Z']))
+    assert digest != entry_digest('cn=a,' + SUFFIX, dict(attrs, cn=[b'A', b'b']))
+    assert digest != entry_digest('cn=b,' + SUFFIX, attrs)
+    # Values are kept apart
+    assert entry_digest('cn=a,' + SUFFIX, {'cn': [b'a', b'b']}) != entry_digest('cn=a,' + SUFFIX, {'cn': [b'ab']})
+
+
+def test_same_trees():
+    """Check trees of the same entries in any order have the same hashes,
+    and compare in one step"""
+
+    entries = _entries()
+    master = _tree(entries)
+    replica = _tree(reversed(entries))
+    assert master.hash() == replica.hash()
+    assert master.entries == replica.entries == len(entries)
+    assert diff_trees(master, replica) == {'master_only': [], 'replica_only': [], 'different': [], 'compared': 1}
+
+
+def test_diff_trees():
+    """Check only the entries that differ are found, without comparing the
+    subtrees in sync"""
+
+    entries = _entries()
+    master = _tree(entries)
+    modified = list(entries)
+    people = 'cn=People3,ou=People,' + SUFFIX
+    modified[modified.index((people, entries[5][1]))] = (people, dict(entries[5][1], sn=[b'changed']))
+    removed = [e for e in modified if e[0] != 'cn=People7,ou=People,' + SUFFIX]
+    removed.append(('cn=extra,ou=People,' + SUFFIX, {'objectClass': [b'person'], 'cn': [b'extra']}))
+    replica = _tree(removed)
+
+    diff = diff_trees(master, replica)
+    assert diff['different'] == [people]
+    assert diff['master_only'] == ['cn=People7,ou=People,' + SUFFIX]
+    assert diff['replica_only'] == ['cn=extra,ou=People,' + SUFFIX]
+    # The suffix, both OUs, and the People entries on both sides
+    assert diff['compared'] == 3 + 19
+
+
+def test_missing_subtree():
+    """Check a subtree only on one side is reported as a whole, parents
+    first"""
+
+    entries = _entries()
+    master = _tree(entries)
+    replica = _tree(e for e in entries if not e[0].lower().endswith('ou=groups,' + SUFFIX))
+    diff = diff_trees(master, replica)
+    assert sorted(diff['master_only']) == sorted(dn for dn, _ in entries
+                                                 if dn.lower().endswith('ou=groups,' + SUFFIX))
+    assert diff['master_only'][0] == 'ou=Groups,' + SUFFIX
+    assert diff['replica_only'] == diff['different'] == []
+
+
+def test_tombstones_and_orphans():
+    """Check tombstones are only counted, and entries without their parent
+    still compared"""
+
+    entries = _entries()
+    tombstone = ('nsuniqueid=1234,cn=gone,ou=People,' + SUFFIX, {'objectClass': [b'top', b'nsTombstone']})
+    master = _tree(entries + [tombstone])
+    assert master.tombstones == 1
+    assert master.entries == len(entries) + 1
+    assert master.hash() == _tree(entries).hash()
+
+    # The replica doesn't have ou=People, but has its entries
+    replica = _tree(e for e in entries if e[0] != 'ou=People,' + SUFFIX)
+    assert replica.digest('ou=People,' + SUFFIX) is None
+    diff = diff_trees(master, replica)
+    assert diff['master_only'] == ['ou=People,' + SUFFIX]
+    assert diff['replica_only'] == diff['different'] == []
+
+    # Entries outside of the suffix are left out
+    assert not master.add('cn=config', {'objectClass': [b'top']})
+
+
+@pytest.mark.parametrize('name', ['replica.digest', 'replica.digest.gz'])
+def test_save_load(tmpdir, name):
+    """Check saved digests load back the same"""
+
+    entries = _entries()
+    tree = _tree(entries, source='ldif')
+    path = os.path.join(str(tmpdir), name)
+    tree.save(path)
+    loaded = DigestTree.load(path)
+    assert loaded.hash() == tree.hash()
+    assert loaded.entries == tree.entries
+    assert loaded.source == 'ldif'
+    assert list(loaded.subtree()) == list(tree.subtree())
+    assert diff_trees(tree, loaded)['compared'] == 1
+
+    with open(os.path.join(str(tmpdir), 'bad'), 'w') as f:
+        f.write('dn: ' + SUFFIX + '\n')
+    with pytest.raises(ValueError):
+        DigestTree.load(os.path.join(str(tmpdir), 'bad'))
+
+
+def test_incomparable_trees():
+    """Check trees of other suffixes, ignored attributes or sources are
+    refused"""
+
+    entries = _entries()
+    with pytest.raises(ValueError):
+        diff_trees(_tree(entries), _tree(entries, suffix='ou=People,' + SUFFIX))
+    with pytest.raises(ValueError):
+        diff_trees(_tree(entries), _tree(entries, ignore=['sn']))
+    with pytest.raises(ValueError):
+        diff_trees(_tree(entries, source='ldif'), _tree(entries, source='online'))
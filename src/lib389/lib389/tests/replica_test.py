@@ -12,7 +12,7 @@ import pytest
 import logging
 
 from lib389 import NoSuchEntryError
-from lib389.replica import Replicas
+from lib389.replica import Replicas, ReplicationMonitor
 from lib389.backend import Backends
 from lib389.idm.domain import Domain
 from lib389._constants import (ReplicaRole, BACKEND_SUFFIX, BACKEND_NAME, REPLICA_RUV_FILTER, CONSUMER_REPLICAID,
@@ -370,6 +370,60 @@ def test_demote_fail(topo, new_suffixes, clean_up, role_from):
             replica.demote(newrole=role_to)
 
 
+def test_monitor_crawl(monkeypatch):
+    """Check the replication monitor reads each instance of the topology
+    once, and reports them in the order they were found"""
+
+    # h0 -> h1, h2; h1 -> h0, h3; h2 -> h3, h4 (down); h3 -> h1
+    agmts = {'h0': ['h1', 'h2'], 'h1': ['h0', 'h3'], 'h2': ['h3', 'h4'], 'h3': ['h1']}
+    reads = []
+
+    class Config(object):
+        def __init__(self, host):
+            self.host = host
+
+        def get_attr_val_utf8_l(self, attr):
+            return self.host if attr == 'nsslapd-localhost' else '389'
+
+    class Instance(object):
+        verbose = False
+
+        def __init__(self, host):
+            self.host = host
+            self.config = Config(host)
+
+    class Pool(object):
+        def __init__(self, **kwargs):
+            pass
+
+        def acquire(self, uri, binddn=None, bindpw=None):
+            host = uri.split('//')[1].split(':')[0]
+            if host not in agmts:
+                raise ldap.SERVER_DOWN({'desc': "Can't contact LDAP server"})
+            return Instance(host)
+
+        def release(self, conn, discard=False):
+            pass
+
+        def close(self):
+            pass
+
+    def get_replica_status(self, instance, use_json, get_credentials=None, pool=None, ruvs=None):
+        reads.append(instance.host)
+        status = [{'replica_id': instance.host[1], 'replica_root': NEW_SUFFIX, 'replica_status': 'Available',
+                   'maxcsn': '0', 'agmts_status': []}]
+        return status, ['{}:389:ldap'.format(host) for host in agmts[instance.host]]
+
+    monkeypatch.setattr('lib389.replica.ConnectionPool', Pool)
+    monkeypatch.setattr(ReplicationMonitor, '_get_replica_status', get_replica_status)
+    monitor = ReplicationMonitor(Instance('h0'), workers=3)
+    report = monitor.generate_report(lambda host, port: {'binddn': 'cn=dm', 'bindpw': 'password'})
+    assert sorted(reads) == ['h0', 'h1', 'h2', 'h3']
+    assert list(report) == ['h0:389', 'h1:389', 'h2:389', 'h3:389', 'h4:389']
+    assert report['h4:389'][0]['replica_status'].startswith('Unavailable')
+    assert monitor.duration is not None
+
+
 if __name__ == "__main__":
     CURRENT_FILE = os.path.realpath(__file__)
     pytest.main("-s -v %s" % CURRENT_FILE)
@@ -40,12 +40,6 @@ import shlex
 import operator
 import subprocess
 import math
-# Setuptools ships with 'packaging' module, let's use it from there
-try:
-    from pkg_resources.extern.packaging.version import LegacyVersion
-# Fallback to a normal 'packaging' module in case 'setuptools' is stripped
-except:
-    from packaging.version import LegacyVersion
 from socket import getfqdn
 from ldapurl import LDAPUrl
 from contextlib import closing
@@ -1076,6 +1070,24 @@ def get_ds_version(paths=None):
     return paths.version
 
 
+def legacy_version(version):
+    """Parse a version string into a comparable LegacyVersion. Importing
+    pkg_resources takes longer than a whole dsconf command, so it's only done
+    when versions are compared.
+
+    :param version: A version, like 1.4.3.10
+    :type version: str
+    :returns: A LegacyVersion
+    """
+    # Setuptools ships with 'packaging' module, let's use it from there
+    try:
+        from pkg_resources.extern.packaging.version import LegacyVersion
+    # Fallback to a normal 'packaging' module in case 'setuptools' is stripped
+    except:
+        from packaging.version import LegacyVersion
+    return LegacyVersion(version)
+
+
 def ds_is_related(relation, *ver, instance=None):
     """
     Return a result of a comparison between the current version of ns-slapd and a provided version.
@@ -1089,9 +1101,9 @@ def ds_is_related(relation, *ver, instance=None):
     if len(ver) > 1:
         for cmp_ver in ver:
             if cmp_ver.startswith(ds_ver[:3]):
-                return ops[relation](LegacyVersion(ds_ver),LegacyVersion(cmp_ver))
+                return ops[relation](legacy_version(ds_ver), legacy_version(cmp_ver))
     else:
-        return ops[relation](LegacyVersion(ds_ver), LegacyVersion(ver[0]))
+        return ops[relation](legacy_version(ds_ver), legacy_version(ver[0]))
 
 
 def ds_is_older(*ver, instance=None):